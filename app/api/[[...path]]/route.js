@@ -1,18 +1,263 @@
-import { NextResponse } from 'next/server'
+import { NextResponse, after } from 'next/server'
 import { createSupabaseServer, getUser } from '../../../lib/supabase-server'
 import {
+  QUOTE_STATUSES,
   calculateCompleteQuote,
-  calculateProfitFirstAllocations
+  calculateFinishedHatQuote,
+  calculateProfitFirstAllocations,
+  computeQuoteAcrossMaterials,
+  enableEngineProfiling,
+  getEngineProfile,
+  sumProfitFirstAllocations
 } from '../../../lib/pricingEngine'
+import { IMPORT_SCHEMAS, detectImportFormat, streamImport } from '../../../lib/bulkImport'
+import { createQuoteExportStream, exportHeaders, parseExportOptions } from '../../../lib/quoteExport'
+import { resolveResponseProfile, serializeQuoteResult } from '../../../lib/quoteProfiles'
+import {
+  PRICING_SETTINGS_FIELDS,
+  getOrComputeQuote,
+  getQuoteCacheStats,
+  invalidateQuoteCache,
+  quoteCacheKey
+} from '../../../lib/quoteCache'
+import { getSingleflightStats, singleflight, singleflightKey } from '../../../lib/singleflight'
+import {
+  PRIVATE_REVALIDATE,
+  collectionETag,
+  getConditionalGetStats,
+  matchesIfNoneMatch,
+  recordConditionalGet,
+  rowsETag
+} from '../../../lib/conditionalGet'
+import {
+  claimRepricingJob,
+  getRepricingJob,
+  getRepricingStats,
+  pricingSettingsChanged,
+  repricedFields,
+  runRepricingJob,
+  startRepricingJob
+} from '../../../lib/repricingJob'
+import {
+  createQuoteRevision,
+  inputSnapshot,
+  listQuoteRevisions,
+  loadQuoteRevision,
+  recordQuoteBase
+} from '../../../lib/quoteRevisions'
+
+// Pricing inputs a saved patch quote keeps (quotes table columns)
+const QUOTE_INPUT_COLUMNS = [
+  'qty',
+  'patch_material_id',
+  'patch_width_input',
+  'patch_height_input',
+  'patch_size_mode',
+  'outline_allowance',
+  'gap',
+  'border',
+  'waste_pct',
+  'yield_method',
+  'manual_yield',
+  'machine_minutes_per_sheet',
+  'cleanup_minutes_per_sheet',
+  'apply_minutes_per_hat',
+  'proof_minutes',
+  'setup_minutes',
+  'packing_minutes',
+  'hats_supplied_by',
+  'hat_unit_cost',
+  'turnaround_text'
+]
+
+// Engine stage timings + call counts on GET metrics (off unless set)
+if (process.env.PRICING_ENGINE_PROFILE === '1') enableEngineProfiling()
+
+// Accounts allowed to read GET metrics, which covers every tenant's traffic
+// (comma-separated emails; unset = nobody)
+const METRICS_ADMIN_EMAILS = new Set(
+  (process.env.METRICS_ADMIN_EMAILS || '')
+    .split(',')
+    .map(email => email.trim().toLowerCase())
+    .filter(Boolean)
+)
 
 // CORS helper
 function handleCORS(response) {
   response.headers.set('Access-Control-Allow-Origin', '*')
   response.headers.set('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS, PATCH')
-  response.headers.set('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+  response.headers.set('Access-Control-Allow-Headers', 'Content-Type, Authorization, If-None-Match')
   return response
 }
 
+/**
+ * Conditional GET of a user's collection: 304 when If-None-Match still
+ * matches the collection version, otherwise load() and send it with its ETag
+ */
+async function conditionalCollection(request, supabase, userId, table, load) {
+  if (request.headers.get('if-none-match')) {
+    const { data: version, error } = await supabase.rpc('collection_version', { target: table })
+    if (error) throw error
+
+    const etag = collectionETag(userId, table, version.count, version.last_updated)
+    if (matchesIfNoneMatch(request, etag)) {
+      recordConditionalGet(true)
+      return handleCORS(new NextResponse(null, {
+        status: 304,
+        headers: { ETag: etag, 'Cache-Control': PRIVATE_REVALIDATE }
+      }))
+    }
+  }
+
+  const data = await load()
+  recordConditionalGet(false)
+  const response = NextResponse.json(data)
+  response.headers.set('ETag', rowsETag(userId, table, data))
+  response.headers.set('Cache-Control', PRIVATE_REVALIDATE)
+  return handleCORS(response)
+}
+
+/**
+ * Load shop settings + material and price the quote (result-cached)
+ * @returns {Promise<{ calculated: Object, shopSettings: Object, material: Object } | { error: string }>}
+ */
+async function loadAndPriceQuote(supabase, userId, body) {
+  const [{ data: shopSettings }, { data: material }] = await Promise.all([
+    supabase
+      .from('shop_settings')
+      .select('*')
+      .eq('user_id', userId)
+      .single(),
+    supabase
+      .from('patch_materials')
+      .select('*')
+      .eq('id', body.patch_material_id)
+      .eq('user_id', userId)
+      .single()
+  ])
+
+  if (!shopSettings) return { error: 'Shop settings not found' }
+  if (!material) return { error: 'Material not found' }
+
+  // Cached by inputs + settings/material versions
+  const calculated = getOrComputeQuote(
+    quoteCacheKey(userId, body, shopSettings, material),
+    () => calculateCompleteQuote(body, shopSettings, material)
+  )
+  return { calculated, shopSettings, material }
+}
+
+// Materials seeded for every new shop by complete_onboarding()
+const DEFAULT_MATERIALS = [
+  {
+    name: 'Standard Leatherette',
+    sheet_width: 12,
+    sheet_height: 24,
+    sheet_cost: 7,
+    default_machine_minutes_per_sheet: 12,
+    default_cleanup_minutes_per_sheet: 5
+  },
+  {
+    name: 'Premium Leatherette',
+    sheet_width: 12,
+    sheet_height: 24,
+    sheet_cost: 15,
+    default_machine_minutes_per_sheet: 12,
+    default_cleanup_minutes_per_sheet: 5
+  }
+]
+
+// Default number of customers returned by customers/search
+const CUSTOMER_SEARCH_LIMIT = 10
+
+// Max materials priced side by side in one compare request
+const MAX_COMPARE_MATERIALS = 25
+
+/**
+ * Load shop settings + the materials to compare (all of the user's
+ * materials when no ids are given) and price them in one engine pass
+ * @returns {Promise<{ comparison: Object } | { error: string }>}
+ */
+async function loadAndCompareMaterials(supabase, userId, body) {
+  const ids = Array.isArray(body.patch_material_ids) ? body.patch_material_ids : null
+
+  let materialsQuery = supabase
+    .from('patch_materials')
+    .select('*')
+    .eq('user_id', userId)
+  materialsQuery = ids
+    ? materialsQuery.in('id', ids)
+    : materialsQuery.order('name').limit(MAX_COMPARE_MATERIALS)
+
+  const [{ data: shopSettings }, { data: materials, error }] = await Promise.all([
+    supabase
+      .from('shop_settings')
+      .select('*')
+      .eq('user_id', userId)
+      .single(),
+    materialsQuery
+  ])
+
+  if (error) throw error
+  if (!shopSettings) return { error: 'Shop settings not found' }
+  if (!materials || materials.length === 0) return { error: 'No materials found' }
+
+  // Keep the caller's order when ids were given
+  const ordered = ids
+    ? ids.map(id => materials.find(m => m.id === id)).filter(Boolean)
+    : materials
+
+  return { comparison: computeQuoteAcrossMaterials(body, shopSettings, ordered) }
+}
+
+// Max quotes per bulk status request (keeps the IN list and response bounded)
+const MAX_BULK_STATUS_IDS = 500
+
+/**
+ * Set status on many quotes in one UPDATE ... RETURNING and, when marking
+ * paid, load Profit First settings once (in parallel) for all allocations.
+ */
+async function updateQuoteStatuses(supabase, userId, table, ids, status) {
+  const [updateResult, settingsResult] = await Promise.all([
+    supabase
+      .from(table)
+      .update({ status })
+      .in('id', ids)
+      .eq('user_id', userId)
+      .select('id, total_price'),
+    status === 'paid'
+      ? supabase
+          .from('profit_first_settings')
+          .select('*')
+          .eq('user_id', userId)
+          .single()
+      : Promise.resolve({ data: null })
+  ])
+
+  if (updateResult.error) throw updateResult.error
+
+  const updated = updateResult.data || []
+  const profitFirstSettings = settingsResult.data
+
+  if (status !== 'paid' || !profitFirstSettings) {
+    return { updated, allocations: null }
+  }
+
+  const perQuote = updated.map(quote => ({
+    id: quote.id,
+    total_price: quote.total_price,
+    allocations: calculateProfitFirstAllocations(quote.total_price, profitFirstSettings)
+  }))
+
+  return {
+    updated,
+    allocations: {
+      perQuote,
+      totals: sumProfitFirstAllocations(perQuote.map(q => q.allocations))
+    }
+  }
+}
+
 export async function OPTIONS() {
   return handleCORS(new NextResponse(null, { status: 200 }))
 }
@@ -34,19 +279,45 @@ export async function GET(request) {
       return handleCORS(NextResponse.json({ status: 'ok', user: user.email }))
     }
 
-    // Get shop settings
-    if (path === 'shop-settings') {
-      const { data, error } = await supabase
-        .from('shop_settings')
-        .select('*')
-        .eq('user_id', user.id)
-        .single()
+    // In-process metrics (operators only)
+    if (path === 'metrics') {
+      if (!METRICS_ADMIN_EMAILS.has(user.email?.toLowerCase())) {
+        return handleCORS(NextResponse.json({ error: 'Forbidden' }, { status: 403 }))
+      }
+      return handleCORS(NextResponse.json({
+        quoteCache: getQuoteCacheStats(),
+        singleflight: getSingleflightStats(),
+        conditionalGet: getConditionalGetStats(),
+        repricing: getRepricingStats(),
+        engine: getEngineProfile()
+      }))
+    }
 
-      if (error && error.code !== 'PGRST116') {
-        throw error
+    // Re-pricing job progress (id or 'latest')
+    if (path.startsWith('repricing-jobs/')) {
+      const job = await getRepricingJob(supabase, user.id, path.split('/')[1])
+      if (!job) {
+        return handleCORS(NextResponse.json({ error: 'Job not found' }, { status: 404 }))
       }
+      return handleCORS(NextResponse.json(job))
+    }
 
-      return handleCORS(NextResponse.json(data || null))
+    // Get shop settings
+    if (path === 'shop-settings') {
+      return conditionalCollection(request, supabase, user.id, 'shop_settings', () =>
+        singleflight('shop-settings', user.id, async () => {
+          const { data, error } = await supabase
+            .from('shop_settings')
+            .select('*')
+            .eq('user_id', user.id)
+            .single()
+
+          if (error && error.code !== 'PGRST116') {
+            throw error
+          }
+          return data || null
+        })
+      )
     }
 
     // Get profit first settings
@@ -64,13 +335,47 @@ export async function GET(request) {
       return handleCORS(NextResponse.json(data || null))
     }
 
-    // Get patch materials
-    if (path === 'patch-materials') {
+    // Profit First monthly running totals (maintained by ledger triggers)
+    if (path === 'profit-first/ledger') {
+      const months = Math.min(parseInt(searchParams.get('months')) || 12, 120)
       const { data, error } = await supabase
-        .from('patch_materials')
+        .from('profit_first_monthly')
         .select('*')
         .eq('user_id', user.id)
-        .order('created_at', { ascending: false })
+        .order('month', { ascending: false })
+        .limit(months)
+
+      if (error) throw error
+      return handleCORS(NextResponse.json(data || []))
+    }
+
+    // Get patch materials
+    if (path === 'patch-materials') {
+      return conditionalCollection(request, supabase, user.id, 'patch_materials', async () => {
+        const { data, error } = await supabase
+          .from('patch_materials')
+          .select('*')
+          .eq('user_id', user.id)
+          .order('created_at', { ascending: false })
+
+        if (error) throw error
+        return data || []
+      })
+    }
+
+    // Customer typeahead: ranked trigram search, or most recent when q is empty
+    if (path === 'customers/search') {
+      const q = (searchParams.get('q') || '').trim().slice(0, 100)
+      const limit = Math.min(Math.max(parseInt(searchParams.get('limit'), 10) || CUSTOMER_SEARCH_LIMIT, 1), 50)
+
+      const { data, error } = q
+        ? await supabase.rpc('search_customers', { q, max_results: limit })
+        : await supabase
+            .from('customers')
+            .select('*')
+            .eq('user_id', user.id)
+            .order('created_at', { ascending: false })
+            .limit(limit)
 
       if (error) throw error
       return handleCORS(NextResponse.json(data || []))
@@ -78,14 +383,33 @@ export async function GET(request) {
 
     // Get customers
     if (path === 'customers') {
+      return conditionalCollection(request, supabase, user.id, 'customers', async () => {
+        const { data, error } = await supabase
+          .from('customers')
+          .select('*')
+          .eq('user_id', user.id)
+          .order('created_at', { ascending: false })
+
+        if (error) throw error
+        return data || []
+      })
+    }
+
+    // Get single customer (the quote builder shows the name of a preset customer_id)
+    if (path.startsWith('customers/')) {
+      const customerId = path.split('/')[1]
       const { data, error } = await supabase
         .from('customers')
-        .select('*')
+        .select('id, name, email, phone')
+        .eq('id', customerId)
         .eq('user_id', user.id)
-        .order('created_at', { ascending: false })
+        .maybeSingle()
 
       if (error) throw error
-      return handleCORS(NextResponse.json(data || []))
+      if (!data) {
+        return handleCORS(NextResponse.json({ error: 'Customer not found' }, { status: 404 }))
+      }
+      return handleCORS(NextResponse.json(data))
     }
 
     // Get quotes
@@ -104,6 +428,46 @@ export async function GET(request) {
       return handleCORS(NextResponse.json(data || []))
     }
 
+    // Export quotes (streamed CSV / NDJSON)
+    if (path === 'quotes/export') {
+      const { options, error } = parseExportOptions(searchParams)
+      if (error) {
+        return handleCORS(NextResponse.json({ error }, { status: 400 }))
+      }
+
+      const stream = createQuoteExportStream(supabase, user.id, options)
+      return handleCORS(new Response(stream, { headers: exportHeaders(options.format) }))
+    }
+
+    // Quote revision history (inputs + prices only) or one regenerated revision
+    const revisionsMatch = path.match(/^quotes\/([^/]+)\/revisions(?:\/(\d+))?$/)
+    if (revisionsMatch) {
+      const [, quoteId, revisionParam] = revisionsMatch
+
+      if (revisionParam === undefined) {
+        const history = await listQuoteRevisions(supabase, user.id, quoteId)
+        if (!history) {
+          return handleCORS(NextResponse.json({ error: 'Quote not found' }, { status: 404 }))
+        }
+        return handleCORS(NextResponse.json(history))
+      }
+
+      const profile = resolveResponseProfile(searchParams.get('profile'))
+      if (!profile) {
+        return handleCORS(NextResponse.json({ error: 'profile must be one of minimal, shop, customer, full' }, { status: 400 }))
+      }
+
+      const revision = await loadQuoteRevision(supabase, user.id, quoteId, parseInt(revisionParam, 10))
+      if (!revision) {
+        return handleCORS(NextResponse.json({ error: 'Revision not found' }, { status: 404 }))
+      }
+
+      // Revision fields + the regenerated result in the requested profile
+      const { calculated, ...meta } = revision
+      const json = `${JSON.stringify(meta).slice(0, -1)},"result":${serializeQuoteResult(calculated, profile)}}`
+      return handleCORS(new NextResponse(json, { headers: { 'Content-Type': 'application/json' } }))
+    }
+
     // Get single quote
     if (path.startsWith('quotes/')) {
       const quoteId = path.split('/')[1]
@@ -165,7 +529,9 @@ export async function POST(request) {
   try {
     const { searchParams } = new URL(request.url)
     const path = searchParams.get('path') || ''
-    const body = await request.json()
+    // Import endpoints stream the raw body, resume takes none; everything else is JSON
+    const hasJsonBody = !path.endsWith('/import') && !path.endsWith('/resume')
+    const body = hasJsonBody ? await request.json() : null
 
     const supabase = await createSupabaseServer()
     const user = await getUser()
@@ -201,55 +567,84 @@ export async function POST(request) {
     if (path === 'onboarding/complete') {
       const { shopSettings, profitFirstSettings } = body
 
-      // Create shop settings
-      const { error: shopError } = await supabase
-        .from('shop_settings')
-        .insert([{ ...shopSettings, user_id: user.id }])
-
-      if (shopError) throw shopError
+      // Settings, profit first and default materials in one transaction
+      const { error } = await supabase.rpc('complete_onboarding', {
+        p_shop_settings: shopSettings || {},
+        p_profit_first_settings: profitFirstSettings || {},
+        p_materials: DEFAULT_MATERIALS
+      })
 
-      // Create profit first settings
-      const { error: profitError } = await supabase
-        .from('profit_first_settings')
-        .insert([{ ...profitFirstSettings, user_id: user.id }])
-
-      if (profitError) throw profitError
-
-      // Seed default materials
-      const defaultMaterials = [
-        {
-          user_id: user.id,
-          name: 'Standard Leatherette',
-          sheet_width: 12,
-          sheet_height: 24,
-          sheet_cost: 7,
-          default_machine_minutes_per_sheet: 12,
-          default_cleanup_minutes_per_sheet: 5
-        },
-        {
-          user_id: user.id,
-          name: 'Premium Leatherette',
-          sheet_width: 12,
-          sheet_height: 24,
-          sheet_cost: 15,
-          default_machine_minutes_per_sheet: 12,
-          default_cleanup_minutes_per_sheet: 5
-        }
-      ]
-
-      await supabase.from('patch_materials').insert(defaultMaterials)
+      // unique_violation: this user already has settings
+      if (error?.code === '23505') {
+        return handleCORS(NextResponse.json({ error: 'Onboarding already completed' }, { status: 409 }))
+      }
+      if (error) throw error
 
       return handleCORS(NextResponse.json({ success: true }))
     }
 
     // Update shop settings
     if (path === 'shop-settings') {
-      const { error } = await supabase
+      const pricingColumns = PRICING_SETTINGS_FIELDS.join(',')
+      const { data: previous, error: readError } = await supabase
+        .from('shop_settings')
+        .select(pricingColumns)
+        .eq('user_id', user.id)
+        .maybeSingle()
+
+      if (readError) throw readError
+
+      const { data: saved, error } = await supabase
         .from('shop_settings')
         .upsert([{ ...body, user_id: user.id }], { onConflict: 'user_id' })
+        .select(pricingColumns)
+        .single()
 
       if (error) throw error
-      return handleCORS(NextResponse.json({ success: true }))
+      invalidateQuoteCache(user.id)
+
+      // Re-price draft/sent quotes after the response is sent, only when a
+      // setting the engine reads changed; the save never waits on (or fails
+      // because of) the job
+      let repricingJob = null
+      if (pricingSettingsChanged(previous, saved)) {
+        try {
+          repricingJob = await startRepricingJob(supabase, user.id)
+          after(() => runRepricingJob(supabase, user.id, repricingJob))
+        } catch (jobError) {
+          console.error('Could not start repricing job:', jobError)
+        }
+      }
+
+      return handleCORS(NextResponse.json({
+        success: true,
+        repricingJob: repricingJob && { id: repricingJob.id, status: repricingJob.status }
+      }))
+    }
+
+    // Resume an interrupted re-pricing job from its saved cursor
+    const resumeMatch = path.match(/^repricing-jobs\/([^/]+)\/resume$/)
+    if (resumeMatch) {
+      const job = await getRepricingJob(supabase, user.id, resumeMatch[1])
+      if (!job) {
+        return handleCORS(NextResponse.json({ error: 'Job not found' }, { status: 404 }))
+      }
+      if (job.status === 'completed' || job.status === 'cancelled') {
+        return handleCORS(NextResponse.json({ error: `Job is ${job.status}` }, { status: 409 }))
+      }
+
+      // Claimed in the database, so a job still running on another instance is left alone
+      const claimed = await claimRepricingJob(supabase, job.id)
+      if (claimed) {
+        after(() => runRepricingJob(supabase, user.id, claimed))
+      }
+      return handleCORS(NextResponse.json({
+        id: job.id,
+        status: job.status,
+        processed: job.processed,
+        total: job.total,
+        resumed: Boolean(claimed)
+      }))
     }
 
     // Update profit first settings
@@ -286,60 +681,86 @@ export async function POST(request) {
       return handleCORS(NextResponse.json(data))
     }
 
-    // Create/calculate quote - unified calculation for both quote types
-    if (path === 'quotes' || path === 'quotes/calculate') {
-      // Get shop settings
-      const { data: shopSettings } = await supabase
-        .from('shop_settings')
-        .select('*')
-        .eq('user_id', user.id)
-        .single()
+    // Bulk import customers / materials (CSV or NDJSON, streamed)
+    if (path === 'customers/import' || path === 'patch-materials/import') {
+      const schema = IMPORT_SCHEMAS[path.split('/')[0]]
+      const format = detectImportFormat(searchParams.get('format'), request.headers.get('content-type'))
 
-      if (!shopSettings) {
-        return handleCORS(NextResponse.json({ error: 'Shop settings not found' }, { status: 400 }))
+      const result = await streamImport(supabase, {
+        stream: request.body,
+        format,
+        schema,
+        userId: user.id
+      })
+
+      return handleCORS(NextResponse.json({ success: result.failed === 0, ...result }))
+    }
+
+    // Price one quote against several materials side by side
+    if (path === 'quotes/compare') {
+      if (body.patch_material_ids !== undefined &&
+          (!Array.isArray(body.patch_material_ids) || body.patch_material_ids.length === 0 ||
+           body.patch_material_ids.length > MAX_COMPARE_MATERIALS)) {
+        return handleCORS(NextResponse.json({ error: `patch_material_ids must be an array of 1-${MAX_COMPARE_MATERIALS} ids` }, { status: 400 }))
       }
 
-      // Get material
-      const { data: material } = await supabase
-        .from('patch_materials')
-        .select('*')
-        .eq('id', body.patch_material_id)
-        .eq('user_id', user.id)
-        .single()
+      const compared = await singleflight(path, singleflightKey(user.id, body), () =>
+        loadAndCompareMaterials(supabase, user.id, body)
+      )
 
-      if (!material) {
-        return handleCORS(NextResponse.json({ error: 'Material not found' }, { status: 400 }))
+      if (compared.error) {
+        return handleCORS(NextResponse.json({ error: compared.error }, { status: 400 }))
       }
+      return handleCORS(NextResponse.json(compared.comparison))
+    }
 
-      // Calculate using unified pricing engine
-      const calculated = calculateCompleteQuote(body, shopSettings, material)
+    // Re-quote: record the full inputs in body as the quote's next revision
+    const reviseMatch = path.match(/^quotes\/([^/]+)\/revisions$/)
+    if (reviseMatch) {
+      const result = await createQuoteRevision(supabase, user.id, reviseMatch[1], body)
+      if (result.error) {
+        return handleCORS(NextResponse.json({ error: result.error }, { status: result.status }))
+      }
+      return handleCORS(NextResponse.json(result.revision))
+    }
 
-      // If just calculating, return results
+    // Create/calculate quote - unified calculation for both quote types
+    if (path === 'quotes' || path === 'quotes/calculate') {
+      const profile = resolveResponseProfile(searchParams.get('profile'))
+      if (!profile) {
+        return handleCORS(NextResponse.json({ error: 'profile must be one of minimal, shop, customer, full' }, { status: 400 }))
+      }
+
+      // Settings/material reads + engine work, shared by concurrent identical requests
+      const priced = await singleflight(path, singleflightKey(user.id, body), () =>
+        loadAndPriceQuote(supabase, user.id, body)
+      )
+
+      if (priced.error) {
+        return handleCORS(NextResponse.json({ error: priced.error }, { status: 400 }))
+      }
+      const { calculated, shopSettings, material } = priced
+
+      // If just calculating, return results in the requested profile
       if (path === 'quotes/calculate') {
-        return handleCORS(NextResponse.json(calculated))
+        return handleCORS(new NextResponse(serializeQuoteResult(calculated, profile), {
+          headers: { 'Content-Type': 'application/json' }
+        }))
       }
 
-      // Otherwise, save quote
+      // Otherwise, save quote: the pricing inputs the form sent (blank ones
+      // take the column defaults) plus the computed columns re-pricing writes
       const quoteToSave = {
         user_id: user.id,
         customer_id: body.customer_id,
         quote_type: body.quote_type || 'patch_press',
-        qty: body.qty,
-        patch_material_id: body.patch_material_id,
-        patch_width_input: body.patch_width_input,
-        patch_height_input: body.patch_height_input,
-        unit_price: calculated.publishedPricePerPiece,
-        true_cost_per_hat: calculated.trueCostPerPiece,
-        total_price: calculated.totalPrice,
-        setup_fee: calculated.setupFee,
-        best_yield: calculated.bestYield,
-        effective_yield: calculated.effectiveYield,
-        tier_prices_json: calculated.tier_prices_json,
-        quote_sms: calculated.quote_sms,
-        quote_dm: calculated.quote_dm,
-        quote_phone: calculated.quotePhone,
         status: body.status || 'draft'
       }
+      for (const field of QUOTE_INPUT_COLUMNS) {
+        const value = body[field]
+        if (value !== null && value !== undefined && value !== '') quoteToSave[field] = value
+      }
+      Object.assign(quoteToSave, repricedFields(calculated))
 
       const { data, error } = await supabase
         .from('quotes')
@@ -348,6 +769,16 @@ export async function POST(request) {
         .single()
 
       if (error) throw error
+
+      // Revision-0 snapshot for later re-quotes. The quote is already saved;
+      // without it (e.g. supabase-quote-revisions.sql not applied yet) its
+      // revisions are rebuilt from the quote row instead
+      try {
+        await recordQuoteBase(supabase, user.id, data.id, inputSnapshot(body), shopSettings, material, calculated)
+      } catch (snapshotError) {
+        console.error('Could not record quote revision snapshot:', snapshotError)
+      }
+
       return handleCORS(NextResponse.json(data))
     }
 
@@ -419,6 +850,7 @@ export async function PATCH(request) {
         .eq('user_id', user.id)
 
       if (error) throw error
+      invalidateQuoteCache(user.id)
       return handleCORS(NextResponse.json({ success: true }))
     }
 
@@ -435,73 +867,47 @@ export async function PATCH(request) {
       return handleCORS(NextResponse.json({ success: true }))
     }
 
-    // Update quote status
-    if (path.match(/quotes\/.*\/status/)) {
-      const quoteId = path.split('/')[1]
-      const { status } = body
-
-      const { error } = await supabase
-        .from('quotes')
-        .update({ status })
-        .eq('id', quoteId)
-        .eq('user_id', user.id)
-
-      if (error) throw error
-
-      // If marking as paid, get profit first allocations
-      if (status === 'paid') {
-        const { data: quote } = await supabase
-          .from('quotes')
-          .select('total_price')
-          .eq('id', quoteId)
-          .single()
-
-        const { data: profitFirstSettings } = await supabase
-          .from('profit_first_settings')
-          .select('*')
-          .eq('user_id', user.id)
-          .single()
+    // Bulk update quote status: { ids: [...], status }
+    if (path === 'quotes/status' || path === 'finished-hat-quotes/status') {
+      const table = path === 'quotes/status' ? 'quotes' : 'finished_hat_quotes'
+      const { ids, status } = body
 
-        if (quote && profitFirstSettings) {
-          const allocations = calculateProfitFirstAllocations(quote.total_price, profitFirstSettings)
-          return handleCORS(NextResponse.json({ success: true, allocations }))
-        }
+      if (!Array.isArray(ids) || ids.length === 0) {
+        return handleCORS(NextResponse.json({ error: 'ids must be a non-empty array' }, { status: 400 }))
+      }
+      if (ids.length > MAX_BULK_STATUS_IDS) {
+        return handleCORS(NextResponse.json({ error: `At most ${MAX_BULK_STATUS_IDS} ids per request` }, { status: 400 }))
+      }
+      if (!QUOTE_STATUSES.includes(status)) {
+        return handleCORS(NextResponse.json({ error: `status must be one of ${QUOTE_STATUSES.join(', ')}` }, { status: 400 }))
       }
 
-      return handleCORS(NextResponse.json({ success: true }))
+      const { updated, allocations } = await updateQuoteStatuses(supabase, user.id, table, ids, status)
+      const updatedIds = new Set(updated.map(q => q.id))
+
+      return handleCORS(NextResponse.json({
+        success: true,
+        updated: updated.length,
+        notFound: ids.filter(id => !updatedIds.has(id)),
+        ...(allocations && { allocations: allocations.perQuote, totals: allocations.totals })
+      }))
     }
 
-    // Update finished hat quote status
-    if (path.match(/finished-hat-quotes\/.*\/status/)) {
-      const quoteId = path.split('/')[1]
+    // Update single quote / finished hat quote status
+    const statusMatch = path.match(/^(quotes|finished-hat-quotes)\/([^/]+)\/status$/)
+    if (statusMatch) {
+      const table = statusMatch[1] === 'quotes' ? 'quotes' : 'finished_hat_quotes'
+      const quoteId = statusMatch[2]
       const { status } = body
 
-      const { error } = await supabase
-        .from('finished_hat_quotes')
-        .update({ status })
-        .eq('id', quoteId)
-        .eq('user_id', user.id)
-
-      if (error) throw error
+      if (!QUOTE_STATUSES.includes(status)) {
+        return handleCORS(NextResponse.json({ error: `status must be one of ${QUOTE_STATUSES.join(', ')}` }, { status: 400 }))
+      }
 
-      // If marking as paid, get profit first allocations
-      if (status === 'paid') {
-        const { data: quote } = await supabase
-          .from('finished_hat_quotes')
-          .select('total_price')
-          .eq('id', quoteId)
-          .single()
+      const { updated, allocations } = await updateQuoteStatuses(supabase, user.id, table, [quoteId], status)
 
-        const { data: profitFirstSettings } = await supabase
-          .from('profit_first_settings')
-          .select('*')
-          .eq('user_id', user.id)
-          .single()
-
-        if (quote && profitFirstSettings) {
-          const allocations = calculateProfitFirstAllocations(quote.total_price, profitFirstSettings)
-          return handleCORS(NextResponse.json({ success: true, allocations }))
-        }
+      if (updated.length > 0 && allocations) {
+        return handleCORS(NextResponse.json({ success: true, allocations: allocations.perQuote[0].allocations }))
       }
 
       return handleCORS(NextResponse.json({ success: true }))
@@ -536,6 +942,7 @@ export async function DELETE(request) {
         .eq('user_id', user.id)
 
       if (error) throw error
+      invalidateQuoteCache(user.id)
       return handleCORS(NextResponse.json({ success: true }))
     }
 
@@ -1,34 +1,43 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
 import { Input } from '@/components/ui/input'
 import { Label } from '@/components/ui/label'
 import { Textarea } from '@/components/ui/textarea'
 import { useToast } from '@/hooks/use-toast'
-import { Plus, Edit2, Trash2, Save, X } from 'lucide-react'
+import { Plus, Edit2, Trash2, Save, X, Search } from 'lucide-react'
 
 export default function Customers() {
   const [customers, setCustomers] = useState([])
   const [loading, setLoading] = useState(true)
   const [editing, setEditing] = useState(null)
   const [adding, setAdding] = useState(false)
+  const [search, setSearch] = useState('')
+  const latestRequest = useRef(0)
   const { toast } = useToast()
 
   const emptyCustomer = { name: '', email: '', phone: '', notes: '' }
   const [newCustomer, setNewCustomer] = useState(emptyCustomer)
 
+  // Full list when the search box is empty, server-side search otherwise
   useEffect(() => {
-    loadCustomers()
-  }, [])
+    const timer = setTimeout(() => loadCustomers(search), search.trim() ? 150 : 0)
+    return () => clearTimeout(timer)
+  }, [search])
 
-  async function loadCustomers() {
+  async function loadCustomers(query = search) {
+    const term = query.trim()
+    const requestId = ++latestRequest.current
     try {
-      const response = await fetch('/api?path=customers')
+      const response = await fetch(term
+        ? `/api?path=customers/search&q=${encodeURIComponent(term)}&limit=50`
+        : '/api?path=customers')
       if (response.ok) {
         const data = await response.json()
-        setCustomers(data)
+        // Ignore responses for queries the user has already typed past
+        if (requestId === latestRequest.current) setCustomers(data)
       }
     } catch (error) {
       console.error('Error loading customers:', error)
@@ -107,6 +116,16 @@ export default function Customers() {
         </Button>
       </div>
 
+      <div className="relative max-w-md">
+        <Search className="w-4 h-4 absolute left-3 top-3 text-gray-400" />
+        <Input
+          className="pl-9"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+          placeholder="Search name, email or phone"
+        />
+      </div>
+
       {/* Add New Customer Form */}
       {adding && (
         <Card className="border-purple-200 bg-purple-50">
@@ -1,46 +1,22 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState } from 'react'
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
 import { Badge } from '@/components/ui/badge'
 import { DollarSign, TrendingUp, Package, Plus } from 'lucide-react'
 import { useToast } from '@/hooks/use-toast'
+import { useApiData } from '@/hooks/use-api-data'
 
 export default function Dashboard() {
-  const [shopSettings, setShopSettings] = useState(null)
-  const [quotes, setQuotes] = useState([])
-  const [loading, setLoading] = useState(true)
+  const settingsQuery = useApiData('shop-settings')
+  const quotesQuery = useApiData('quotes')
+  const shopSettings = settingsQuery.data || null
+  const quotes = Array.isArray(quotesQuery.data) ? quotesQuery.data : []
+  const loading = settingsQuery.loading || quotesQuery.loading
   const [quoteTypeFilter, setQuoteTypeFilter] = useState('all')
   const { toast } = useToast()
 
-  useEffect(() => {
-    loadData()
-  }, [])
-
-  async function loadData() {
-    try {
-      const [settingsRes, quotesRes] = await Promise.all([
-        fetch('/api?path=shop-settings'),
-        fetch('/api?path=quotes')
-      ])
-
-      if (settingsRes.ok) {
-        const settings = await settingsRes.json()
-        setShopSettings(settings)
-      }
-
-      if (quotesRes.ok) {
-        const quotesData = await quotesRes.json()
-        setQuotes(quotesData)
-      }
-    } catch (error) {
-      console.error('Error loading dashboard:', error)
-    } finally {
-      setLoading(false)
-    }
-  }
-
   const calculateShopRate = () => {
     if (!shopSettings) return { shopRate: 0, minuteRate: 0 }
     const workableHoursMonth = shopSettings.workable_hours_per_week * 4.33
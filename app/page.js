@@ -9,16 +9,54 @@ import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/com
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs'
 import { Calculator, DollarSign, FileText, Settings, Users, Package, Plus, LogOut, Loader2 } from 'lucide-react'
 import { useToast } from '@/hooks/use-toast'
+import { clearApiCache, fetchApiData, invalidateApiData, loadApiData, setApiCacheOwner } from '@/lib/apiCache'
 import Link from 'next/link'
+import dynamic from 'next/dynamic'
 
-// Import all pages as components
-import OnboardingWizard from './onboarding-wizard'
-import Dashboard from './dashboard'
-import ShopSettings from './shop-settings'
-import PatchMaterials from './patch-materials'
-import Customers from './customers-page'
-import QuoteBuilder from './quote-builder'
-import ProfitFirst from './profit-first'
+function ViewLoading() {
+  return (
+    <div className="flex justify-center py-16">
+      <Loader2 className="w-8 h-8 animate-spin text-purple-600" />
+    </div>
+  )
+}
+
+// Each view is its own chunk, loaded the first time it is shown. The
+// import() calls must stay inline for the build to register the chunks.
+const OnboardingWizard = dynamic(() => import('./onboarding-wizard'), { loading: ViewLoading })
+const Dashboard = dynamic(() => import('./dashboard'), { loading: ViewLoading })
+const ShopSettings = dynamic(() => import('./shop-settings'), { loading: ViewLoading })
+const PatchMaterials = dynamic(() => import('./patch-materials'), { loading: ViewLoading })
+const Customers = dynamic(() => import('./customers-page'), { loading: ViewLoading })
+const QuoteBuilder = dynamic(() => import('./quote-builder'), { loading: ViewLoading })
+const ProfitFirst = dynamic(() => import('./profit-first'), { loading: ViewLoading })
+
+// Same modules, for prefetching a view's chunk on nav hover/focus
+const VIEW_MODULES = {
+  dashboard: () => import('./dashboard'),
+  customers: () => import('./customers-page'),
+  materials: () => import('./patch-materials'),
+  'shop-settings': () => import('./shop-settings'),
+  'profit-first': () => import('./profit-first'),
+  'quote-builder': () => import('./quote-builder')
+}
+
+const prefetchedViews = new Set()
+
+function prefetchView(id) {
+  if (prefetchedViews.has(id) || !VIEW_MODULES[id]) return
+  prefetchedViews.add(id)
+  VIEW_MODULES[id]().catch(() => prefetchedViews.delete(id))
+}
+
+function whenIdle(callback) {
+  if (typeof window.requestIdleCallback === 'function') {
+    const handle = window.requestIdleCallback(callback, { timeout: 2000 })
+    return () => window.cancelIdleCallback(handle)
+  }
+  const handle = setTimeout(callback, 200)
+  return () => clearTimeout(handle)
+}
 
 export default function App() {
   const [user, setUser] = useState(null)
@@ -40,6 +78,7 @@ export default function App() {
       async (event, session) => {
         setUser(session?.user || null)
         if (session?.user) {
+          setApiCacheOwner(session.user.id)
           loadShopSettings()
         }
       }
@@ -52,6 +91,7 @@ export default function App() {
     const { data: { session } } = await supabase.auth.getSession()
     setUser(session?.user || null)
     if (session?.user) {
+      setApiCacheOwner(session.user.id)
       await loadShopSettings()
     }
     setLoading(false)
@@ -59,11 +99,17 @@ export default function App() {
 
   async function loadShopSettings() {
     try {
-      const response = await fetch('/api?path=shop-settings')
-      if (response.ok) {
-        const data = await response.json()
-        setShopSettings(data)
-      }
+      // Cached (possibly persisted) settings render at once; fresh ones follow
+      await loadApiData('shop-settings', setShopSettings)
+    } catch (error) {
+      console.error('Error loading shop settings:', error)
+    }
+  }
+
+  async function handleOnboardingComplete() {
+    invalidateApiData('shop-settings', 'patch-materials', 'profit-first')
+    try {
+      setShopSettings(await fetchApiData('shop-settings'))
     } catch (error) {
       console.error('Error loading shop settings:', error)
     }
@@ -104,9 +150,21 @@ export default function App() {
     }
   }
 
+  // Once the shell is up, warm the quote builder (chunk + materials) so it
+  // opens without a network wait on a shop-floor tablet
+  const shellReady = Boolean(user && shopSettings)
+  useEffect(() => {
+    if (!shellReady) return
+    return whenIdle(() => {
+      prefetchView('quote-builder')
+      loadApiData('patch-materials').catch(() => {})
+    })
+  }, [shellReady])
+
   async function handleSignOut() {
     await fetch('/api?path=auth/signout', { method: 'POST' })
     await supabase.auth.signOut()
+    await clearApiCache()
     setUser(null)
     setShopSettings(null)
     setCurrentPage('dashboard')
@@ -192,7 +250,7 @@ export default function App() {
 
   // Show onboarding if no shop settings
   if (!shopSettings) {
-    return <OnboardingWizard onComplete={loadShopSettings} />
+    return <OnboardingWizard onComplete={handleOnboardingComplete} />
   }
 
   // Main app with navigation
@@ -234,6 +292,9 @@ export default function App() {
               <button
                 key={id}
                 onClick={() => setCurrentPage(id)}
+                onMouseEnter={() => prefetchView(id)}
+                onFocus={() => prefetchView(id)}
+                onTouchStart={() => prefetchView(id)}
                 className={`flex items-center space-x-2 px-4 py-2 rounded-lg whitespace-nowrap transition-colors ${
                   currentPage === id
                     ? 'bg-purple-100 text-purple-700 font-medium'
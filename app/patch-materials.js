@@ -1,11 +1,12 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
 import { Input } from '@/components/ui/input'
 import { Label } from '@/components/ui/label'
 import { useToast } from '@/hooks/use-toast'
+import { invalidateApiData, loadApiData } from '@/lib/apiCache'
 import { Plus, Edit2, Trash2, Save, X } from 'lucide-react'
 
 export default function PatchMaterials() {
@@ -13,6 +14,8 @@ export default function PatchMaterials() {
   const [loading, setLoading] = useState(true)
   const [editing, setEditing] = useState(null)
   const [adding, setAdding] = useState(false)
+  const editingRef = useRef(null)
+  editingRef.current = editing
   const { toast } = useToast()
 
   const emptyMaterial = {
@@ -32,11 +35,10 @@ export default function PatchMaterials() {
 
   async function loadMaterials() {
     try {
-      const response = await fetch('/api?path=patch-materials')
-      if (response.ok) {
-        const data = await response.json()
-        setMaterials(data)
-      }
+      // A background revalidation must not overwrite a row being edited
+      await loadApiData('patch-materials', data => {
+        if (editingRef.current === null) setMaterials(data)
+      })
     } catch (error) {
       console.error('Error loading materials:', error)
     } finally {
@@ -54,6 +56,7 @@ export default function PatchMaterials() {
 
       if (!response.ok) throw new Error('Failed to add material')
 
+      invalidateApiData('patch-materials')
       toast({ title: 'Material added successfully!' })
       setNewMaterial(emptyMaterial)
       setAdding(false)
@@ -74,6 +77,7 @@ export default function PatchMaterials() {
 
       if (!response.ok) throw new Error('Failed to update material')
 
+      invalidateApiData('patch-materials')
       toast({ title: 'Material updated!' })
       setEditing(null)
     } catch (error) {
@@ -88,6 +92,7 @@ export default function PatchMaterials() {
       const response = await fetch(`/api?path=patch-materials/${id}`, { method: 'DELETE' })
       if (!response.ok) throw new Error('Failed to delete')
 
+      invalidateApiData('patch-materials')
       toast({ title: 'Material deleted' })
       loadMaterials()
     } catch (error) {
@@ -7,9 +7,22 @@ import { Input } from '@/components/ui/input'
 import { Label } from '@/components/ui/label'
 import { useToast } from '@/hooks/use-toast'
 import { Save } from 'lucide-react'
+import { formatMoney } from '@/lib/format'
+
+// Months of ledger history shown (the total row covers only these)
+const LEDGER_MONTHS = 12
+
+const LEDGER_BUCKETS = [
+  { key: 'profit', label: 'Profit' },
+  { key: 'tax', label: 'Tax' },
+  { key: 'owner_pay', label: 'Owner Pay' },
+  { key: 'ops', label: 'Ops' },
+  { key: 'buffer', label: 'Buffer' }
+]
 
 export default function ProfitFirst() {
   const [settings, setSettings] = useState(null)
+  const [ledger, setLedger] = useState([])
   const [loading, setLoading] = useState(true)
   const [saving, setSaving] = useState(false)
   const { toast } = useToast()
@@ -20,10 +33,16 @@ export default function ProfitFirst() {
 
   async function loadSettings() {
     try {
-      const response = await fetch('/api?path=profit-first-settings')
-      if (response.ok) {
-        const data = await response.json()
-        setSettings(data)
+      const [settingsRes, ledgerRes] = await Promise.all([
+        fetch('/api?path=profit-first-settings'),
+        fetch(`/api?path=profit-first/ledger&months=${LEDGER_MONTHS}`)
+      ])
+      if (settingsRes.ok) {
+        setSettings(await settingsRes.json())
+      }
+      if (ledgerRes.ok) {
+        const data = await ledgerRes.json()
+        setLedger(Array.isArray(data) ? data : [])
       }
     } catch (error) {
       console.error('Error loading settings:', error)
@@ -66,6 +85,13 @@ export default function ProfitFirst() {
 
   const total = settings.profit_pct + settings.tax_pct + settings.owner_pay_pct + settings.ops_pct + settings.buffer_pct
 
+  const ledgerTotals = ledger.reduce((acc, month) => {
+    for (const bucket of ['revenue', ...LEDGER_BUCKETS.map(b => b.key)]) {
+      acc[bucket] = (acc[bucket] || 0) + Number(month[bucket] || 0)
+    }
+    return acc
+  }, {})
+
   return (
     <div className="space-y-6">
       <div className="flex items-center justify-between">
@@ -164,6 +190,52 @@ export default function ProfitFirst() {
           </CardContent>
         </Card>
       </div>
+
+      <Card>
+        <CardHeader>
+          <CardTitle>Monthly Totals</CardTitle>
+        </CardHeader>
+        <CardContent>
+          {ledger.length === 0 ? (
+            <p className="text-sm text-gray-600">No paid quotes yet. Allocations appear here when a quote is marked paid.</p>
+          ) : (
+            <div className="overflow-x-auto">
+              <table className="w-full text-sm tabular-nums">
+                <thead>
+                  <tr className="text-left text-gray-600 border-b">
+                    <th className="py-2 pr-4">Month</th>
+                    <th className="py-2 pr-4 text-right">Revenue</th>
+                    {LEDGER_BUCKETS.map(b => (
+                      <th key={b.key} className="py-2 pr-4 text-right">{b.label}</th>
+                    ))}
+                  </tr>
+                </thead>
+                <tbody>
+                  {ledger.map(month => (
+                    <tr key={month.month} className="border-b">
+                      <td className="py-2 pr-4">
+                        {new Date(`${month.month}T00:00:00`).toLocaleDateString('en-US', { month: 'short', year: 'numeric' })}
+                        <span className="text-gray-500 ml-1">({month.paid_count})</span>
+                      </td>
+                      <td className="py-2 pr-4 text-right">{formatMoney(month.revenue)}</td>
+                      {LEDGER_BUCKETS.map(b => (
+                        <td key={b.key} className="py-2 pr-4 text-right">{formatMoney(month[b.key])}</td>
+                      ))}
+                    </tr>
+                  ))}
+                  <tr className="font-bold">
+                    <td className="py-2 pr-4">Last {LEDGER_MONTHS} months</td>
+                    <td className="py-2 pr-4 text-right">{formatMoney(ledgerTotals.revenue)}</td>
+                    {LEDGER_BUCKETS.map(b => (
+                      <td key={b.key} className="py-2 pr-4 text-right">{formatMoney(ledgerTotals[b.key])}</td>
+                    ))}
+                  </tr>
+                </tbody>
+              </table>
+            </div>
+          )}
+        </CardContent>
+      </Card>
     </div>
   )
 }
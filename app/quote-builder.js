@@ -1,12 +1,14 @@
 'use client'
 
-import { useState, useEffect, useCallback } from 'react'
+import { useState, useEffect, useCallback, useRef } from 'react'
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
 import { Input } from '@/components/ui/input'
 import { Label } from '@/components/ui/label'
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select'
 import { useToast } from '@/hooks/use-toast'
+import { invalidateApiData, loadApiData } from '@/lib/apiCache'
+import { formatMoney, formatPct, roundToCents } from '@/lib/format'
 import { Calculator, Copy, Check, DollarSign, Loader2, Package, Eye, EyeOff, Save, ChevronDown, RefreshCw } from 'lucide-react'
 import { Badge } from '@/components/ui/badge'
 import { Tabs, TabsList, TabsTrigger } from '@/components/ui/tabs'
@@ -16,26 +18,6 @@ import { Collapsible, CollapsibleContent, CollapsibleTrigger } from '@/component
 // PRICING ENGINE - Cost-Based Only
 // ============================================
 
-function roundToCents(n) {
-  if (n === null || n === undefined || isNaN(n)) return 0
-  return Math.round((n + Number.EPSILON) * 100) / 100
-}
-
-function formatMoney(n) {
-  const rounded = roundToCents(n)
-  return new Intl.NumberFormat('en-US', {
-    style: 'currency',
-    currency: 'USD',
-    minimumFractionDigits: 2,
-    maximumFractionDigits: 2
-  }).format(rounded)
-}
-
-function formatPct(n) {
-  if (n === null || n === undefined || isNaN(n)) return '0.0%'
-  return `${roundToCents(n).toFixed(1)}%`
-}
-
 const TIER_RANGES = [
   { key: '1-23', rangeLabel: '1–23', startQty: 1, endQty: 23 },
   { key: '24-47', rangeLabel: '24–47', startQty: 24, endQty: 47 },
@@ -247,13 +229,120 @@ function computeQuote(quoteInputs, shopSettings, material) {
   }
 }
 
+// ============================================
+// CUSTOMER PICKER - server-side typeahead
+// ============================================
+
+const CUSTOMER_SEARCH_DEBOUNCE_MS = 150
+
+function CustomerPicker({ value, onChange }) {
+  const [query, setQuery] = useState('')
+  const [results, setResults] = useState([])
+  const [open, setOpen] = useState(false)
+  const [searching, setSearching] = useState(false)
+  const requestRef = useRef(null)
+  // Customer id whose name the box currently shows
+  const shownIdRef = useRef(null)
+
+  // Follow value set from outside (a quote loaded with a customer, a reset):
+  // show that customer's name, or clear the box
+  useEffect(() => {
+    if (value === shownIdRef.current) return
+    if (!value) {
+      shownIdRef.current = null
+      setQuery('')
+      return
+    }
+
+    let cancelled = false
+    fetch(`/api?path=customers/${value}`)
+      .then(response => (response.ok ? response.json() : null))
+      .then(customer => {
+        if (cancelled || !customer) return
+        shownIdRef.current = value
+        setQuery(customer.name)
+      })
+      .catch(error => console.error('Customer load error:', error))
+    return () => { cancelled = true }
+  }, [value])
+
+  // Debounced search; a newer keystroke aborts the in-flight request
+  useEffect(() => {
+    if (!open) return
+    const timer = setTimeout(async () => {
+      requestRef.current?.abort()
+      const controller = new AbortController()
+      requestRef.current = controller
+      setSearching(true)
+      try {
+        const response = await fetch(`/api?path=customers/search&q=${encodeURIComponent(query.trim())}&limit=8`, {
+          signal: controller.signal
+        })
+        if (response.ok) setResults(await response.json())
+      } catch (error) {
+        if (error.name !== 'AbortError') console.error('Customer search error:', error)
+      } finally {
+        if (requestRef.current === controller) setSearching(false)
+      }
+    }, CUSTOMER_SEARCH_DEBOUNCE_MS)
+    return () => clearTimeout(timer)
+  }, [query, open])
+
+  const select = (customer) => {
+    shownIdRef.current = customer ? customer.id : null
+    onChange(customer ? customer.id : null)
+    setQuery(customer ? customer.name : '')
+    setOpen(false)
+  }
+
+  return (
+    <div className="relative mt-1">
+      <Input
+        value={query}
+        placeholder="Search name, email or phone"
+        onFocus={() => setOpen(true)}
+        onBlur={() => setTimeout(() => setOpen(false), 150)}
+        onChange={(e) => {
+          setQuery(e.target.value)
+          setOpen(true)
+          if (value) {
+            // Typing over a selection clears it but keeps the typed text
+            shownIdRef.current = null
+            onChange(null)
+          }
+        }}
+      />
+      {searching && <Loader2 className="w-4 h-4 animate-spin absolute right-2 top-3 text-gray-400" />}
+      {open && (
+        <div className="absolute z-20 mt-1 w-full bg-white border rounded shadow-lg max-h-64 overflow-y-auto text-sm">
+          <button className="w-full text-left px-3 py-2 text-gray-500 hover:bg-gray-50" onMouseDown={() => select(null)}>
+            — No customer —
+          </button>
+          {results.map(c => (
+            <button
+              key={c.id}
+              className={`w-full text-left px-3 py-2 hover:bg-purple-50 ${c.id === value ? 'font-semibold' : ''}`}
+              onMouseDown={() => select(c)}
+            >
+              {c.name}
+              <span className="text-xs text-gray-500 ml-2">{[c.email, c.phone].filter(Boolean).join(' • ')}</span>
+            </button>
+          ))}
+          {!searching && results.length === 0 && query.trim() && (
+            <div className="px-3 py-2 text-gray-400">No matches</div>
+          )}
+        </div>
+      )}
+    </div>
+  )
+}
+
 // ============================================
 // QUOTE BUILDER COMPONENT
 // ============================================
 
 export default function QuoteBuilder() {
   const [materials, setMaterials] = useState([])
-  const [customers, setCustomers] = useState([])
   const [shopSettings, setShopSettings] = useState(null)
   const [saving, setSaving] = useState(false)
   const [results, setResults] = useState(null)
@@ -261,6 +350,12 @@ export default function QuoteBuilder() {
   const [viewMode, setViewMode] = useState('shop') // 'shop' = Cost view, 'customer' = Wholesale/Net view
   const [advancedOpen, setAdvancedOpen] = useState(false)
   const [loading, setLoading] = useState(true)
+  const [comparison, setComparison] = useState(null)
+  const [comparing, setComparing] = useState(false)
+  // After the first save, saving again revises that quote instead of creating a new one
+  const [savedQuote, setSavedQuote] = useState(null)
+  // Bumped on reset so the customer picker drops any half-typed search
+  const [customerPickerKey, setCustomerPickerKey] = useState(0)
   const { toast } = useToast()
 
   const [formData, setFormData] = useState({
@@ -287,28 +382,20 @@ export default function QuoteBuilder() {
   useEffect(() => {
     async function loadData() {
       try {
-        const [mRes, cRes, sRes] = await Promise.all([
-          fetch('/api?path=patch-materials'),
-          fetch('/api?path=customers'),
-          fetch('/api?path=shop-settings')
+        // Customers are searched on demand (CustomerPicker), not loaded here.
+        // Cached materials/settings come back at once; revalidated copies
+        // replace them without touching the form defaults set below.
+        const [mats, settings] = await Promise.all([
+          loadApiData('patch-materials', data => setMaterials(Array.isArray(data) ? data : [])).catch(() => []),
+          loadApiData('shop-settings', setShopSettings).catch(() => null)
         ])
 
-        let mats = [], custs = [], settings = null
-
-        if (mRes.ok) mats = await mRes.json()
-        if (cRes.ok) custs = await cRes.json()
-        if (sRes.ok) settings = await sRes.json()
-
-        setMaterials(Array.isArray(mats) ? mats : [])
-        setCustomers(Array.isArray(custs) ? custs : [])
-        setShopSettings(settings)
-
         const savedQuoteType = typeof window !== 'undefined' ? localStorage.getItem('default_quote_type') : null
         
         setFormData(prev => ({
           ...prev,
           quote_type: savedQuoteType || prev.quote_type,
-          patch_material_id: mats[0]?.id || '',
+          patch_material_id: (Array.isArray(mats) && mats[0]?.id) || '',
           waste_pct: settings?.default_waste_pct ?? prev.waste_pct,
           apply_minutes_per_hat: settings?.default_apply_minutes_per_hat ?? prev.apply_minutes_per_hat,
           proof_minutes: settings?.default_proof_minutes ?? prev.proof_minutes,
@@ -317,6 +404,8 @@ export default function QuoteBuilder() {
         }))
 
         setLoading(false)
+        // Shows under Timings in DevTools; compare with startup_budget.js
+        performance.mark('quote-builder-ready')
       } catch (error) {
         console.error('Load error:', error)
         setLoading(false)
@@ -345,6 +434,8 @@ export default function QuoteBuilder() {
   }, [formData, loading, recalculate])
 
   const updateField = (field, value) => {
+    // Comparison rows are priced for the current inputs; switching material keeps them
+    if (field !== 'patch_material_id') setComparison(null)
     setFormData(prev => {
       const newData = { ...prev, [field]: value }
       if (field === 'quote_type' && typeof window !== 'undefined') {
@@ -354,15 +445,57 @@ export default function QuoteBuilder() {
     })
   }
 
+  // Form state -> API body (the server reads the *_input size fields)
+  const quotePayload = (extra = {}) => ({
+    ...formData,
+    patch_width_input: formData.patch_width,
+    patch_height_input: formData.patch_height,
+    ...extra
+  })
+
+  // Next save creates a new quote: keep the inputs, clear the customer
+  function startNewQuote() {
+    setSavedQuote(null)
+    updateField('customer_id', null)
+    setCustomerPickerKey(key => key + 1)
+  }
+
   async function handleSave(status = 'draft') {
     setSaving(true)
     try {
+      if (savedQuote) {
+        const response = await fetch(`/api?path=quotes/${savedQuote.id}/revisions`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify(quotePayload())
+        })
+        const revision = await response.json()
+        if (!response.ok) throw new Error(revision.error || 'Save failed')
+
+        if (status !== 'draft') {
+          const statusRes = await fetch(`/api?path=quotes/${savedQuote.id}/status`, {
+            method: 'PATCH',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ status })
+          })
+          if (!statusRes.ok) throw new Error('Status update failed')
+        }
+
+        setSavedQuote({ id: savedQuote.id, revision: revision.revision })
+        invalidateApiData('quotes')
+        toast({ title: `Revision ${revision.revision} saved`, description: `Status: ${status}` })
+        return
+      }
+
       const response = await fetch('/api?path=quotes', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ ...formData, status })
+        body: JSON.stringify(quotePayload({ status }))
       })
       if (!response.ok) throw new Error('Save failed')
+      const saved = await response.json()
+      setSavedQuote({ id: saved.id, revision: 0 })
+      invalidateApiData('quotes')
       toast({ title: 'Quote saved!', description: `Status: ${status}` })
     } catch (error) {
       toast({ title: 'Error', description: error.message, variant: 'destructive' })
@@ -371,6 +504,25 @@ export default function QuoteBuilder() {
     }
   }
 
+  // Price the current quote against every material in one server call
+  async function handleCompare() {
+    setComparing(true)
+    try {
+      const response = await fetch('/api?path=quotes/compare', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(quotePayload())
+      })
+      const data = await response.json()
+      if (!response.ok) throw new Error(data.error || 'Compare failed')
+      setComparison(data)
+    } catch (error) {
+      toast({ title: 'Error', description: error.message, variant: 'destructive' })
+    } finally {
+      setComparing(false)
+    }
+  }
+
   const copyToClipboard = async (text, key) => {
     try {
       await navigator.clipboard.writeText(text)
@@ -482,13 +634,11 @@ export default function QuoteBuilder() {
               </div>
               <div>
                 <Label className="text-sm">Customer (optional)</Label>
-                <Select value={formData.customer_id || 'none'} onValueChange={(v) => updateField('customer_id', v === 'none' ? null : v)}>
-                  <SelectTrigger className="mt-1"><SelectValue placeholder="Select customer" /></SelectTrigger>
-                  <SelectContent>
-                    <SelectItem value="none">— No customer —</SelectItem>
-                    {customers.map(c => <SelectItem key={c.id} value={c.id}>{c.name}</SelectItem>)}
-                  </SelectContent>
-                </Select>
+                <CustomerPicker
+                  key={customerPickerKey}
+                  value={formData.customer_id}
+                  onChange={(id) => updateField('customer_id', id)}
+                />
               </div>
             </CardContent>
           </Card>
@@ -509,7 +659,46 @@ export default function QuoteBuilder() {
                     ))}
                   </SelectContent>
                 </Select>
+                {materials.length > 1 && (
+                  <Button variant="outline" size="sm" className="mt-2" onClick={handleCompare} disabled={comparing}>
+                    {comparing ? <Loader2 className="w-4 h-4 mr-1 animate-spin" /> : <Package className="w-4 h-4 mr-1" />}
+                    Compare all materials
+                  </Button>
+                )}
               </div>
+              {comparison && (
+                <div className="overflow-x-auto border rounded">
+                  <table className="w-full text-xs tabular-nums">
+                    <thead>
+                      <tr className="text-left text-gray-500 border-b bg-gray-50">
+                        <th className="py-1 px-2">Material ({comparison.qty} @ {formatMoney(comparison.publishedPerPiece)})</th>
+                        <th className="py-1 px-2 text-right">Yield</th>
+                        <th className="py-1 px-2 text-right">Cost/{unitLabel}</th>
+                        <th className="py-1 px-2 text-right">Net</th>
+                        <th className="py-1 px-2 text-right">Margin</th>
+                      </tr>
+                    </thead>
+                    <tbody>
+                      {comparison.materials.map(row => (
+                        <tr
+                          key={row.materialId}
+                          className={`border-b cursor-pointer hover:bg-purple-50 ${row.materialId === formData.patch_material_id ? 'font-semibold' : ''}`}
+                          onClick={() => updateField('patch_material_id', row.materialId)}
+                        >
+                          <td className="py-1 px-2">
+                            {row.name}
+                            {row.materialId === comparison.cheapestMaterialId && <Badge className="ml-1 bg-green-600 text-[10px] px-1 py-0">Lowest cost</Badge>}
+                          </td>
+                          <td className="py-1 px-2 text-right font-mono">{row.bestYield}</td>
+                          <td className={`py-1 px-2 text-right font-mono ${row.belowCost ? 'text-red-600' : ''}`}>{formatMoney(row.costPerPiece)}</td>
+                          <td className="py-1 px-2 text-right font-mono">{formatMoney(row.wholesalePerPiece)}</td>
+                          <td className="py-1 px-2 text-right font-mono">{row.marginPct}%</td>
+                        </tr>
+                      ))}
+                    </tbody>
+                  </table>
+                </div>
+              )}
               <div className="grid grid-cols-2 gap-4">
                 <div>
                   <Label className="text-sm font-semibold">Patches per Sheet</Label>
@@ -834,6 +1023,14 @@ export default function QuoteBuilder() {
                   Mark Sent
                 </Button>
               </div>
+              {savedQuote && (
+                <div className="flex items-center justify-between text-xs text-gray-500">
+                  <span>Saving adds a revision (current: rev {savedQuote.revision})</span>
+                  <button className="text-purple-600 hover:underline" onClick={startNewQuote}>
+                    Start new quote
+                  </button>
+                </div>
+              )}
             </>
           ) : (
             <Card>
@@ -1,11 +1,12 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
 import { Input } from '@/components/ui/input'
 import { Label } from '@/components/ui/label'
 import { useToast } from '@/hooks/use-toast'
+import { invalidateApiData, loadApiData } from '@/lib/apiCache'
 import { Save, Loader2, Info } from 'lucide-react'
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs'
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select'
@@ -15,6 +16,9 @@ export default function ShopSettings() {
   const [settings, setSettings] = useState(null)
   const [loading, setLoading] = useState(true)
   const [saving, setSaving] = useState(false)
+  const [repricing, setRepricing] = useState(null)
+  // Set once the user edits; a background revalidation then leaves the form alone
+  const dirty = useRef(false)
   const { toast } = useToast()
 
   useEffect(() => {
@@ -23,9 +27,8 @@ export default function ShopSettings() {
 
   async function loadSettings() {
     try {
-      const response = await fetch('/api?path=shop-settings')
-      if (response.ok) {
-        const data = await response.json()
+      await loadApiData('shop-settings', data => {
+        if (dirty.current) return
         // Initialize with defaults if needed
         setSettings({
           // Capacity
@@ -65,7 +68,7 @@ export default function ShopSettings() {
           },
           ...data
         })
-      }
+      })
     } catch (error) {
       console.error('Error loading settings:', error)
     } finally {
@@ -82,12 +85,13 @@ export default function ShopSettings() {
         body: JSON.stringify(settings)
       })
 
-      if (!response.ok) {
-        const err = await response.json()
-        throw new Error(err.error || 'Save failed')
-      }
+      const data = await response.json()
+      if (!response.ok) throw new Error(data.error || 'Save failed')
 
+      dirty.current = false
+      invalidateApiData('shop-settings')
       toast({ title: 'Settings saved!' })
+      if (data.repricingJob) watchRepricing(data.repricingJob.id)
     } catch (error) {
       toast({ title: 'Error', description: error.message, variant: 'destructive' })
     } finally {
@@ -95,17 +99,43 @@ export default function ShopSettings() {
     }
   }
 
+  // Poll the background re-pricing job until it settles
+  async function watchRepricing(jobId) {
+    try {
+      const response = await fetch(`/api?path=repricing-jobs/${jobId}`)
+      if (!response.ok) return
+      const job = await response.json()
+      setRepricing(job)
+      if (job.status === 'pending' || job.status === 'running') {
+        setTimeout(() => watchRepricing(jobId), 1000)
+      } else if (job.status === 'completed') {
+        invalidateApiData('quotes')
+        toast({ title: 'Quotes re-priced', description: `${job.updated_count} draft/sent quotes updated` })
+      }
+    } catch (error) {
+      console.error('Error loading repricing job:', error)
+    }
+  }
+
+  async function resumeRepricing(jobId) {
+    const response = await fetch(`/api?path=repricing-jobs/${jobId}/resume`, { method: 'POST' })
+    if (response.ok) watchRepricing(jobId)
+  }
+
   const updateField = (field, value) => {
+    dirty.current = true
     setSettings(prev => ({ ...prev, [field]: value }))
   }
 
   const updateNumericField = (field, value) => {
     const num = parseFloat(value)
+    dirty.current = true
     setSettings(prev => ({ ...prev, [field]: isNaN(num) ? 0 : num }))
   }
   
   const updateLadderField = (ladderType, tier, value) => {
     const num = parseFloat(value)
+    dirty.current = true
     setSettings(prev => ({
       ...prev,
       [ladderType]: {
@@ -136,10 +166,24 @@ export default function ShopSettings() {
           <h2 className="text-3xl font-bold">Shop Settings</h2>
           <p className="text-gray-600">Configure rates, pricing, and published ladders</p>
         </div>
-        <Button onClick={handleSave} disabled={saving}>
-          {saving ? <Loader2 className="w-4 h-4 mr-2 animate-spin" /> : <Save className="w-4 h-4 mr-2" />}
-          Save Changes
-        </Button>
+        <div className="flex items-center gap-3">
+          {repricing && (repricing.status === 'pending' || repricing.status === 'running') && (
+            <span className="text-sm text-gray-600 tabular-nums">
+              <Loader2 className="w-3 h-3 mr-1 inline animate-spin" />
+              Re-pricing quotes {repricing.processed}/{repricing.total} ({repricing.progress}%)
+            </span>
+          )}
+          {repricing?.status === 'failed' && (
+            <span className="text-sm text-red-600">
+              Re-pricing stopped at {repricing.processed}/{repricing.total}
+              <button className="ml-2 underline" onClick={() => resumeRepricing(repricing.id)}>Resume</button>
+            </span>
+          )}
+          <Button onClick={handleSave} disabled={saving}>
+            {saving ? <Loader2 className="w-4 h-4 mr-2 animate-spin" /> : <Save className="w-4 h-4 mr-2" />}
+            Save Changes
+          </Button>
+        </div>
       </div>
 
       {/* Shop Rate Display */}
@@ -0,0 +1,135 @@
+#!/usr/bin/env node
+/**
+ * Pricing Engine Benchmark
+ * Measures per-call latency of the quote calculators
+ *
+ * Usage: node bench_pricing_engine.js [iterations] [--profile]
+ * --profile also runs computeQuote with engine profiling on and prints
+ * where the time goes per stage (and the profiling overhead)
+ */
+
+import {
+  computeQuote,
+  calculateCompleteQuote,
+  calculateFinishedHatQuote,
+  computeQuoteAcrossMaterials,
+  enableEngineProfiling,
+  disableEngineProfiling,
+  getEngineProfile,
+  ENGINE_STAGES
+} from './lib/pricingEngine.js';
+import { RESPONSE_PROFILES, serializeQuoteResult } from './lib/quoteProfiles.js';
+
+const ITERATIONS = parseInt(process.argv.slice(2).find(arg => /^\d+$/.test(arg)), 10) || 20000;
+const PROFILE = process.argv.includes('--profile');
+const WARMUP = Math.min(2000, ITERATIONS);
+
+const shopSettings = {
+  workable_hours_per_week: 40,
+  billable_efficiency_pct: 75,
+  monthly_overhead: 3000,
+  monthly_owner_pay_goal: 5000,
+  monthly_profit_goal: 2000,
+  default_pricing_method: 'markup',
+  default_markup_pct: 50,
+  default_margin_pct: 40,
+  setup_fee_default: 30,
+  setup_waive_qty: 24
+};
+
+const material = {
+  name: 'Standard Leatherette',
+  sheet_width: 12,
+  sheet_height: 24,
+  sheet_cost: 7
+};
+
+// Six materials, two sheet sizes
+const compareMaterials = [7, 8.5, 9, 11.5, 12, 14].map((sheet_cost, i) => ({
+  id: `m${i}`,
+  name: `Material ${i + 1}`,
+  sheet_width: 12,
+  sheet_height: i % 2 ? 12 : 24,
+  sheet_cost
+}));
+
+const patchQuote = {
+  quote_type: 'patch_press',
+  qty: 144,
+  patch_width_input: 3.25,
+  patch_height_input: 2.25,
+  waste_pct: 5,
+  machine_minutes_per_sheet: 12,
+  cleanup_minutes_per_sheet: 5,
+  apply_minutes_per_hat: 2,
+  proof_minutes: 5,
+  setup_minutes: 5,
+  packing_minutes: 5
+};
+
+const finishedHatQuote = {
+  hat_name: 'Richardson 112',
+  buy_qty: 144,
+  hat_unit_cost: 4.25,
+  shipping_per_hat: 0.35,
+  patch_cost_per_hat: 1.1,
+  apply_minutes_per_hat: 2,
+  proof_minutes: 5,
+  setup_minutes: 5,
+  packing_minutes: 5,
+  pricing_method: 'margin',
+  target_margin_pct: 40,
+  tier_quantities: [12, 24, 48, 96, 144, 288, 384, 768]
+};
+
+function bench(name, fn) {
+  // Vary qty so the JIT can't constant-fold the call away
+  let sink = 0;
+  for (let i = 0; i < WARMUP; i++) sink += fn(i).length || 1;
+
+  const start = process.hrtime.bigint();
+  for (let i = 0; i < ITERATIONS; i++) sink += fn(i).length || 1;
+  const elapsedNs = Number(process.hrtime.bigint() - start);
+
+  const usPerOp = elapsedNs / ITERATIONS / 1000;
+  const opsPerSec = Math.round(1e9 / (elapsedNs / ITERATIONS));
+  console.log(`${name.padEnd(32)} ${usPerOp.toFixed(2).padStart(8)} µs/op ${String(opsPerSec).padStart(10)} ops/s`);
+  return sink;
+}
+
+console.log(`📊 Pricing Engine Benchmark (${ITERATIONS} iterations)`);
+console.log("-".repeat(64));
+
+bench('computeQuote', i => computeQuote({ ...patchQuote, qty: 24 + (i % 600) }, shopSettings, material).tiers);
+bench('computeQuote (cents)', i => computeQuote({ ...patchQuote, qty: 24 + (i % 600) }, shopSettings, material, { money: 'cents' }).tiers);
+bench('calculateCompleteQuote', i => calculateCompleteQuote({ ...patchQuote, qty: 24 + (i % 600) }, shopSettings, material).tierMatrix);
+bench('computeQuoteAcrossMaterials (6)', i => computeQuoteAcrossMaterials({ ...patchQuote, qty: 24 + (i % 600) }, shopSettings, compareMaterials).materials);
+bench('calculateFinishedHatQuote', i => calculateFinishedHatQuote({ ...finishedHatQuote, buy_qty: 12 + (i % 600) }, shopSettings).tier_quote_text);
+
+console.log("-".repeat(64));
+const sample = calculateCompleteQuote(patchQuote, shopSettings, material);
+bench('JSON.stringify (full result)', () => JSON.stringify(sample));
+for (const profile of RESPONSE_PROFILES) {
+  const bytes = Buffer.byteLength(serializeQuoteResult(sample, profile));
+  bench(`serialize ${profile} (${bytes} B)`, () => serializeQuoteResult(sample, profile));
+}
+
+if (PROFILE) {
+  console.log("-".repeat(64));
+  enableEngineProfiling();
+  bench('computeQuote (profiling on)', i => computeQuote({ ...patchQuote, qty: 24 + (i % 600) }, shopSettings, material).tiers);
+  bench('computeQuoteAcrossMaterials (on)', i => computeQuoteAcrossMaterials({ ...patchQuote, qty: 24 + (i % 600) }, shopSettings, compareMaterials).materials);
+  const profile = getEngineProfile();
+  disableEngineProfiling();
+
+  console.log("-".repeat(64));
+  console.log(`${'Stage'.padEnd(16)}${'calls'.padStart(10)}${'mean µs'.padStart(10)}${'max µs'.padStart(10)}${'share'.padStart(9)}`);
+  for (const name of ENGINE_STAGES) {
+    const stage = profile.stages[name];
+    console.log(
+      `${name.padEnd(16)}${String(stage.count).padStart(10)}${(stage.meanMs * 1000).toFixed(2).padStart(10)}` +
+      `${(stage.maxMs * 1000).toFixed(0).padStart(10)}${`${stage.sharePct}%`.padStart(9)}`
+    );
+  }
+  console.log(`Per quote: ${profile.perQuote.yield} yield, ${profile.perQuote.costEvaluations} cost evaluations`);
+}
@@ -0,0 +1,28 @@
+"use client"
+import * as React from "react"
+import { fetchApiData, loadApiData, peekApiData, subscribeApiData } from "@/lib/apiCache"
+
+/**
+ * Read-only view of a cached API path: cached data first, then revalidated
+ * data, then any refetch triggered by invalidateApiData().
+ */
+export function useApiData(path) {
+  const [data, setData] = React.useState(() => (path ? peekApiData(path) : undefined))
+  const [error, setError] = React.useState(null)
+
+  React.useEffect(() => {
+    if (!path) return
+    let active = true
+    const deliver = next => { if (active) setData(next) }
+    const unsubscribe = subscribeApiData(path, deliver)
+    loadApiData(path, deliver).catch(err => { if (active) setError(err) })
+    return () => {
+      active = false
+      unsubscribe()
+    }
+  }, [path])
+
+  const refresh = React.useCallback(() => fetchApiData(path), [path])
+
+  return { data, error, loading: data === undefined && !error, refresh }
+}
@@ -0,0 +1,235 @@
+/**
+ * Patch Hat QuoteKit - Client Data Cache
+ * Shared cache for GET /api?path=... responses across every view.
+ *
+ * - Views asking for the same path at once share one request
+ * - Cached data is handed back immediately and revalidated in the
+ *   background once it is older than API_CACHE_FRESH_MS
+ * - Mutations call invalidateApiData(); invalidated entries are never served
+ *   again, and paths a mounted view is subscribed to are refetched
+ * - Shop settings and materials are persisted to IndexedDB per user, so a
+ *   reload opens with them while the network catches up
+ */
+
+export const API_CACHE_FRESH_MS = 30 * 1000
+export const PERSISTED_PATHS = ['shop-settings', 'patch-materials']
+
+const DB_NAME = 'patchquote-cache'
+const DB_STORE = 'responses'
+
+const entries = new Map()   // path -> { data, fetchedAt }
+const inFlight = new Map()  // path -> Promise
+const listeners = new Map() // path -> Set of callbacks
+const generations = new Map() // path -> bumped on invalidation
+let owner = null
+let hydration = null
+let dbPromise = null
+
+// =====================================================
+// INDEXEDDB PERSISTENCE
+// =====================================================
+
+function getDb() {
+  if (!dbPromise) {
+    dbPromise = new Promise(resolve => {
+      if (typeof indexedDB === 'undefined') return resolve(null)
+      const request = indexedDB.open(DB_NAME, 1)
+      request.onupgradeneeded = () => request.result.createObjectStore(DB_STORE)
+      request.onsuccess = () => resolve(request.result)
+      request.onerror = () => resolve(null)
+    })
+  }
+  return dbPromise
+}
+
+async function persist(userId, path, entry) {
+  if (!userId || !PERSISTED_PATHS.includes(path)) return
+  const db = await getDb()
+  if (!db) return
+  try {
+    db.transaction(DB_STORE, 'readwrite').objectStore(DB_STORE).put(entry, `${userId}:${path}`)
+  } catch (error) {
+    console.error('Cache persist failed:', error)
+  }
+}
+
+async function forget(userId) {
+  const db = await getDb()
+  if (!db || !userId) return
+  try {
+    const store = db.transaction(DB_STORE, 'readwrite').objectStore(DB_STORE)
+    for (const path of PERSISTED_PATHS) store.delete(`${userId}:${path}`)
+  } catch (error) {
+    console.error('Cache clear failed:', error)
+  }
+}
+
+/**
+ * Load the owner's persisted entries into memory once. They keep their
+ * original fetchedAt, so the first read serves them and revalidates.
+ */
+function hydrate() {
+  if (!owner) return Promise.resolve()
+  if (hydration) return hydration
+
+  const userId = owner
+  hydration = getDb().then(db => new Promise(resolve => {
+    if (!db) return resolve()
+    let pending = PERSISTED_PATHS.length
+    const done = () => { if (--pending === 0) resolve() }
+    try {
+      const store = db.transaction(DB_STORE, 'readonly').objectStore(DB_STORE)
+      for (const path of PERSISTED_PATHS) {
+        const request = store.get(`${userId}:${path}`)
+        request.onsuccess = () => {
+          if (request.result && owner === userId && !entries.has(path)) {
+            entries.set(path, request.result)
+          }
+          done()
+        }
+        request.onerror = done
+      }
+    } catch (error) {
+      resolve()
+    }
+  }))
+  return hydration
+}
+
+// =====================================================
+// CACHE
+// =====================================================
+
+function notify(path) {
+  const entry = entries.get(path)
+  const callbacks = listeners.get(path)
+  if (!entry || !callbacks) return
+  for (const callback of callbacks) callback(entry.data)
+}
+
+function matches(path, prefixes) {
+  return prefixes.some(prefix =>
+    path === prefix || path.startsWith(`${prefix}/`) || path.startsWith(`${prefix}&`)
+  )
+}
+
+/**
+ * Scope the cache to the signed-in user. Switching users drops everything
+ * held in memory; persisted entries stay keyed by user id.
+ */
+export function setApiCacheOwner(userId) {
+  if ((userId || null) === owner) return
+  owner = userId || null
+  entries.clear()
+  inFlight.clear()
+  generations.clear()
+  hydration = null
+}
+
+/**
+ * Drop all cached data, including the persisted copy (sign out)
+ */
+export async function clearApiCache() {
+  const userId = owner
+  setApiCacheOwner(null)
+  await forget(userId)
+}
+
+/**
+ * Fetch a path from the network, sharing any request already in flight
+ * @returns {Promise<any>} Parsed JSON body; rejects on a non-2xx response
+ */
+export function fetchApiData(path) {
+  const existing = inFlight.get(path)
+  if (existing) return existing
+
+  const userId = owner
+  const generation = generations.get(path) || 0
+  const promise = fetch(`/api?path=${path}`)
+    .then(async response => {
+      const data = await response.json()
+      if (!response.ok) throw new Error(data?.error || `Request failed (${response.status})`)
+
+      // Responses for a previous user, or started before an invalidation, are not cached
+      if (owner === userId && (generations.get(path) || 0) === generation) {
+        const entry = { data, fetchedAt: Date.now() }
+        entries.set(path, entry)
+        persist(userId, path, entry)
+        notify(path)
+      }
+      return data
+    })
+    .finally(() => {
+      if (inFlight.get(path) === promise) inFlight.delete(path)
+    })
+
+  inFlight.set(path, promise)
+  return promise
+}
+
+/**
+ * Stale-while-revalidate read. onData gets cached data right away and the
+ * fresh copy when a background revalidation finishes.
+ * @returns {Promise<any>} The first data delivered
+ */
+export async function loadApiData(path, onData) {
+  await hydrate()
+
+  const cached = entries.get(path)
+  if (cached && cached.fetchedAt > 0) {
+    onData?.(cached.data)
+    if (Date.now() - cached.fetchedAt > API_CACHE_FRESH_MS) {
+      fetchApiData(path)
+        .then(data => onData?.(data))
+        .catch(error => console.error(`Revalidating ${path} failed:`, error))
+    }
+    return cached.data
+  }
+
+  const data = await fetchApiData(path)
+  onData?.(data)
+  return data
+}
+
+/**
+ * Cached data for a path without fetching (undefined when absent or invalidated)
+ */
+export function peekApiData(path) {
+  const cached = entries.get(path)
+  return cached && cached.fetchedAt > 0 ? cached.data : undefined
+}
+
+/**
+ * Call back whenever fresh data for the path arrives
+ * @returns {Function} Unsubscribe
+ */
+export function subscribeApiData(path, callback) {
+  if (!listeners.has(path)) listeners.set(path, new Set())
+  listeners.get(path).add(callback)
+  return () => {
+    const callbacks = listeners.get(path)
+    callbacks?.delete(callback)
+    if (callbacks && callbacks.size === 0) listeners.delete(path)
+  }
+}
+
+/**
+ * Mark paths stale after a mutation. Each prefix covers the path itself and
+ * its sub-paths / query variants ('quotes' also covers 'quotes/123').
+ * Subscribed paths are refetched right away.
+ */
+export function invalidateApiData(...prefixes) {
+  for (const [path, entry] of entries) {
+    if (matches(path, prefixes)) entries.set(path, { ...entry, fetchedAt: 0 })
+  }
+  for (const path of new Set([...entries.keys(), ...inFlight.keys()])) {
+    if (!matches(path, prefixes)) continue
+    generations.set(path, (generations.get(path) || 0) + 1)
+    inFlight.delete(path)
+  }
+  for (const path of listeners.keys()) {
+    if (matches(path, prefixes)) {
+      fetchApiData(path).catch(error => console.error(`Refetching ${path} failed:`, error))
+    }
+  }
+}
@@ -0,0 +1,306 @@
+/**
+ * Patch Hat QuoteKit - Streaming Bulk Import
+ * Parses CSV / NDJSON request bodies incrementally, validates each row and
+ * inserts in chunked multi-row batches.
+ *
+ * Memory is bounded by one batch (plus a capped error list), not by file size:
+ * the request body is pulled chunk by chunk and the next chunk is only read
+ * after the previous batch insert has finished.
+ */
+
+export const IMPORT_BATCH_SIZE = 500
+export const MAX_REPORTED_ERRORS = 200
+
+// =====================================================
+// IMPORT SCHEMAS (column -> type / required / default)
+// =====================================================
+
+export const IMPORT_SCHEMAS = {
+  customers: {
+    table: 'customers',
+    columns: {
+      name: { type: 'text', required: true },
+      email: { type: 'text' },
+      phone: { type: 'text' },
+      notes: { type: 'text' }
+    }
+  },
+  'patch-materials': {
+    table: 'patch_materials',
+    columns: {
+      name: { type: 'text', required: true },
+      sheet_width: { type: 'number', default: 12 },
+      sheet_height: { type: 'number', default: 24 },
+      sheet_cost: { type: 'number', required: true },
+      default_machine_minutes_per_sheet: { type: 'number', default: 12 },
+      default_cleanup_minutes_per_sheet: { type: 'number', default: 5 }
+    }
+  }
+}
+
+/**
+ * Normalize a header cell: "Sheet Cost" -> "sheet_cost"
+ */
+function normalizeColumnName(name) {
+  return String(name).trim().toLowerCase().replace(/[\s-]+/g, '_')
+}
+
+/**
+ * Validate one parsed record against a schema
+ * @returns {{ row: Object } | { error: string }}
+ */
+export function validateImportRow(schema, record) {
+  if (!record || typeof record !== 'object' || Array.isArray(record)) {
+    return { error: 'Row is not an object' }
+  }
+
+  const row = {}
+  for (const [column, spec] of Object.entries(schema.columns)) {
+    let value = record[column]
+    if (typeof value === 'string') value = value.trim()
+    if (value === '' || value === undefined) value = null
+
+    if (value === null) {
+      if (spec.required) return { error: `Missing required column "${column}"` }
+      // Every row carries every column so multi-row inserts stay uniform
+      row[column] = spec.default !== undefined ? spec.default : null
+      continue
+    }
+
+    if (spec.type === 'number') {
+      const num = Number(value)
+      if (!Number.isFinite(num) || num < 0) {
+        return { error: `Column "${column}" must be a non-negative number, got "${value}"` }
+      }
+      row[column] = num
+    } else {
+      row[column] = String(value)
+    }
+  }
+  return { row }
+}
+
+// =====================================================
+// INCREMENTAL PARSERS
+// =====================================================
+
+/**
+ * Decode a byte stream into text chunks
+ */
+async function* readTextChunks(stream) {
+  const reader = stream.getReader()
+  const decoder = new TextDecoder()
+  try {
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      yield decoder.decode(value, { stream: true })
+    }
+    const tail = decoder.decode()
+    if (tail) yield tail
+  } finally {
+    reader.releaseLock()
+  }
+}
+
+/**
+ * RFC 4180 CSV parser over text chunks. Handles quoted fields, escaped
+ * quotes and newlines inside quotes, including across chunk boundaries.
+ * Yields arrays of field strings, one per record.
+ */
+async function* parseCsvRecords(textChunks) {
+  let field = ''
+  let fields = []
+  let inQuotes = false
+  let afterQuote = false
+
+  for await (const chunk of textChunks) {
+    for (let i = 0; i < chunk.length; i++) {
+      const c = chunk[i]
+
+      if (inQuotes) {
+        if (c === '"') {
+          inQuotes = false
+          afterQuote = true
+        } else {
+          field += c
+        }
+        continue
+      }
+
+      if (c === '"') {
+        if (afterQuote) {
+          // "" inside a quoted field is a literal quote
+          field += '"'
+          inQuotes = true
+          afterQuote = false
+        } else if (field === '') {
+          inQuotes = true
+        } else {
+          field += c
+        }
+        continue
+      }
+
+      afterQuote = false
+      if (c === ',') {
+        fields.push(field)
+        field = ''
+      } else if (c === '\n') {
+        fields.push(field)
+        yield fields
+        fields = []
+        field = ''
+      } else if (c !== '\r') {
+        field += c
+      }
+    }
+  }
+
+  if (field !== '' || fields.length > 0) {
+    fields.push(field)
+    yield fields
+  }
+}
+
+/**
+ * CSV body -> { rowNumber, record } using the first record as header
+ */
+async function* csvRows(stream) {
+  let header = null
+  let rowNumber = 0
+
+  for await (const fields of parseCsvRecords(readTextChunks(stream))) {
+    // Skip blank lines
+    if (fields.length === 1 && fields[0].trim() === '') continue
+
+    if (!header) {
+      header = fields.map(normalizeColumnName)
+      continue
+    }
+
+    rowNumber++
+    const record = {}
+    for (let i = 0; i < header.length; i++) {
+      record[header[i]] = fields[i]
+    }
+    yield { rowNumber, record }
+  }
+}
+
+/**
+ * NDJSON body -> { rowNumber, record } or { rowNumber, error }
+ */
+async function* ndjsonRows(stream) {
+  let buffer = ''
+  let rowNumber = 0
+
+  function* flushLines(final) {
+    let newline
+    while ((newline = buffer.indexOf('\n')) !== -1 || (final && buffer.length > 0)) {
+      const line = newline === -1 ? buffer : buffer.slice(0, newline)
+      buffer = newline === -1 ? '' : buffer.slice(newline + 1)
+      if (line.trim() === '') continue
+
+      rowNumber++
+      try {
+        yield { rowNumber, record: JSON.parse(line) }
+      } catch (e) {
+        yield { rowNumber, error: `Invalid JSON: ${e.message}` }
+      }
+    }
+  }
+
+  for await (const chunk of readTextChunks(stream)) {
+    buffer += chunk
+    yield* flushLines(false)
+  }
+  yield* flushLines(true)
+}
+
+/**
+ * Pick the parser from ?format= or the Content-Type header
+ */
+export function detectImportFormat(format, contentType) {
+  const value = (format || contentType || '').toLowerCase()
+  if (value.includes('ndjson') || value.includes('jsonl') || value.includes('json')) return 'ndjson'
+  return 'csv'
+}
+
+// =====================================================
+// MAIN EXPORT: streamImport()
+// =====================================================
+
+/**
+ * Stream-parse, validate and batch-insert rows for one user
+ * @param {Object} supabase - Server Supabase client
+ * @param {Object} options
+ * @param {ReadableStream} options.stream - Request body
+ * @param {string} options.format - 'csv' | 'ndjson'
+ * @param {Object} options.schema - Entry from IMPORT_SCHEMAS
+ * @param {string} options.userId - Owner for every inserted row
+ * @returns {Promise<Object>} { inserted, failed, errors, errorsTruncated }
+ */
+export async function streamImport(supabase, { stream, format, schema, userId, batchSize = IMPORT_BATCH_SIZE }) {
+  const result = { inserted: 0, failed: 0, errors: [], errorsTruncated: false }
+
+  function recordError(rowNumber, error) {
+    result.failed++
+    if (result.errors.length < MAX_REPORTED_ERRORS) {
+      result.errors.push({ row: rowNumber, error })
+    } else {
+      result.errorsTruncated = true
+    }
+  }
+
+  let batch = []
+  let batchRowNumbers = []
+
+  async function flush() {
+    if (batch.length === 0) return
+    const rows = batch
+    const rowNumbers = batchRowNumbers
+    batch = []
+    batchRowNumbers = []
+
+    const { error } = await supabase.from(schema.table).insert(rows)
+    if (!error) {
+      result.inserted += rows.length
+      return
+    }
+
+    // One bad row fails the whole statement; retry singly to pinpoint it
+    for (let i = 0; i < rows.length; i++) {
+      const { error: rowError } = await supabase.from(schema.table).insert([rows[i]])
+      if (rowError) {
+        recordError(rowNumbers[i], rowError.message)
+      } else {
+        result.inserted++
+      }
+    }
+  }
+
+  if (!stream) return result
+
+  const rows = format === 'ndjson' ? ndjsonRows(stream) : csvRows(stream)
+
+  for await (const { rowNumber, record, error } of rows) {
+    if (error) {
+      recordError(rowNumber, error)
+      continue
+    }
+
+    const validated = validateImportRow(schema, record)
+    if (validated.error) {
+      recordError(rowNumber, validated.error)
+      continue
+    }
+
+    batch.push({ ...validated.row, user_id: userId })
+    batchRowNumbers.push(rowNumber)
+    if (batch.length >= batchSize) await flush()
+  }
+  await flush()
+
+  return result
+}
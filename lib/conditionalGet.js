@@ -0,0 +1,61 @@
+/**
+ * Patch Hat QuoteKit - Conditional GET (ETag / If-None-Match)
+ * Strong ETags for per-user collections.
+ *
+ * A collection's version is (row count, newest updated_at). With
+ * If-None-Match, the route reads that pair via collection_version()
+ * (supabase-etags.sql) and answers 304 when it still matches. Otherwise
+ * the rows are loaded and the tag is computed from them with the same
+ * formula, so a probe and a full load of the same state agree.
+ */
+
+import { createHash } from 'crypto'
+
+// Private data: browsers may store it but must revalidate every use
+export const PRIVATE_REVALIDATE = 'private, no-cache'
+
+const stats = { notModified: 0, full: 0 }
+
+/**
+ * Strong ETag for a user's collection at a given version
+ */
+export function collectionETag(userId, collection, count, lastUpdated) {
+  const digest = createHash('sha256')
+    .update(`${userId}|${collection}|${count}|${lastUpdated || ''}`)
+    .digest('base64url')
+    .slice(0, 27)
+  return `"${digest}"`
+}
+
+/**
+ * ETag for loaded rows (a single row, or null, counts as a collection of 0-1)
+ */
+export function rowsETag(userId, collection, rows) {
+  const list = Array.isArray(rows) ? rows : rows ? [rows] : []
+  let lastUpdated = null
+  for (const row of list) {
+    // Postgres JSON timestamps share one UTC format, so strings compare in time order
+    if (row.updated_at && (!lastUpdated || row.updated_at > lastUpdated)) lastUpdated = row.updated_at
+  }
+  return collectionETag(userId, collection, list.length, lastUpdated)
+}
+
+/**
+ * Whether the request's If-None-Match names this ETag (weak comparison, per RFC 9110)
+ */
+export function matchesIfNoneMatch(request, etag) {
+  const header = request.headers.get('if-none-match')
+  if (!header) return false
+  if (header.trim() === '*') return true
+  return header.split(',').some(tag => tag.trim().replace(/^W\//, '') === etag)
+}
+
+export function recordConditionalGet(notModified) {
+  if (notModified) stats.notModified++
+  else stats.full++
+}
+
+export function getConditionalGetStats() {
+  const total = stats.notModified + stats.full
+  return { ...stats, notModifiedRate: total ? stats.notModified / total : 0 }
+}
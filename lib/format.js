@@ -0,0 +1,37 @@
+/**
+ * Patch Hat QuoteKit - Formatting Helpers
+ * Money and percentage formatting shared by the pricing engine and client
+ * views. Kept free of other imports so views can use it without pulling the
+ * engine into their bundle.
+ */
+
+/**
+ * Round to cents with epsilon correction for floating point
+ */
+export function roundToCents(n) {
+  if (n === null || n === undefined || isNaN(n)) return 0
+  return Math.round((n + Number.EPSILON) * 100) / 100
+}
+
+// Built once; constructing an Intl formatter per call dominates formatting cost
+const USD_FORMATTER = new Intl.NumberFormat('en-US', {
+  style: 'currency',
+  currency: 'USD',
+  minimumFractionDigits: 2,
+  maximumFractionDigits: 2
+})
+
+/**
+ * Format number as USD currency string
+ */
+export function formatMoney(n) {
+  return USD_FORMATTER.format(roundToCents(n))
+}
+
+/**
+ * Format percentage with 1 decimal
+ */
+export function formatPct(n) {
+  if (n === null || n === undefined || isNaN(n)) return '0.0%'
+  return `${roundToCents(n).toFixed(1)}%`
+}
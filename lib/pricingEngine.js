@@ -7,41 +7,116 @@
  * - tiers: pricing at each tier START quantity
  * - customerView: customer-facing pricing matrix with pass-through profit
  * - display: pre-formatted strings for UI and scripts
+ *
+ * computeQuoteAcrossMaterials() prices one quote against several materials
+ * and returns a compact side-by-side comparison table.
+ *
+ * calculateFinishedHatQuote() prices finished hats (blank + patch + apply)
+ * across up to 8 tier quantities using margin or markup.
+ *
+ * enableEngineProfiling() turns on per-stage timings and call counters,
+ * read back with getEngineProfile(). Off by default.
  */
 
+import { formatMoney, formatPct, roundToCents } from './format.js'
+
 // =====================================================
-// FORMATTING HELPERS (used everywhere)
+// FORMATTING HELPERS (used everywhere; live in format.js)
 // =====================================================
 
-/**
- * Round to cents with epsilon correction for floating point
- */
-export function roundToCents(n) {
-  if (n === null || n === undefined || isNaN(n)) return 0
-  return Math.round((n + Number.EPSILON) * 100) / 100
+export { formatMoney, formatPct, roundToCents }
+
+// =====================================================
+// INSTRUMENTATION (off unless enableEngineProfiling() is called)
+// =====================================================
+// Every hook is guarded by `if (profiler)`, so while profiling is off the
+// engine pays one null check per stage and nothing else.
+
+export const ENGINE_STAGES = ['prepare', 'yield', 'tiers', 'customerView', 'display', 'scripts']
+
+let profiler = null
+
+const now = () => performance.now()
+
+function createProfiler() {
+  const stages = {}
+  for (const name of ENGINE_STAGES) stages[name] = { count: 0, totalMs: 0, maxMs: 0 }
+
+  return {
+    startedAt: Date.now(),
+    calls: {
+      computeQuote: 0,
+      compareMaterials: 0,
+      materialsCompared: 0,
+      finishedHatQuote: 0,
+      yield: 0,
+      costEvaluations: 0
+    },
+    stages,
+    // Record the time since `since` against a stage; returns the new mark
+    lap(stage, since) {
+      const t = now()
+      const ms = t - since
+      const s = stages[stage]
+      s.count++
+      s.totalMs += ms
+      if (ms > s.maxMs) s.maxMs = ms
+      return t
+    }
+  }
 }
 
-/**
- * Format number as USD currency string
- */
-export function formatMoney(n) {
-  const rounded = roundToCents(n)
-  return new Intl.NumberFormat('en-US', {
-    style: 'currency',
-    currency: 'USD',
-    minimumFractionDigits: 2,
-    maximumFractionDigits: 2
-  }).format(rounded)
+export function enableEngineProfiling() {
+  if (!profiler) profiler = createProfiler()
+}
+
+export function disableEngineProfiling() {
+  profiler = null
+}
+
+export function resetEngineProfile() {
+  if (profiler) profiler = createProfiler()
 }
 
 /**
- * Format percentage with 1 decimal
+ * Snapshot of call counts and per-stage timings since enabling (or reset)
+ * @returns {Object} { enabled, since, calls, perQuote, stages: { [stage]: { count, totalMs, meanMs, maxMs, sharePct } } }
  */
-export function formatPct(n) {
-  if (n === null || n === undefined || isNaN(n)) return '0.0%'
-  return `${roundToCents(n).toFixed(1)}%`
+export function getEngineProfile() {
+  if (!profiler) return { enabled: false }
+
+  const { calls, stages, startedAt } = profiler
+  const totalMs = ENGINE_STAGES.reduce((sum, name) => sum + stages[name].totalMs, 0)
+  const quotesPriced = calls.computeQuote + calls.materialsCompared
+  const round = n => Math.round(n * 1e6) / 1e6
+
+  return {
+    enabled: true,
+    since: new Date(startedAt).toISOString(),
+    calls: { ...calls },
+    perQuote: {
+      yield: quotesPriced ? round(calls.yield / quotesPriced) : 0,
+      costEvaluations: quotesPriced ? round(calls.costEvaluations / quotesPriced) : 0
+    },
+    stages: Object.fromEntries(ENGINE_STAGES.map(name => {
+      const s = stages[name]
+      return [name, {
+        count: s.count,
+        totalMs: round(s.totalMs),
+        meanMs: s.count ? round(s.totalMs / s.count) : 0,
+        maxMs: round(s.maxMs),
+        sharePct: totalMs ? roundToCents((s.totalMs / totalMs) * 100) : 0
+      }]
+    }))
+  }
 }
 
+// =====================================================
+// QUOTE STATUSES (matches the quotes.status CHECK constraint)
+// =====================================================
+
+export const QUOTE_STATUSES = ['draft', 'sent', 'paid']
+
 // =====================================================
 // TIER DEFINITIONS (single source of truth)
 // =====================================================
@@ -97,6 +172,7 @@ export function calculateShopRate(shopSettings) {
 // =====================================================
 
 export function calculateYield(params) {
+  if (profiler) profiler.calls.yield++
   const {
     material,
     patchWidthInput,
@@ -164,6 +240,7 @@ export function calculateYield(params) {
  * This is the core cost function - used for active qty AND each tier start qty
  */
 export function calculateCostAtQty(qty, params) {
+  if (profiler) profiler.calls.costEvaluations++
   const {
     material,
     effectiveYield,
@@ -286,41 +363,106 @@ export function calculateCustomerPrice(baselinePerPiece, customerMarkupPct) {
 }
 
 // =====================================================
-// MAIN EXPORT: computeQuote()
+// INTEGER-CENTS ARITHMETIC (money: 'cents' mode)
 // =====================================================
 
 /**
- * Compute complete quote with all pricing views
- * @param {Object} quoteInputs - Form inputs from Quote Builder
- * @param {Object} shopSettings - Shop settings including ladders
- * @param {Object} material - Selected material
- * @returns {Object} Complete pricing result
+ * Dollars -> integer cents, rounded exactly like roundToCents
+ */
+export function toCents(n) {
+  if (n === null || n === undefined || isNaN(n)) return 0
+  return Math.round((n + Number.EPSILON) * 100)
+}
+
+/**
+ * Calculate true cost for a specific quantity in integer cents.
+ * Same formula as calculateCostAtQty; money inputs are whole cents so
+ * material, blank and total cost add exactly. The shop rate arrives in
+ * $/hour already rounded to cents by calculateShopRate and is used as-is;
+ * after that, labor and per-piece cost are the only rounding points.
+ */
+export function calculateCostAtQtyCents(qty, params) {
+  if (profiler) profiler.calls.costEvaluations++
+  const {
+    effectiveYield,
+    sheetCostCents,
+    shopRatePerHour,
+    machineMinutesPerSheet,
+    cleanupMinutesPerSheet,
+    applyMinutesPerHat,
+    proofMinutes,
+    setupMinutes,
+    packingMinutes,
+    hatsSuppliedBy,
+    hatUnitCostCents,
+    quoteType
+  } = params
+
+  const sheets = Math.ceil(qty / effectiveYield)
+  const materialCost = sheets * sheetCostCents
+
+  const blankCost = quoteType === 'patch_press' && hatsSuppliedBy === 'us'
+    ? qty * hatUnitCostCents
+    : 0
+
+  const sheetMinutes = (machineMinutesPerSheet + cleanupMinutesPerSheet) * sheets
+  const applyMinutes = quoteType === 'patch_press' ? (applyMinutesPerHat * qty) : 0
+  const fixedMinutes = proofMinutes + setupMinutes + packingMinutes
+  const timeMins = sheetMinutes + applyMinutes + fixedMinutes
+
+  // Rounding point 1: labor
+  const laborCost = Math.round((timeMins * shopRatePerHour * 100) / 60)
+  const totalCost = materialCost + blankCost + laborCost
+  // Rounding point 2: per piece
+  const costPerPiece = Math.round(totalCost / qty)
+
+  return {
+    qty,
+    effectiveYield: roundToCents(effectiveYield),
+    sheets,
+    materialCost,
+    blankCost,
+    timeMins: roundToCents(timeMins),
+    laborCost,
+    totalCost,
+    costPerPiece
+  }
+}
+
+/**
+ * Wholesale price in cents from cost in cents (markup or margin)
+ */
+export function calculateWholesaleCents(costCents, pricingMethod, markupPct, marginPct) {
+  if (pricingMethod === 'margin') {
+    const margin = Math.min(marginPct || 40, 99)
+    return Math.round((costCents * 100) / (100 - margin))
+  }
+  return Math.round((costCents * (100 + (markupPct || 50))) / 100)
+}
+
+/**
+ * Customer price in cents with pass-through markup
+ */
+export function calculateCustomerPriceCents(baselineCents, customerMarkupPct) {
+  const customerPricePerPiece = Math.round((baselineCents * (100 + (customerMarkupPct || 0))) / 100)
+  return { customerPricePerPiece, customerProfitPerPiece: customerPricePerPiece - baselineCents }
+}
+
+// =====================================================
+// QUOTE PIPELINE (prepare -> price -> assemble)
+// =====================================================
+
+/**
+ * Resolve everything that does not depend on the material:
+ * quantities, shop rate, time components, pricing settings and ladder prices.
  */
-export function computeQuote(quoteInputs, shopSettings, material) {
+export function prepareQuote(quoteInputs, shopSettings) {
   const quoteType = quoteInputs.quote_type || 'patch_press'
   const qty = quoteInputs.qty || 144
 
-  // Get shop rate
   const shopRatePerHour = calculateShopRate(shopSettings)
 
-  // Calculate yield
-  const { bestYield, effectiveYield } = calculateYield({
-    material,
-    patchWidthInput: quoteInputs.patch_width_input,
-    patchHeightInput: quoteInputs.patch_height_input,
-    patchSizeMode: quoteInputs.patch_size_mode,
-    outlineAllowance: quoteInputs.outline_allowance,
-    gap: quoteInputs.gap,
-    border: quoteInputs.border,
-    wastePct: quoteInputs.waste_pct,
-    yieldMethod: quoteInputs.yield_method,
-    manualYield: quoteInputs.manual_yield
-  })
-
-  // Common cost params
-  const costParams = {
-    material,
-    effectiveYield,
+  const timing = {
     shopRatePerHour,
     machineMinutesPerSheet: quoteInputs.machine_minutes_per_sheet || 12,
     cleanupMinutesPerSheet: quoteInputs.cleanup_minutes_per_sheet || 5,
@@ -333,24 +475,57 @@ export function computeQuote(quoteInputs, shopSettings, material) {
     quoteType
   }
 
-  // Pricing settings
-  const pricingMethod = shopSettings?.default_pricing_method || 'markup'
-  const markupPct = shopSettings?.default_markup_pct || 50
-  const marginPct = shopSettings?.default_margin_pct || 40
-  const setupFeeDefault = shopSettings?.setup_fee_default || 30
-  const setupWaiveQty = shopSettings?.setup_waive_qty || 24
-  const customerMarkupPct = shopSettings?.customer_markup_pct || 0
-  const customerPriceBaseline = shopSettings?.customer_price_baseline || 'published'
-
-  // Get published ladder
   const publishedLadder = quoteType === 'patch_only'
     ? shopSettings?.published_ladder_patch_only
     : shopSettings?.published_ladder_patch_press
 
+  const activeTier = getTierForQty(qty)
+
+  return {
+    quoteInputs,
+    quoteType,
+    qty,
+    timing,
+    yieldInputs: {
+      patchWidthInput: quoteInputs.patch_width_input,
+      patchHeightInput: quoteInputs.patch_height_input,
+      patchSizeMode: quoteInputs.patch_size_mode,
+      outlineAllowance: quoteInputs.outline_allowance,
+      gap: quoteInputs.gap,
+      border: quoteInputs.border,
+      wastePct: quoteInputs.waste_pct,
+      yieldMethod: quoteInputs.yield_method,
+      manualYield: quoteInputs.manual_yield
+    },
+    pricingMethod: shopSettings?.default_pricing_method || 'markup',
+    markupPct: shopSettings?.default_markup_pct || 50,
+    marginPct: shopSettings?.default_margin_pct || 40,
+    setupFeeDefault: shopSettings?.setup_fee_default || 30,
+    setupWaiveQty: shopSettings?.setup_waive_qty || 24,
+    customerMarkupPct: shopSettings?.customer_markup_pct || 0,
+    customerPriceBaseline: shopSettings?.customer_price_baseline || 'published',
+    activeTier,
+    activePublishedPerPiece: getPublishedPrice(activeTier.key, publishedLadder, quoteType),
+    tierPublishedPerPiece: TIER_RANGES.map(tier => getPublishedPrice(tier.key, publishedLadder, quoteType))
+  }
+}
+
+/**
+ * Price the active quantity, every tier and the customer view in float dollars
+ */
+function priceQuoteFloat(prepared, material, effectiveYield) {
+  const {
+    qty, timing, pricingMethod, markupPct, marginPct, setupFeeDefault, setupWaiveQty,
+    customerMarkupPct, customerPriceBaseline, activeTier, activePublishedPerPiece, tierPublishedPerPiece
+  } = prepared
+
+  const p = profiler
+  let mark = p ? now() : 0
+
+  const costParams = { ...timing, material, effectiveYield }
+
   // ===== ACTIVE QUANTITY CALCULATION =====
   const activeBreakdown = calculateCostAtQty(qty, costParams)
-  const activeTier = getTierForQty(qty)
-  const activePublishedPerPiece = getPublishedPrice(activeTier.key, publishedLadder, quoteType)
   const activeWholesalePerPiece = calculateWholesale(activeBreakdown.costPerPiece, pricingMethod, markupPct, marginPct)
   const activeProfitPerPiece = roundToCents(activePublishedPerPiece - activeBreakdown.costPerPiece)
   const activeMarginPct = activePublishedPerPiece > 0 
@@ -361,9 +536,9 @@ export function computeQuote(quoteInputs, shopSettings, material) {
   const activeTotal = roundToCents(activeSubtotal + activeSetupFee)
 
   // ===== TIER MATRIX (recompute at each tier START qty) =====
-  const tiers = TIER_RANGES.map(tier => {
+  const tiers = TIER_RANGES.map((tier, i) => {
     const tierBreakdown = calculateCostAtQty(tier.startQty, costParams)
-    const publishedPerPiece = getPublishedPrice(tier.key, publishedLadder, quoteType)
+    const publishedPerPiece = tierPublishedPerPiece[i]
     const wholesalePerPiece = calculateWholesale(tierBreakdown.costPerPiece, pricingMethod, markupPct, marginPct)
     const profitPerPiece = roundToCents(publishedPerPiece - tierBreakdown.costPerPiece)
     const marginPctVal = publishedPerPiece > 0 
@@ -372,73 +547,266 @@ export function computeQuote(quoteInputs, shopSettings, material) {
     const setupFeeApplied = tier.startQty >= setupWaiveQty ? 0 : setupFeeDefault
     const totalAtStartQty = roundToCents((publishedPerPiece * tier.startQty) + setupFeeApplied)
 
-    // Warning flags
-    const belowCost = publishedPerPiece < tierBreakdown.costPerPiece
-    const lowMargin = marginPctVal < 20
-
-    return {
-      key: tier.key,
-      rangeLabel: tier.rangeLabel,
-      startQty: tier.startQty,
-      endQty: tier.endQty,
-      isActive: tier.key === activeTier.key,
-      // Per-piece economics (tier cards show ONLY these)
+    return buildTier(tier, activeTier, {
       publishedPerPiece,
       costPerPiece: tierBreakdown.costPerPiece,
       wholesalePerPiece,
       profitPerPiece,
       marginPct: marginPctVal,
-      // Setup fee and total at start qty (for reference)
       setupFeeApplied,
       totalAtStartQty,
-      // Warnings
-      belowCost,
-      lowMargin,
-      hasWarning: belowCost || lowMargin,
-      // Full breakdown for debugging
       breakdown: tierBreakdown
-    }
+    })
   })
 
+  if (p) mark = p.lap('tiers', mark)
+
   // ===== CUSTOMER VIEW MATRIX =====
   const customerTiers = tiers.map(tier => {
     const baseline = customerPriceBaseline === 'wholesale' 
       ? tier.wholesalePerPiece 
       : tier.publishedPerPiece
     const { customerPricePerPiece, customerProfitPerPiece } = calculateCustomerPrice(baseline, customerMarkupPct)
-    const customerProfitTotalAtStartQty = roundToCents(customerProfitPerPiece * tier.startQty)
 
-    return {
-      key: tier.key,
-      rangeLabel: tier.rangeLabel,
-      startQty: tier.startQty,
-      endQty: tier.endQty,
-      isActive: tier.isActive,
+    return buildCustomerTier(tier, {
       customerPricePerPiece,
       customerProfitPerPiece,
-      customerProfitTotalAtStartQty
+      customerProfitTotalAtStartQty: roundToCents(customerProfitPerPiece * tier.startQty)
+    })
+  })
+
+  if (p) p.lap('customerView', mark)
+
+  return {
+    active: {
+      qty,
+      tier: activeTier,
+      publishedPerPiece: activePublishedPerPiece,
+      costPerPiece: activeBreakdown.costPerPiece,
+      wholesalePerPiece: activeWholesalePerPiece,
+      profitPerPiece: activeProfitPerPiece,
+      marginPct: activeMarginPct,
+      setupFeeApplied: activeSetupFee,
+      subtotal: activeSubtotal,
+      total: activeTotal,
+      breakdown: activeBreakdown
+    },
+    tiers,
+    customerTiers
+  }
+}
+
+/**
+ * Material-independent money of a prepared quote in cents. Converted once
+ * per quote and reused for every material it is priced against.
+ */
+function preparedCents(prepared) {
+  if (!prepared.cents) {
+    prepared.cents = {
+      setupFee: toCents(prepared.setupFeeDefault),
+      hatUnitCost: toCents(prepared.timing.hatUnitCost),
+      activePublished: toCents(prepared.activePublishedPerPiece),
+      tierPublished: prepared.tierPublishedPerPiece.map(toCents)
     }
+  }
+  return prepared.cents
+}
+
+/**
+ * Same as priceQuoteFloat but money is carried as integer cents throughout.
+ * Rounding happens only at defined points (labor, per-piece cost, wholesale,
+ * customer price); sums and products of cents are exact, so subtotal, total
+ * and tier totals always agree to the penny. Converted to dollars on output.
+ */
+function priceQuoteCents(prepared, material, effectiveYield) {
+  const {
+    qty, timing, pricingMethod, markupPct, marginPct, setupWaiveQty,
+    customerMarkupPct, customerPriceBaseline, activeTier
+  } = prepared
+  const cents = preparedCents(prepared)
+
+  const p = profiler
+  let mark = p ? now() : 0
+
+  const costParams = {
+    ...timing,
+    effectiveYield,
+    sheetCostCents: toCents(material?.sheet_cost || 7),
+    hatUnitCostCents: cents.hatUnitCost
+  }
+  const setupFeeCents = cents.setupFee
+
+  const marginOf = (profit, published) => published > 0 ? roundToCents((profit / published) * 100) : 0
+  const breakdownToDollars = b => ({
+    qty: b.qty,
+    effectiveYield: b.effectiveYield,
+    sheets: b.sheets,
+    materialCost: b.materialCost / 100,
+    blankCost: b.blankCost / 100,
+    timeMins: b.timeMins,
+    laborCost: b.laborCost / 100,
+    totalCost: b.totalCost / 100,
+    costPerPiece: b.costPerPiece / 100
   })
 
+  // ===== ACTIVE QUANTITY CALCULATION =====
+  const activeBreakdown = calculateCostAtQtyCents(qty, costParams)
+  const activePublished = cents.activePublished
+  const activeWholesale = calculateWholesaleCents(activeBreakdown.costPerPiece, pricingMethod, markupPct, marginPct)
+  const activeProfit = activePublished - activeBreakdown.costPerPiece
+  const activeSetupFee = qty >= setupWaiveQty ? 0 : setupFeeCents
+  const activeSubtotal = activePublished * qty
+  const activeTotal = activeSubtotal + activeSetupFee
+
+  // ===== TIER MATRIX =====
+  const tierCents = TIER_RANGES.map((tier, i) => {
+    const breakdown = calculateCostAtQtyCents(tier.startQty, costParams)
+    const published = cents.tierPublished[i]
+    const setupFeeApplied = tier.startQty >= setupWaiveQty ? 0 : setupFeeCents
+    return {
+      breakdown,
+      published,
+      wholesale: calculateWholesaleCents(breakdown.costPerPiece, pricingMethod, markupPct, marginPct),
+      profit: published - breakdown.costPerPiece,
+      setupFeeApplied,
+      totalAtStartQty: published * tier.startQty + setupFeeApplied
+    }
+  })
+
+  const tiers = TIER_RANGES.map((tier, i) => {
+    const t = tierCents[i]
+    return buildTier(tier, activeTier, {
+      publishedPerPiece: t.published / 100,
+      costPerPiece: t.breakdown.costPerPiece / 100,
+      wholesalePerPiece: t.wholesale / 100,
+      profitPerPiece: t.profit / 100,
+      marginPct: marginOf(t.profit, t.published),
+      setupFeeApplied: t.setupFeeApplied / 100,
+      totalAtStartQty: t.totalAtStartQty / 100,
+      breakdown: breakdownToDollars(t.breakdown)
+    })
+  })
+
+  if (p) mark = p.lap('tiers', mark)
+
+  // ===== CUSTOMER VIEW MATRIX =====
+  const customerTiers = tiers.map((tier, i) => {
+    const baseline = customerPriceBaseline === 'wholesale' ? tierCents[i].wholesale : tierCents[i].published
+    const { customerPricePerPiece, customerProfitPerPiece } = calculateCustomerPriceCents(baseline, customerMarkupPct)
+
+    return buildCustomerTier(tier, {
+      customerPricePerPiece: customerPricePerPiece / 100,
+      customerProfitPerPiece: customerProfitPerPiece / 100,
+      customerProfitTotalAtStartQty: (customerProfitPerPiece * tier.startQty) / 100
+    })
+  })
+
+  if (p) p.lap('customerView', mark)
+
+  return {
+    active: {
+      qty,
+      tier: activeTier,
+      publishedPerPiece: activePublished / 100,
+      costPerPiece: activeBreakdown.costPerPiece / 100,
+      wholesalePerPiece: activeWholesale / 100,
+      profitPerPiece: activeProfit / 100,
+      marginPct: marginOf(activeProfit, activePublished),
+      setupFeeApplied: activeSetupFee / 100,
+      subtotal: activeSubtotal / 100,
+      total: activeTotal / 100,
+      breakdown: breakdownToDollars(activeBreakdown)
+    },
+    tiers,
+    customerTiers
+  }
+}
+
+function buildTier(tier, activeTier, economics) {
+  const belowCost = economics.publishedPerPiece < economics.costPerPiece
+  const lowMargin = economics.marginPct < 20
+
+  return {
+    key: tier.key,
+    rangeLabel: tier.rangeLabel,
+    startQty: tier.startQty,
+    endQty: tier.endQty,
+    isActive: tier.key === activeTier.key,
+    // Per-piece economics (tier cards show ONLY these)
+    publishedPerPiece: economics.publishedPerPiece,
+    costPerPiece: economics.costPerPiece,
+    wholesalePerPiece: economics.wholesalePerPiece,
+    profitPerPiece: economics.profitPerPiece,
+    marginPct: economics.marginPct,
+    // Setup fee and total at start qty (for reference)
+    setupFeeApplied: economics.setupFeeApplied,
+    totalAtStartQty: economics.totalAtStartQty,
+    // Warnings
+    belowCost,
+    lowMargin,
+    hasWarning: belowCost || lowMargin,
+    // Full breakdown for debugging
+    breakdown: economics.breakdown
+  }
+}
+
+function buildCustomerTier(tier, customer) {
+  return {
+    key: tier.key,
+    rangeLabel: tier.rangeLabel,
+    startQty: tier.startQty,
+    endQty: tier.endQty,
+    isActive: tier.isActive,
+    customerPricePerPiece: customer.customerPricePerPiece,
+    customerProfitPerPiece: customer.customerProfitPerPiece,
+    customerProfitTotalAtStartQty: customer.customerProfitTotalAtStartQty
+  }
+}
+
+/**
+ * Price one material against a prepared quote
+ * @param {string} money - 'float' (default) or 'cents'
+ * @param {Object} yieldResult - Precomputed yield for this material's sheet size
+ */
+export function priceQuote(prepared, material, money = 'float', yieldResult = calculateYield({ ...prepared.yieldInputs, material })) {
+  const priced = money === 'cents'
+    ? priceQuoteCents(prepared, material, yieldResult.effectiveYield)
+    : priceQuoteFloat(prepared, material, yieldResult.effectiveYield)
+  priced.bestYield = yieldResult.bestYield
+  priced.effectiveYield = yieldResult.effectiveYield
+  return priced
+}
+
+/**
+ * Build display strings, quote scripts and the final result object
+ */
+function assembleQuote(prepared, material, priced) {
+  const { quoteInputs, quoteType, qty } = prepared
+  const { active, tiers, customerTiers, bestYield, effectiveYield } = priced
+  const p = profiler
+  let mark = p ? now() : 0
+
   // ===== FORMATTED DISPLAY STRINGS =====
   const display = {
     // Active qty
-    publishedPerPiece: formatMoney(activePublishedPerPiece),
-    costPerPiece: formatMoney(activeBreakdown.costPerPiece),
-    wholesalePerPiece: formatMoney(activeWholesalePerPiece),
-    profitPerPiece: formatMoney(activeProfitPerPiece),
-    marginPct: formatPct(activeMarginPct),
-    setupFee: activeSetupFee > 0 ? formatMoney(activeSetupFee) : 'Waived',
-    subtotal: formatMoney(activeSubtotal),
-    total: formatMoney(activeTotal),
+    publishedPerPiece: formatMoney(active.publishedPerPiece),
+    costPerPiece: formatMoney(active.costPerPiece),
+    wholesalePerPiece: formatMoney(active.wholesalePerPiece),
+    profitPerPiece: formatMoney(active.profitPerPiece),
+    marginPct: formatPct(active.marginPct),
+    setupFee: active.setupFeeApplied > 0 ? formatMoney(active.setupFeeApplied) : 'Waived',
+    subtotal: formatMoney(active.subtotal),
+    total: formatMoney(active.total),
     // Yield info
     bestYield: `${bestYield} patches/sheet`,
     effectiveYield: `${roundToCents(effectiveYield)}`,
-    sheets: `${activeBreakdown.sheets}`,
+    sheets: `${active.breakdown.sheets}`,
     // Tier labels for scripts
     tierPrices: tiers.slice(1, 5).map(t => `${t.rangeLabel} ${formatMoney(t.publishedPerPiece)}`).join(' | ')
   }
 
+  if (p) mark = p.lap('display', mark)
+
   // ===== QUOTE SCRIPTS =====
   const unitLabel = quoteType === 'patch_only' ? 'patch' : 'hat'
   const unitLabelPlural = quoteType === 'patch_only' ? 'patches' : 'hats'
@@ -458,28 +826,18 @@ Next step: Reply APPROVED${quoteType === 'patch_press' ? ' + confirm hat colors'
 
   const quotePhone = `For ${qty} ${unitLabelPlural} with a ${patchSize} ${materialName} patch${quoteType === 'patch_press' ? ' applied' : ''}, you're around ${display.publishedPerPiece} each (${display.total} total). That includes making the patches${quoteType === 'patch_press' ? ', applying them,' : ''} and QC. Turnaround is ${turnaround}. If you're good with it, I'll send the proof and invoice and get you on the schedule.`
 
+  if (p) p.lap('scripts', mark)
+
   // ===== RETURN COMPLETE RESULT =====
   return {
     // Active quantity results
-    active: {
-      qty,
-      tier: activeTier,
-      publishedPerPiece: activePublishedPerPiece,
-      costPerPiece: activeBreakdown.costPerPiece,
-      wholesalePerPiece: activeWholesalePerPiece,
-      profitPerPiece: activeProfitPerPiece,
-      marginPct: activeMarginPct,
-      setupFeeApplied: activeSetupFee,
-      subtotal: activeSubtotal,
-      total: activeTotal,
-      breakdown: activeBreakdown
-    },
+    active,
     // Tier matrix
     tiers,
     // Customer view
     customerView: {
-      baseline: customerPriceBaseline,
-      markupPct: customerMarkupPct,
+      baseline: prepared.customerPriceBaseline,
+      markupPct: prepared.customerMarkupPct,
       tiers: customerTiers
     },
     // Formatted display strings
@@ -492,24 +850,51 @@ Next step: Reply APPROVED${quoteType === 'patch_press' ? ' + confirm hat colors'
     },
     // Settings used
     settings: {
-      pricingMethod,
-      markupPct,
-      marginPct,
-      setupFeeDefault,
-      setupWaiveQty,
-      shopRatePerHour,
+      pricingMethod: prepared.pricingMethod,
+      markupPct: prepared.markupPct,
+      marginPct: prepared.marginPct,
+      setupFeeDefault: prepared.setupFeeDefault,
+      setupWaiveQty: prepared.setupWaiveQty,
+      shopRatePerHour: prepared.timing.shopRatePerHour,
       bestYield,
       effectiveYield
     }
   }
 }
 
+// =====================================================
+// MAIN EXPORT: computeQuote()
+// =====================================================
+
+/**
+ * Compute complete quote with all pricing views
+ * @param {Object} quoteInputs - Form inputs from Quote Builder
+ * @param {Object} shopSettings - Shop settings including ladders
+ * @param {Object} material - Selected material
+ * @param {Object} options - { money: 'float' | 'cents' } (default float)
+ * @returns {Object} Complete pricing result
+ */
+export function computeQuote(quoteInputs, shopSettings, material, options = {}) {
+  const p = profiler
+  let mark = p ? now() : 0
+  if (p) p.calls.computeQuote++
+
+  const prepared = prepareQuote(quoteInputs, shopSettings)
+  if (p) mark = p.lap('prepare', mark)
+
+  const yieldResult = calculateYield({ ...prepared.yieldInputs, material })
+  if (p) p.lap('yield', mark)
+
+  const priced = priceQuote(prepared, material, options.money, yieldResult)
+  return assembleQuote(prepared, material, priced)
+}
+
 // =====================================================
 // LEGACY EXPORT for API compatibility
 // =====================================================
 
-export function calculateCompleteQuote(quoteData, shopSettings, material) {
-  const result = computeQuote(quoteData, shopSettings, material)
+export function calculateCompleteQuote(quoteData, shopSettings, material, options) {
+  const result = computeQuote(quoteData, shopSettings, material, options)
   
   // Map to legacy field names
   return {
@@ -533,6 +918,195 @@ export function calculateCompleteQuote(quoteData, shopSettings, material) {
   }
 }
 
+// =====================================================
+// MATERIAL COMPARISON
+// =====================================================
+
+/**
+ * Price one quote against several materials in a single pass.
+ * Material-independent work (shop rate, time components, ladder prices) is
+ * done once; yield is computed once per distinct sheet size. Display strings
+ * and scripts are skipped - each row carries only the comparison figures.
+ * @param {Object} quoteInputs - Form inputs from Quote Builder
+ * @param {Object} shopSettings - Shop settings including ladders
+ * @param {Array} materials - Materials to compare
+ * @param {Object} options - { money: 'float' | 'cents' } (default float)
+ * @returns {Object} { qty, quoteType, tier, publishedPerPiece, materials: [...], cheapestMaterialId }
+ */
+export function computeQuoteAcrossMaterials(quoteInputs, shopSettings, materials, options = {}) {
+  const p = profiler
+  let mark = p ? now() : 0
+  if (p) {
+    p.calls.compareMaterials++
+    p.calls.materialsCompared += materials?.length || 0
+  }
+
+  const prepared = prepareQuote(quoteInputs, shopSettings)
+  if (p) p.lap('prepare', mark)
+  const yieldsBySheet = new Map()
+
+  const rows = (materials || []).map(material => {
+    const sheetKey = `${material?.sheet_width || 12}x${material?.sheet_height || 24}`
+    let yieldResult = yieldsBySheet.get(sheetKey)
+    if (!yieldResult) {
+      if (p) mark = now()
+      yieldResult = calculateYield({ ...prepared.yieldInputs, material })
+      if (p) p.lap('yield', mark)
+      yieldsBySheet.set(sheetKey, yieldResult)
+    }
+
+    const { active, tiers } = priceQuote(prepared, material, options.money, yieldResult)
+
+    return {
+      materialId: material?.id ?? null,
+      name: material?.name || 'Leatherette',
+      sheetCost: material?.sheet_cost || 7,
+      bestYield: yieldResult.bestYield,
+      effectiveYield: roundToCents(yieldResult.effectiveYield),
+      sheets: active.breakdown.sheets,
+      costPerPiece: active.costPerPiece,
+      wholesalePerPiece: active.wholesalePerPiece,
+      profitPerPiece: active.profitPerPiece,
+      marginPct: active.marginPct,
+      totalCost: active.breakdown.totalCost,
+      profitTotal: roundToCents(active.subtotal - active.breakdown.totalCost),
+      belowCost: active.publishedPerPiece < active.costPerPiece,
+      // Compact per-tier economics keyed by tier
+      tiers: tiers.reduce((acc, t) => {
+        acc[t.key] = { cost: t.costPerPiece, wholesale: t.wholesalePerPiece, marginPct: t.marginPct }
+        return acc
+      }, {})
+    }
+  })
+
+  const cheapest = rows.reduce((best, row) => (!best || row.costPerPiece < best.costPerPiece ? row : best), null)
+
+  return {
+    qty: prepared.qty,
+    quoteType: prepared.quoteType,
+    tier: prepared.activeTier.key,
+    publishedPerPiece: prepared.activePublishedPerPiece,
+    setupFeeApplied: prepared.qty >= prepared.setupWaiveQty ? 0 : prepared.setupFeeDefault,
+    materials: rows,
+    cheapestMaterialId: cheapest ? cheapest.materialId : null
+  }
+}
+
+// =====================================================
+// FINISHED HAT PRICING
+// =====================================================
+
+export const FINISHED_HAT_TIER_QUANTITIES = [12, 24, 48, 96, 144, 288, 384, 768]
+export const MAX_FINISHED_HAT_TIERS = 8
+
+/**
+ * Normalize tier quantities: positive integers, unique, ascending, max 8
+ */
+export function normalizeTierQuantities(tierQuantities) {
+  if (!Array.isArray(tierQuantities) || tierQuantities.length === 0) {
+    return FINISHED_HAT_TIER_QUANTITIES
+  }
+  const quantities = [...new Set(
+    tierQuantities.map(q => Math.floor(Number(q))).filter(q => q > 0)
+  )].sort((a, b) => a - b)
+  return quantities.length > 0
+    ? quantities.slice(0, MAX_FINISHED_HAT_TIERS)
+    : FINISHED_HAT_TIER_QUANTITIES
+}
+
+/**
+ * Resolve everything that does not depend on quantity once per quote.
+ * Each tier then costs two multiply/adds and the pricing method.
+ */
+export function buildFinishedHatPlan(quoteInputs, shopSettings) {
+  const shopRatePerHour = calculateShopRate(shopSettings)
+
+  const applyMinutesPerHat = quoteInputs.apply_minutes_per_hat || 2
+  const fixedMinutes = (quoteInputs.proof_minutes || 5) +
+    (quoteInputs.setup_minutes || 5) +
+    (quoteInputs.packing_minutes || 5)
+
+  // Per-hat cost (blank + shipping + patch + apply labor) and per-order cost
+  const perHatCost = (quoteInputs.hat_unit_cost || 0) +
+    (quoteInputs.shipping_per_hat || 0) +
+    (quoteInputs.patch_cost_per_hat || 0) +
+    (applyMinutesPerHat / 60) * shopRatePerHour
+  const fixedCost = (fixedMinutes / 60) * shopRatePerHour
+
+  const pricingMethod = quoteInputs.pricing_method === 'markup' ? 'markup' : 'margin'
+  const margin = Math.min((quoteInputs.target_margin_pct || 40) / 100, 0.99)
+  const markupMultiplier = quoteInputs.markup_multiplier || 2
+
+  return {
+    shopRatePerHour,
+    perHatCost,
+    fixedCost,
+    pricingMethod,
+    // Price = cost × priceFactor for both methods
+    priceFactor: pricingMethod === 'margin' ? 1 / (1 - margin) : markupMultiplier
+  }
+}
+
+/**
+ * Price a batch of quantities against a prepared plan in a single pass
+ */
+export function priceFinishedHatTiers(plan, quantities) {
+  const { perHatCost, fixedCost, priceFactor } = plan
+  const results = new Array(quantities.length)
+
+  for (let i = 0; i < quantities.length; i++) {
+    const qty = quantities[i]
+    const totalCost = roundToCents(perHatCost * qty + fixedCost)
+    const costPerHat = roundToCents(totalCost / qty)
+    const unitPrice = roundToCents(costPerHat * priceFactor)
+    results[i] = {
+      qty,
+      costPerHat,
+      unitPrice,
+      totalPrice: roundToCents(unitPrice * qty)
+    }
+  }
+
+  return results
+}
+
+/**
+ * Compute finished hat quote fields.
+ * Returns ONLY the computed columns of finished_hat_quotes so the API can
+ * spread the result straight into an insert.
+ */
+export function calculateFinishedHatQuote(quoteInputs, shopSettings) {
+  if (profiler) profiler.calls.finishedHatQuote++
+  const buyQty = quoteInputs.buy_qty || 144
+  const tierQuantities = normalizeTierQuantities(quoteInputs.tier_quantities)
+
+  const plan = buildFinishedHatPlan(quoteInputs, shopSettings)
+
+  // Active qty rides along in the same batch as the tiers
+  const priced = priceFinishedHatTiers(plan, [buyQty, ...tierQuantities])
+  const active = priced[0]
+
+  const tierPricesJson = {}
+  const tierLabels = []
+  for (let i = 1; i < priced.length; i++) {
+    const tier = priced[i]
+    tierPricesJson[tier.qty] = { unit: tier.unitPrice, cost: tier.costPerHat, total: tier.totalPrice }
+    tierLabels.push(`${tier.qty}+ ${formatMoney(tier.unitPrice)}`)
+  }
+
+  const hatName = quoteInputs.hat_name || 'Finished hat'
+
+  return {
+    shop_rate: plan.shopRatePerHour,
+    shop_minute_rate: roundToCents(plan.shopRatePerHour / 60),
+    true_cost_per_hat: active.costPerHat,
+    unit_price: active.unitPrice,
+    total_price: active.totalPrice,
+    tier_prices_json: tierPricesJson,
+    tier_quote_text: `${hatName}: ${buyQty} @ ${formatMoney(active.unitPrice)} = ${formatMoney(active.totalPrice)}. Tiers: ${tierLabels.join(' | ')}`
+  }
+}
+
 // =====================================================
 // PROFIT FIRST ALLOCATIONS
 // =====================================================
@@ -546,3 +1120,15 @@ export function calculateProfitFirstAllocations(totalPrice, profitFirstSettings)
     buffer: roundToCents((totalPrice * (profitFirstSettings?.buffer_pct || 5)) / 100)
   }
 }
+
+/**
+ * Sum per-quote allocations into bucket totals
+ */
+export function sumProfitFirstAllocations(allocationsList) {
+  const totals = { profit: 0, tax: 0, ownerPay: 0, ops: 0, buffer: 0 }
+  for (const allocations of allocationsList) {
+    for (const bucket in totals) totals[bucket] += allocations[bucket] || 0
+  }
+  for (const bucket in totals) totals[bucket] = roundToCents(totals[bucket])
+  return totals
+}
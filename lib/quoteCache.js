@@ -0,0 +1,133 @@
+/**
+ * Patch Hat QuoteKit - Quote Result Cache
+ * Content-addressed LRU cache in front of calculateCompleteQuote().
+ *
+ * Key = hash(user, normalized pricing inputs, settings version, material version)
+ *
+ * Versions come from each row's updated_at plus an in-process epoch that the
+ * API bumps whenever settings or materials change, so stale results are never
+ * served: they simply stop being addressable and age out of the LRU.
+ * Fields that do not affect pricing (customer_id, status, ...) are left out of
+ * the key, so saving a quote right after calculating it is a cache hit.
+ */
+
+import { createHash } from 'crypto'
+
+export const QUOTE_CACHE_MAX_ENTRIES = 1000
+
+// Every quote input computeQuote() reads - nothing else may affect the key
+export const PRICING_INPUT_FIELDS = [
+  'quote_type',
+  'qty',
+  'patch_material_id',
+  'patch_width_input',
+  'patch_height_input',
+  'patch_size_mode',
+  'outline_allowance',
+  'gap',
+  'border',
+  'waste_pct',
+  'yield_method',
+  'manual_yield',
+  'machine_minutes_per_sheet',
+  'cleanup_minutes_per_sheet',
+  'apply_minutes_per_hat',
+  'proof_minutes',
+  'setup_minutes',
+  'packing_minutes',
+  'hats_supplied_by',
+  'hat_unit_cost',
+  'turnaround_text'
+]
+
+// Every shop setting computeQuote() reads - changing any other column
+// (labels, contact details, ...) leaves every price as it was
+export const PRICING_SETTINGS_FIELDS = [
+  'workable_hours_per_week',
+  'billable_efficiency_pct',
+  'monthly_overhead',
+  'monthly_owner_pay_goal',
+  'monthly_profit_goal',
+  'published_ladder_patch_only',
+  'published_ladder_patch_press',
+  'default_pricing_method',
+  'default_markup_pct',
+  'default_margin_pct',
+  'setup_fee_default',
+  'setup_waive_qty',
+  'customer_markup_pct',
+  'customer_price_baseline'
+]
+
+// Map preserves insertion order: first key is least recently used
+const entries = new Map()
+const userEpochs = new Map()
+const stats = { hits: 0, misses: 0, evictions: 0, invalidations: 0 }
+
+/**
+ * Pricing-relevant inputs in a fixed order; empty values dropped
+ */
+export function normalizeQuoteInputs(quoteInputs) {
+  const normalized = []
+  for (const field of PRICING_INPUT_FIELDS) {
+    const value = quoteInputs?.[field]
+    if (value === null || value === undefined || value === '') continue
+    normalized.push([field, value])
+  }
+  return normalized
+}
+
+/**
+ * Stable cache key for one user's quote
+ */
+export function quoteCacheKey(userId, quoteInputs, shopSettings, material) {
+  const payload = JSON.stringify([
+    userId,
+    normalizeQuoteInputs(quoteInputs),
+    `${shopSettings?.id ?? ''}@${shopSettings?.updated_at ?? ''}`,
+    `${material?.id ?? ''}@${material?.updated_at ?? ''}`,
+    userEpochs.get(userId) || 0
+  ])
+  return createHash('sha256').update(payload).digest('base64url')
+}
+
+/**
+ * Return the cached result for key, computing and storing it on a miss
+ */
+export function getOrComputeQuote(key, compute) {
+  const cached = entries.get(key)
+  if (cached !== undefined) {
+    stats.hits++
+    // Refresh recency
+    entries.delete(key)
+    entries.set(key, cached)
+    return cached
+  }
+
+  stats.misses++
+  const result = compute()
+  entries.set(key, result)
+  if (entries.size > QUOTE_CACHE_MAX_ENTRIES) {
+    entries.delete(entries.keys().next().value)
+    stats.evictions++
+  }
+  return result
+}
+
+/**
+ * Make every cached result for a user unreachable (settings/material change)
+ */
+export function invalidateQuoteCache(userId) {
+  userEpochs.set(userId, (userEpochs.get(userId) || 0) + 1)
+  stats.invalidations++
+}
+
+export function getQuoteCacheStats() {
+  const lookups = stats.hits + stats.misses
+  return {
+    ...stats,
+    size: entries.size,
+    maxEntries: QUOTE_CACHE_MAX_ENTRIES,
+    hitRate: lookups > 0 ? Math.round((stats.hits / lookups) * 10000) / 10000 : 0
+  }
+}
@@ -0,0 +1,246 @@
+/**
+ * Patch Hat QuoteKit - Streaming Quote Export
+ * Streams quotes out of Supabase as CSV or NDJSON for accounting.
+ *
+ * Rows are read in keyset-paginated pages ordered by (created_at, id) and
+ * each page is encoded and handed to the response stream before the next
+ * page is fetched, so server memory stays at one page regardless of range.
+ */
+
+import { QUOTE_STATUSES, TIER_KEYS } from './pricingEngine.js'
+
+export const EXPORT_PAGE_SIZE = 1000
+
+export const EXPORT_COLUMNS = [
+  'id',
+  'created_at',
+  'updated_at',
+  'status',
+  'quote_type',
+  'customer_id',
+  'customer_name',
+  'qty',
+  'patch_material_id',
+  'patch_width_input',
+  'patch_height_input',
+  'unit_price',
+  'true_cost_per_hat',
+  'setup_fee',
+  'total_price',
+  'best_yield',
+  'effective_yield',
+  'tier_prices_json'
+]
+
+export const DEFAULT_EXPORT_COLUMNS = [
+  'id',
+  'created_at',
+  'status',
+  'quote_type',
+  'customer_name',
+  'qty',
+  'unit_price',
+  'true_cost_per_hat',
+  'setup_fee',
+  'total_price'
+]
+
+const TIER_FIELDS = ['unit', 'cost', 'wholesale']
+
+/**
+ * Parse export options from query params
+ * @returns {{ options: Object } | { error: string }}
+ */
+export function parseExportOptions(searchParams) {
+  const format = (searchParams.get('format') || 'csv').toLowerCase()
+  if (format !== 'csv' && format !== 'ndjson') {
+    return { error: `Unsupported format "${format}" (use csv or ndjson)` }
+  }
+
+  const requested = searchParams.get('columns')
+  const columns = requested
+    ? requested.split(',').map(c => c.trim()).filter(Boolean)
+    : DEFAULT_EXPORT_COLUMNS
+  const unknown = columns.filter(c => !EXPORT_COLUMNS.includes(c))
+  if (unknown.length > 0) {
+    return { error: `Unknown columns: ${unknown.join(', ')}` }
+  }
+
+  const statuses = (searchParams.get('status') || '')
+    .split(',').map(s => s.trim()).filter(Boolean)
+  const badStatus = statuses.filter(s => !QUOTE_STATUSES.includes(s))
+  if (badStatus.length > 0) {
+    return { error: `Unknown status: ${badStatus.join(', ')}` }
+  }
+
+  const from = searchParams.get('from')
+  const to = searchParams.get('to')
+  for (const [name, value] of [['from', from], ['to', to]]) {
+    if (value && isNaN(Date.parse(value))) {
+      return { error: `Invalid ${name} date "${value}"` }
+    }
+  }
+
+  return {
+    options: {
+      format,
+      columns,
+      statuses,
+      from,
+      to,
+      flattenTiers: searchParams.get('flatten_tiers') === 'true'
+    }
+  }
+}
+
+/**
+ * Output column names, with tier_prices_json expanded when flattening
+ */
+function outputColumns(options) {
+  if (!options.flattenTiers) return options.columns
+
+  const result = []
+  for (const column of options.columns) {
+    if (column !== 'tier_prices_json') {
+      result.push(column)
+      continue
+    }
+    for (const key of TIER_KEYS) {
+      for (const field of TIER_FIELDS) result.push(`tier_${key}_${field}`)
+    }
+  }
+  return result
+}
+
+/**
+ * Map a DB row to the flat export record
+ */
+function toExportRecord(row, options) {
+  const record = {}
+  for (const column of options.columns) {
+    if (column === 'customer_name') {
+      record.customer_name = row.customer?.name ?? null
+    } else if (column === 'tier_prices_json' && options.flattenTiers) {
+      const tiers = row.tier_prices_json || {}
+      for (const key of TIER_KEYS) {
+        for (const field of TIER_FIELDS) {
+          record[`tier_${key}_${field}`] = tiers[key]?.[field] ?? null
+        }
+      }
+    } else {
+      record[column] = row[column] ?? null
+    }
+  }
+  return record
+}
+
+// Text a spreadsheet would run as a formula when the CSV is opened
+const FORMULA_PREFIX = /^[=+\-@\t\r]/
+
+function csvCell(value) {
+  if (value === null || value === undefined) return ''
+  let text = typeof value === 'object' ? JSON.stringify(value) : String(value)
+  // Free text (customer names) only; numbers keep their sign
+  if (typeof value === 'string' && FORMULA_PREFIX.test(text)) text = `'${text}`
+  return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text
+}
+
+/**
+ * Fetch one keyset page of quotes after the given cursor
+ */
+async function fetchPage(supabase, userId, options, cursor) {
+  const selectColumns = options.columns.filter(c => c !== 'customer_name')
+  // Cursor columns are always needed even when not exported
+  for (const c of ['id', 'created_at']) {
+    if (!selectColumns.includes(c)) selectColumns.push(c)
+  }
+  if (options.columns.includes('customer_name')) {
+    selectColumns.push('customer:customers(name)')
+  }
+
+  let query = supabase
+    .from('quotes')
+    .select(selectColumns.join(','))
+    .eq('user_id', userId)
+
+  if (options.statuses.length > 0) query = query.in('status', options.statuses)
+  if (options.from) query = query.gte('created_at', options.from)
+  if (options.to) query = query.lt('created_at', options.to)
+
+  if (cursor) {
+    query = query.or(
+      `created_at.gt."${cursor.createdAt}",and(created_at.eq."${cursor.createdAt}",id.gt.${cursor.id})`
+    )
+  }
+
+  const { data, error } = await query
+    .order('created_at', { ascending: true })
+    .order('id', { ascending: true })
+    .limit(EXPORT_PAGE_SIZE)
+
+  if (error) throw error
+  return data || []
+}
+
+// =====================================================
+// MAIN EXPORT: createQuoteExportStream()
+// =====================================================
+
+/**
+ * Build a byte stream of quotes in the requested format.
+ * The header goes out on start so clients receive bytes immediately;
+ * each subsequent pull fetches and encodes exactly one page.
+ */
+export function createQuoteExportStream(supabase, userId, options) {
+  const encoder = new TextEncoder()
+  const columns = outputColumns(options)
+  let cursor = null
+  let done = false
+
+  return new ReadableStream({
+    start(controller) {
+      if (options.format === 'csv') {
+        controller.enqueue(encoder.encode(columns.map(csvCell).join(',') + '\r\n'))
+      }
+    },
+
+    async pull(controller) {
+      if (done) return
+      try {
+        const rows = await fetchPage(supabase, userId, options, cursor)
+
+        let chunk = ''
+        for (const row of rows) {
+          const record = toExportRecord(row, options)
+          chunk += options.format === 'csv'
+            ? columns.map(c => csvCell(record[c])).join(',') + '\r\n'
+            : JSON.stringify(record) + '\n'
+        }
+        if (chunk) controller.enqueue(encoder.encode(chunk))
+
+        if (rows.length < EXPORT_PAGE_SIZE) {
+          done = true
+          controller.close()
+        } else {
+          const last = rows[rows.length - 1]
+          cursor = { createdAt: last.created_at, id: last.id }
+        }
+      } catch (error) {
+        console.error('Export Error:', error)
+        controller.error(error)
+      }
+    }
+  }, { highWaterMark: 0 })
+}
+
+/**
+ * Response headers for an export download
+ */
+export function exportHeaders(format) {
+  const date = new Date().toISOString().slice(0, 10)
+  return {
+    'Content-Type': format === 'csv' ? 'text/csv; charset=utf-8' : 'application/x-ndjson; charset=utf-8',
+    'Content-Disposition': `attachment; filename="quotes-${date}.${format === 'csv' ? 'csv' : 'ndjson'}"`,
+    'Cache-Control': 'no-store'
+  }
+}
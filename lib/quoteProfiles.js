@@ -0,0 +1,222 @@
+/**
+ * Patch Hat QuoteKit - Quote Response Profiles
+ * Slim views of calculateCompleteQuote() results for the API.
+ *
+ * calculateCompleteQuote() returns the full engine result plus legacy flat
+ * aliases, so tiers appear twice, customer tiers appear twice and every tier
+ * carries a debug breakdown. The calculate endpoint is hit on every
+ * keystroke, so callers pick a profile and only that shape is serialized:
+ *
+ * - minimal:  active totals + compact tier prices
+ * - shop:     cost/profit view (no breakdowns, no legacy aliases)
+ * - customer: customer-facing prices and scripts only (no cost data)
+ * - full:     everything (default, backwards compatible)
+ *
+ * Each profile is described by a schema that is compiled once at module load
+ * into a serializer with pre-escaped keys and fixed field order, which is
+ * considerably faster than JSON.stringify walking the full result.
+ */
+
+import { TIER_KEYS } from './pricingEngine.js'
+
+export const RESPONSE_PROFILES = ['minimal', 'shop', 'customer', 'full']
+export const DEFAULT_RESPONSE_PROFILE = 'full'
+
+// =====================================================
+// SCHEMA COMPILER
+// =====================================================
+
+function serializeNumber(v) {
+  return typeof v === 'number' && isFinite(v) ? '' + v : 'null'
+}
+
+function serializeString(v) {
+  return typeof v === 'string' ? JSON.stringify(v) : 'null'
+}
+
+function serializeBoolean(v) {
+  return v === true ? 'true' : v === false ? 'false' : 'null'
+}
+
+function serializeAny(v) {
+  return v === undefined ? 'null' : JSON.stringify(v)
+}
+
+/**
+ * Compile a schema into a serializer function.
+ * Schema: 'number' | 'string' | 'boolean' | 'any' | [itemSchema] | { key: schema }
+ * Missing values serialize as null; keys not in the schema are dropped.
+ */
+export function compileSerializer(schema) {
+  if (schema === 'number') return serializeNumber
+  if (schema === 'string') return serializeString
+  if (schema === 'boolean') return serializeBoolean
+  if (schema === 'any') return serializeAny
+
+  if (Array.isArray(schema)) {
+    const item = compileSerializer(schema[0])
+    return v => {
+      if (!Array.isArray(v)) return 'null'
+      let out = '['
+      for (let i = 0; i < v.length; i++) {
+        if (i > 0) out += ','
+        out += item(v[i])
+      }
+      return out + ']'
+    }
+  }
+
+  const fields = Object.entries(schema).map(([key, sub], i) => ({
+    key,
+    prefix: (i > 0 ? ',' : '') + JSON.stringify(key) + ':',
+    serialize: compileSerializer(sub)
+  }))
+  return v => {
+    if (v === null || typeof v !== 'object') return 'null'
+    let out = '{'
+    for (let i = 0; i < fields.length; i++) {
+      const field = fields[i]
+      out += field.prefix + field.serialize(v[field.key])
+    }
+    return out + '}'
+  }
+}
+
+// =====================================================
+// PROFILE SCHEMAS
+// =====================================================
+
+const TIER_REF = { key: 'string', rangeLabel: 'string', startQty: 'number', endQty: 'number' }
+
+const TIER_PRICES_JSON = Object.fromEntries(
+  TIER_KEYS.map(key => [key, { unit: 'number', cost: 'number', wholesale: 'number' }])
+)
+
+const SCRIPTS = { sms: 'string', dm: 'string', phone: 'string' }
+
+const CUSTOMER_VIEW = {
+  baseline: 'string',
+  markupPct: 'number',
+  tiers: [{
+    key: 'string',
+    rangeLabel: 'string',
+    startQty: 'number',
+    endQty: 'number',
+    isActive: 'boolean',
+    customerPricePerPiece: 'number',
+    customerProfitPerPiece: 'number',
+    customerProfitTotalAtStartQty: 'number'
+  }]
+}
+
+const PROFILE_SCHEMAS = {
+  minimal: {
+    unit_price: 'number',
+    true_cost_per_hat: 'number',
+    total_price: 'number',
+    setup_fee: 'number',
+    subtotal: 'number',
+    best_yield: 'number',
+    effective_yield: 'number',
+    tier_prices_json: TIER_PRICES_JSON
+  },
+
+  shop: {
+    active: {
+      qty: 'number',
+      tier: TIER_REF,
+      publishedPerPiece: 'number',
+      costPerPiece: 'number',
+      wholesalePerPiece: 'number',
+      profitPerPiece: 'number',
+      marginPct: 'number',
+      setupFeeApplied: 'number',
+      subtotal: 'number',
+      total: 'number'
+    },
+    tiers: [{
+      key: 'string',
+      rangeLabel: 'string',
+      startQty: 'number',
+      endQty: 'number',
+      isActive: 'boolean',
+      publishedPerPiece: 'number',
+      costPerPiece: 'number',
+      wholesalePerPiece: 'number',
+      profitPerPiece: 'number',
+      marginPct: 'number',
+      setupFeeApplied: 'number',
+      totalAtStartQty: 'number',
+      belowCost: 'boolean',
+      lowMargin: 'boolean',
+      hasWarning: 'boolean'
+    }],
+    customerView: CUSTOMER_VIEW,
+    display: {
+      publishedPerPiece: 'string',
+      costPerPiece: 'string',
+      wholesalePerPiece: 'string',
+      profitPerPiece: 'string',
+      marginPct: 'string',
+      setupFee: 'string',
+      subtotal: 'string',
+      total: 'string',
+      bestYield: 'string',
+      effectiveYield: 'string',
+      sheets: 'string',
+      tierPrices: 'string'
+    },
+    scripts: SCRIPTS,
+    settings: {
+      pricingMethod: 'string',
+      markupPct: 'number',
+      marginPct: 'number',
+      setupFeeDefault: 'number',
+      setupWaiveQty: 'number',
+      shopRatePerHour: 'number',
+      bestYield: 'number',
+      effectiveYield: 'number'
+    }
+  },
+
+  customer: {
+    active: {
+      qty: 'number',
+      tier: TIER_REF,
+      publishedPerPiece: 'number',
+      setupFeeApplied: 'number',
+      subtotal: 'number',
+      total: 'number'
+    },
+    customerView: CUSTOMER_VIEW,
+    display: {
+      publishedPerPiece: 'string',
+      setupFee: 'string',
+      subtotal: 'string',
+      total: 'string',
+      tierPrices: 'string'
+    },
+    scripts: SCRIPTS
+  }
+}
+
+const SERIALIZERS = Object.fromEntries(
+  Object.entries(PROFILE_SCHEMAS).map(([profile, schema]) => [profile, compileSerializer(schema)])
+)
+
+/**
+ * Resolve ?profile= to a known profile, or null if it is not recognised
+ */
+export function resolveResponseProfile(profile) {
+  if (!profile) return DEFAULT_RESPONSE_PROFILE
+  return RESPONSE_PROFILES.includes(profile) ? profile : null
+}
+
+/**
+ * Serialize a calculateCompleteQuote() result for the given profile
+ * @returns {string} JSON text
+ */
+export function serializeQuoteResult(calculated, profile = DEFAULT_RESPONSE_PROFILE) {
+  const serialize = SERIALIZERS[profile]
+  return serialize ? serialize(calculated) : JSON.stringify(calculated)
+}
@@ -0,0 +1,346 @@
+/**
+ * Patch Hat QuoteKit - Quote Revisions
+ * Re-quotes stored as a base snapshot plus compact input deltas.
+ *
+ * A quote keeps its revision-0 inputs in quotes.base_inputs. Each later
+ * revision stores only the inputs that differ from that base, the price it
+ * was quoted at and the id of the pricing context (settings + material
+ * snapshot) it was priced under. Contexts are content-addressed, so
+ * revisions priced under the same settings share one row. Tiers, scripts
+ * and breakdowns are regenerated on demand through the result cache:
+ * base + delta + context gives back the exact inputs and settings, and the
+ * stored price confirms the regenerated one (`exact`). Quotes saved before
+ * revisions existed have no context; their revision 0 is regenerated under
+ * today's settings and flagged `approximate` (the stored price stays the
+ * quoted one).
+ *
+ * Tables and the add_quote_revision() RPC: supabase-quote-revisions.sql
+ */
+
+import { createHash } from 'crypto'
+import { calculateCompleteQuote } from './pricingEngine.js'
+import { PRICING_INPUT_FIELDS, getOrComputeQuote, quoteCacheKey } from './quoteCache.js'
+import { repricedFields } from './repricingJob.js'
+import { stableStringify } from './singleflight.js'
+
+export const REVISION_LIST_SELECT = 'revision,input_delta,pricing_context_id,unit_price,total_price,note,created_at'
+
+const QUOTE_BASE_SELECT = [
+  'id',
+  'created_at',
+  'current_revision',
+  'base_inputs',
+  'base_pricing_context_id',
+  'base_unit_price',
+  'base_total_price',
+  'unit_price',
+  'total_price',
+  ...PRICING_INPUT_FIELDS
+].join(',')
+
+// Context ids this process has already written (contexts never change)
+const MAX_KNOWN_CONTEXTS = 5000
+const knownContexts = new Set()
+
+// =====================================================
+// INPUT SNAPSHOTS + DELTAS
+// =====================================================
+
+/**
+ * Pricing inputs of a quote body or row; empty values dropped
+ */
+export function inputSnapshot(source) {
+  const snapshot = {}
+  for (const field of PRICING_INPUT_FIELDS) {
+    const value = source?.[field]
+    if (value === null || value === undefined || value === '') continue
+    snapshot[field] = value
+  }
+  return snapshot
+}
+
+/**
+ * Inputs that differ from base; a field present in base but not in
+ * inputs is recorded as null (cleared)
+ */
+export function diffInputs(base, inputs) {
+  const delta = {}
+  for (const field of PRICING_INPUT_FIELDS) {
+    const from = base?.[field]
+    const to = inputs?.[field]
+    if (from === to) continue
+    delta[field] = to === undefined ? null : to
+  }
+  return delta
+}
+
+export function applyInputDelta(base, delta) {
+  const inputs = { ...base }
+  for (const [field, value] of Object.entries(delta || {})) {
+    if (value === null) delete inputs[field]
+    else inputs[field] = value
+  }
+  return inputs
+}
+
+// =====================================================
+// PRICING CONTEXTS
+// =====================================================
+
+/**
+ * Content-addressed snapshot of the settings + material a price used
+ */
+export function pricingContext(userId, shopSettings, material) {
+  const id = createHash('sha256')
+    .update(stableStringify([userId, shopSettings, material]))
+    .digest('base64url')
+  return { id, user_id: userId, shop_settings: shopSettings, material }
+}
+
+export async function savePricingContext(supabase, context) {
+  if (knownContexts.has(context.id)) return
+
+  const { error } = await supabase
+    .from('pricing_contexts')
+    .upsert([context], { onConflict: 'id', ignoreDuplicates: true })
+  if (error) throw error
+
+  if (knownContexts.size >= MAX_KNOWN_CONTEXTS) knownContexts.clear()
+  knownContexts.add(context.id)
+}
+
+/**
+ * Price inputs under a (possibly historical) settings + material snapshot
+ */
+export function priceInContext(userId, inputs, shopSettings, material) {
+  return getOrComputeQuote(
+    quoteCacheKey(userId, inputs, shopSettings, material),
+    () => calculateCompleteQuote(inputs, shopSettings, material)
+  )
+}
+
+/**
+ * Revision-0 columns for a newly saved quote
+ */
+export function baseSnapshotFields(inputs, context, calculated) {
+  return {
+    base_inputs: inputs,
+    base_pricing_context_id: context.id,
+    base_unit_price: calculated.unit_price,
+    base_total_price: calculated.total_price
+  }
+}
+
+/**
+ * Record a saved quote's revision 0: its pricing context and base columns.
+ * Runs after the quote insert so a failure here never loses the quote.
+ */
+export async function recordQuoteBase(supabase, userId, quoteId, inputs, shopSettings, material, calculated) {
+  const context = pricingContext(userId, shopSettings, material)
+  await savePricingContext(supabase, context)
+
+  const { error } = await supabase
+    .from('quotes')
+    .update(baseSnapshotFields(inputs, context, calculated))
+    .eq('id', quoteId)
+    .eq('user_id', userId)
+  if (error) throw error
+}
+
+async function loadContext(supabase, userId, contextId, materialId) {
+  if (contextId) {
+    const { data, error } = await supabase
+      .from('pricing_contexts')
+      .select('shop_settings,material')
+      .eq('id', contextId)
+      .maybeSingle()
+    if (error) throw error
+    return data
+  }
+
+  // Quotes saved before revisions existed: fall back to today's settings
+  const [settingsResult, materialResult] = await Promise.all([
+    supabase.from('shop_settings').select('*').eq('user_id', userId).maybeSingle(),
+    supabase.from('patch_materials').select('*').eq('id', materialId).eq('user_id', userId).maybeSingle()
+  ])
+  for (const result of [settingsResult, materialResult]) {
+    if (result.error) throw result.error
+  }
+  if (!settingsResult.data || !materialResult.data) return null
+  return { shop_settings: settingsResult.data, material: materialResult.data }
+}
+
+// =====================================================
+// MAIN EXPORTS
+// =====================================================
+
+/**
+ * Price the full quote inputs in body and record them as the quote's next
+ * revision (the quote row is updated to match)
+ * @returns {Promise<{ revision: Object } | { error: string, status: number }>}
+ */
+export async function createQuoteRevision(supabase, userId, quoteId, body) {
+  const [quoteResult, settingsResult, materialResult] = await Promise.all([
+    supabase
+      .from('quotes')
+      .select(QUOTE_BASE_SELECT)
+      .eq('id', quoteId)
+      .eq('user_id', userId)
+      .maybeSingle(),
+    supabase
+      .from('shop_settings')
+      .select('*')
+      .eq('user_id', userId)
+      .single(),
+    supabase
+      .from('patch_materials')
+      .select('*')
+      .eq('id', body.patch_material_id)
+      .eq('user_id', userId)
+      .single()
+  ])
+
+  if (quoteResult.error) throw quoteResult.error
+  const quote = quoteResult.data
+  if (!quote) return { error: 'Quote not found', status: 404 }
+  if (!settingsResult.data) return { error: 'Shop settings not found', status: 400 }
+  if (!materialResult.data) return { error: 'Material not found', status: 400 }
+
+  const inputs = inputSnapshot(body)
+  const context = pricingContext(userId, settingsResult.data, materialResult.data)
+  const calculated = priceInContext(userId, inputs, context.shop_settings, context.material)
+  await savePricingContext(supabase, context)
+
+  // Quotes saved before revisions existed get their base recorded now
+  const base = quote.base_inputs || inputSnapshot(quote)
+  const legacyBase = quote.base_inputs
+    ? null
+    : { base_inputs: base, base_unit_price: quote.unit_price, base_total_price: quote.total_price }
+
+  const { data, error } = await supabase.rpc('add_quote_revision', {
+    p_quote_id: quoteId,
+    p_expected_revision: quote.current_revision || 0,
+    p_revision: {
+      input_delta: diffInputs(base, inputs),
+      pricing_context_id: context.id,
+      unit_price: calculated.unit_price,
+      total_price: calculated.total_price,
+      note: body.note || null
+    },
+    p_quote_fields: { ...inputs, ...repricedFields(calculated) },
+    p_base: legacyBase
+  })
+
+  if (error?.code === '40001') return { error: 'Quote was revised by another request; reload and retry', status: 409 }
+  if (error?.code === 'P0002') return { error: 'Quote not found', status: 404 }
+  if (error) throw error
+  return { revision: data }
+}
+
+/**
+ * Compact history: revision 0 (the base) plus every delta, no outputs
+ */
+export async function listQuoteRevisions(supabase, userId, quoteId) {
+  const [quoteResult, revisionsResult] = await Promise.all([
+    supabase
+      .from('quotes')
+      .select('id,created_at,current_revision,base_inputs,base_pricing_context_id,base_unit_price,base_total_price,unit_price,total_price')
+      .eq('id', quoteId)
+      .eq('user_id', userId)
+      .maybeSingle(),
+    supabase
+      .from('quote_revisions')
+      .select(REVISION_LIST_SELECT)
+      .eq('quote_id', quoteId)
+      .eq('user_id', userId)
+      .order('revision', { ascending: true })
+  ])
+
+  for (const result of [quoteResult, revisionsResult]) {
+    if (result.error) throw result.error
+  }
+  const quote = quoteResult.data
+  if (!quote) return null
+
+  return {
+    quoteId: quote.id,
+    currentRevision: quote.current_revision || 0,
+    baseInputs: quote.base_inputs,
+    // No pricing context: only today's settings can regenerate the revision
+    revisions: [
+      {
+        revision: 0,
+        input_delta: {},
+        pricing_context_id: quote.base_pricing_context_id,
+        unit_price: quote.base_inputs ? quote.base_unit_price : quote.unit_price,
+        total_price: quote.base_inputs ? quote.base_total_price : quote.total_price,
+        note: null,
+        created_at: quote.created_at
+      },
+      ...(revisionsResult.data || [])
+    ].map(row => ({ ...row, approximate: !row.pricing_context_id }))
+  }
+}
+
+/**
+ * Rebuild one revision's inputs and regenerate its outputs
+ * @returns {Promise<Object|null>} { revision, inputs, pricingContextId, note, createdAt, stored, exact, approximate, calculated }
+ */
+export async function loadQuoteRevision(supabase, userId, quoteId, revision) {
+  const [quoteResult, revisionResult] = await Promise.all([
+    supabase
+      .from('quotes')
+      .select(QUOTE_BASE_SELECT)
+      .eq('id', quoteId)
+      .eq('user_id', userId)
+      .maybeSingle(),
+    revision > 0
+      ? supabase
+          .from('quote_revisions')
+          .select(REVISION_LIST_SELECT)
+          .eq('quote_id', quoteId)
+          .eq('user_id', userId)
+          .eq('revision', revision)
+          .maybeSingle()
+      : Promise.resolve({ data: null, error: null })
+  ])
+
+  for (const result of [quoteResult, revisionResult]) {
+    if (result.error) throw result.error
+  }
+  const quote = quoteResult.data
+  if (!quote || (revision > 0 && !revisionResult.data)) return null
+
+  // Without base_inputs nothing was revised yet: the quote row is revision 0
+  const row = revisionResult.data || {
+    input_delta: {},
+    pricing_context_id: quote.base_pricing_context_id,
+    unit_price: quote.base_inputs ? quote.base_unit_price : quote.unit_price,
+    total_price: quote.base_inputs ? quote.base_total_price : quote.total_price,
+    note: null,
+    created_at: quote.created_at
+  }
+
+  const inputs = applyInputDelta(quote.base_inputs || inputSnapshot(quote), row.input_delta)
+  const context = await loadContext(supabase, userId, row.pricing_context_id, inputs.patch_material_id)
+  if (!context) return null
+
+  const calculated = priceInContext(userId, inputs, context.shop_settings, context.material)
+  const stored = { unit_price: row.unit_price, total_price: row.total_price }
+  // Rebuilt under today's settings: a matching price is a coincidence, not a check
+  const approximate = !row.pricing_context_id
+
+  return {
+    revision,
+    inputs,
+    pricingContextId: row.pricing_context_id,
+    note: row.note,
+    createdAt: row.created_at,
+    stored,
+    exact: !approximate && stored.total_price !== null && stored.total_price !== undefined &&
+      Number(stored.unit_price) === calculated.unit_price &&
+      Number(stored.total_price) === calculated.total_price,
+    approximate,
+    calculated
+  }
+}
@@ -0,0 +1,387 @@
+/**
+ * Patch Hat QuoteKit - Background Quote Re-pricing
+ * Re-prices draft/sent quotes after shop settings change.
+ *
+ * Saving shop settings inserts a repricing_jobs row and returns; the job
+ * itself runs after the response. It walks the user's quotes in
+ * (created_at, id) keyset chunks, prefetching the next chunk while the
+ * current one is priced and written back through the reprice_quotes() RPC
+ * by a small pool of concurrent writers. The cursor and counters are saved
+ * after every chunk, so a job interrupted by a deploy or timeout can be
+ * resumed from the last chunk it finished.
+ *
+ * Every run owns its job through a runner id stored on the row. Progress
+ * writes refresh heartbeat_at and only succeed while the row still names
+ * this runner; a resume (on any instance) must first claim the job through
+ * claim_repricing_job(), which only succeeds once the heartbeat is stale.
+ *
+ * The job runs on the saving request's cookie-scoped Supabase client. Once
+ * the response is sent its session cannot be refreshed (new cookies have
+ * nowhere to go), so a job still running when the access token nears expiry
+ * stops at a chunk boundary and records itself as failed while it still
+ * can; resuming it from a fresh request continues from the saved cursor.
+ */
+
+import { randomUUID } from 'crypto'
+import { calculateCompleteQuote, roundToCents } from './pricingEngine.js'
+import { PRICING_INPUT_FIELDS, PRICING_SETTINGS_FIELDS, normalizeQuoteInputs } from './quoteCache.js'
+import { stableStringify } from './singleflight.js'
+
+export const REPRICE_CHUNK_SIZE = 500
+export const REPRICE_WRITE_BATCH = 100
+export const REPRICE_CONCURRENCY = 4
+export const REPRICE_STATUSES = ['draft', 'sent']
+// A runner that has not written progress for this long is presumed dead
+export const REPRICE_STALE_MS = 2 * 60 * 1000
+// Stop once the request's access token has less than this left
+export const REPRICE_SESSION_MARGIN_MS = 60 * 1000
+
+const REPRICE_SELECT = ['id', 'created_at', ...PRICING_INPUT_FIELDS].join(',')
+
+// One running job per user in this process; a newer job cancels the older
+const activeJobs = new Map()
+const stats = { started: 0, completed: 0, failed: 0, cancelled: 0, quotesRepriced: 0 }
+
+/**
+ * Whether a settings save changed anything the engine reads (both rows as
+ * stored, so types match; no previous row counts as a change)
+ */
+export function pricingSettingsChanged(before, after) {
+  if (!before || !after) return true
+  return PRICING_SETTINGS_FIELDS.some(field =>
+    stableStringify(before[field] ?? null) !== stableStringify(after[field] ?? null)
+  )
+}
+
+/**
+ * Computed quote columns for one quote (written by POST quotes and by
+ * every re-price)
+ */
+export function repricedFields(calculated) {
+  const shopRate = calculated.settings.shopRatePerHour
+  return {
+    shop_rate: shopRate,
+    shop_minute_rate: roundToCents(shopRate / 60),
+    unit_price: calculated.unit_price,
+    true_cost_per_hat: calculated.true_cost_per_hat,
+    total_price: calculated.total_price,
+    setup_fee: calculated.setup_fee,
+    best_yield: calculated.best_yield,
+    effective_yield: calculated.effective_yield,
+    tier_prices_json: calculated.tier_prices_json,
+    quote_sms: calculated.quote_sms,
+    quote_dm: calculated.quote_dm,
+    quote_phone: calculated.quote_phone
+  }
+}
+
+/**
+ * Price one chunk. Quotes with identical pricing inputs and material share
+ * one engine run via memo (it lives for the whole job).
+ */
+export function priceChunk(quotes, shopSettings, materialsById, memo = new Map()) {
+  const updates = []
+  let failed = 0
+
+  for (const quote of quotes) {
+    const material = materialsById.get(quote.patch_material_id)
+    if (!material) {
+      failed++
+      continue
+    }
+
+    const key = JSON.stringify(normalizeQuoteInputs(quote))
+    let fields = memo.get(key)
+    if (!fields) {
+      fields = repricedFields(calculateCompleteQuote(quote, shopSettings, material))
+      memo.set(key, fields)
+    }
+    updates.push({ id: quote.id, ...fields })
+  }
+
+  return { updates, failed }
+}
+
+/**
+ * Run worker over items with at most `concurrency` in flight
+ */
+async function runPool(items, concurrency, worker) {
+  const results = new Array(items.length)
+  let next = 0
+  const lanes = Array.from({ length: Math.min(concurrency, items.length) }, async () => {
+    while (next < items.length) {
+      const i = next++
+      results[i] = await worker(items[i])
+    }
+  })
+  await Promise.all(lanes)
+  return results
+}
+
+/**
+ * Write one chunk back in RPC batches; returns rows actually updated
+ */
+async function writeUpdates(supabase, updates) {
+  const batches = []
+  for (let i = 0; i < updates.length; i += REPRICE_WRITE_BATCH) {
+    batches.push(updates.slice(i, i + REPRICE_WRITE_BATCH))
+  }
+
+  const counts = await runPool(batches, REPRICE_CONCURRENCY, async batch => {
+    const { data, error } = await supabase.rpc('reprice_quotes', { updates: batch })
+    if (error) throw error
+    return data || 0
+  })
+  return counts.reduce((sum, n) => sum + n, 0)
+}
+
+/**
+ * Fetch one keyset chunk of re-priceable quotes after the cursor
+ */
+async function fetchChunk(supabase, userId, cursor) {
+  let query = supabase
+    .from('quotes')
+    .select(REPRICE_SELECT)
+    .eq('user_id', userId)
+    .in('status', REPRICE_STATUSES)
+
+  if (cursor) {
+    query = query.or(
+      `created_at.gt."${cursor.createdAt}",and(created_at.eq."${cursor.createdAt}",id.gt.${cursor.id})`
+    )
+  }
+
+  const { data, error } = await query
+    .order('created_at', { ascending: true })
+    .order('id', { ascending: true })
+    .limit(REPRICE_CHUNK_SIZE)
+
+  if (error) throw error
+  return data || []
+}
+
+/**
+ * Write job progress as its runner. Finishing releases the heartbeat so a
+ * failed job can be resumed at once. Throws (lostClaim) when another runner
+ * has taken the job over or it was cancelled elsewhere.
+ */
+async function updateJob(supabase, job, fields) {
+  const now = new Date().toISOString()
+  const finished = ['completed', 'failed', 'cancelled'].includes(fields.status)
+  const { data, error } = await supabase
+    .from('repricing_jobs')
+    .update({ ...fields, heartbeat_at: finished ? null : now, updated_at: now })
+    .eq('id', job.id)
+    .eq('runner', job.runner)
+    .select('id')
+  if (error) throw error
+  if (!data || data.length === 0) {
+    throw Object.assign(new Error('Repricing job was taken over by another runner'), { lostClaim: true })
+  }
+}
+
+/**
+ * Throw while the request's session can still write the failure: less
+ * than REPRICE_SESSION_MARGIN_MS left on its access token
+ */
+async function assertSessionFresh(supabase) {
+  const { data } = await supabase.auth.getSession()
+  const expiresAt = data?.session?.expires_at
+  if (expiresAt && expiresAt * 1000 - Date.now() < REPRICE_SESSION_MARGIN_MS) {
+    throw new Error('Session expired before the job finished; resume it to continue')
+  }
+}
+
+// =====================================================
+// MAIN EXPORTS
+// =====================================================
+
+/**
+ * Record a new job for the user, already claimed by a fresh runner (cheap:
+ * one insert). Call runRepricingJob() afterwards, outside the request's
+ * critical path.
+ */
+export async function startRepricingJob(supabase, userId, trigger = 'shop_settings') {
+  // Stop this process's older job for the user at its next chunk boundary
+  const previous = activeJobs.get(userId)
+  if (previous) previous.cancelled = true
+
+  const { data, error } = await supabase
+    .from('repricing_jobs')
+    .insert([{
+      user_id: userId,
+      trigger,
+      status: 'pending',
+      runner: randomUUID(),
+      heartbeat_at: new Date().toISOString()
+    }])
+    .select()
+    .single()
+
+  if (error) throw error
+  stats.started++
+  return data
+}
+
+/**
+ * Take over a job for a new runner (resume). Returns the claimed job, or
+ * null while another runner's heartbeat is fresh or the job has finished.
+ */
+export async function claimRepricingJob(supabase, jobId) {
+  const { data, error } = await supabase.rpc('claim_repricing_job', {
+    p_job_id: jobId,
+    p_runner: randomUUID(),
+    p_stale_seconds: REPRICE_STALE_MS / 1000
+  })
+  if (error) throw error
+  return data || null
+}
+
+/**
+ * Run (or resume) a claimed job to completion from its saved cursor
+ * @param {Object} job - Row from startRepricingJob() or claimRepricingJob()
+ */
+export async function runRepricingJob(supabase, userId, job) {
+  const handle = { jobId: job.id, cancelled: false }
+  activeJobs.set(userId, handle)
+
+  const counters = {
+    processed: job.processed || 0,
+    updated_count: job.updated_count || 0,
+    failed_count: job.failed_count || 0
+  }
+  let cursor = job.cursor_id ? { createdAt: job.cursor_created_at, id: job.cursor_id } : null
+
+  try {
+    const [settingsResult, materialsResult, countResult, supersededResult] = await Promise.all([
+      supabase
+        .from('shop_settings')
+        .select('*')
+        .eq('user_id', userId)
+        .single(),
+      supabase
+        .from('patch_materials')
+        .select('*')
+        .eq('user_id', userId),
+      supabase
+        .from('quotes')
+        .select('id', { count: 'exact', head: true })
+        .eq('user_id', userId)
+        .in('status', REPRICE_STATUSES),
+      // Jobs left behind by other processes are superseded by this one;
+      // clearing runner makes a still-live runner stop at its next write
+      job.started_at
+        ? Promise.resolve({ error: null })
+        : supabase
+            .from('repricing_jobs')
+            .update({ status: 'cancelled', runner: null, heartbeat_at: null, finished_at: new Date().toISOString() })
+            .eq('user_id', userId)
+            .in('status', ['pending', 'running'])
+            .neq('id', job.id)
+    ])
+
+    for (const result of [settingsResult, materialsResult, countResult, supersededResult]) {
+      if (result.error) throw result.error
+    }
+
+    const shopSettings = settingsResult.data
+    const materialsById = new Map((materialsResult.data || []).map(m => [m.id, m]))
+    const memo = new Map()
+
+    // The count spans the whole keyset range, including chunks an earlier run finished
+    await updateJob(supabase, job, {
+      status: 'running',
+      total: Math.max(countResult.count || 0, counters.processed),
+      started_at: job.started_at || new Date().toISOString(),
+      error: null
+    })
+
+    let nextChunk = fetchChunk(supabase, userId, cursor)
+    while (true) {
+      const chunk = await nextChunk
+      if (handle.cancelled) {
+        await updateJob(supabase, job, { status: 'cancelled', finished_at: new Date().toISOString() })
+        stats.cancelled++
+        return
+      }
+      if (chunk.length === 0) break
+      // Cursor already covers every finished chunk; stop before this one's writes
+      await assertSessionFresh(supabase)
+
+      const last = chunk[chunk.length - 1]
+      const chunkCursor = { createdAt: last.created_at, id: last.id }
+
+      // Prefetch the next chunk while this one is priced and written
+      nextChunk = chunk.length < REPRICE_CHUNK_SIZE
+        ? Promise.resolve([])
+        : fetchChunk(supabase, userId, chunkCursor)
+      nextChunk.catch(() => {})
+
+      const { updates, failed } = priceChunk(chunk, shopSettings, materialsById, memo)
+      const written = await writeUpdates(supabase, updates)
+
+      cursor = chunkCursor
+      counters.processed += chunk.length
+      counters.updated_count += written
+      counters.failed_count += failed
+      stats.quotesRepriced += written
+
+      await updateJob(supabase, job, {
+        ...counters,
+        cursor_created_at: cursor.createdAt,
+        cursor_id: cursor.id
+      })
+    }
+
+    stats.completed++
+    await updateJob(supabase, job, {
+      status: 'completed',
+      total: counters.processed,
+      finished_at: new Date().toISOString()
+    })
+  } catch (error) {
+    // Another runner owns the job now; leave the row to it
+    if (error.lostClaim) {
+      stats.cancelled++
+      return
+    }
+    // Cursor stays at the last finished chunk, so the job can be resumed
+    stats.failed++
+    console.error('Repricing job failed:', error)
+    await updateJob(supabase, job, { status: 'failed', error: error.message || String(error) })
+      .catch(() => {})
+  } finally {
+    if (activeJobs.get(userId) === handle) activeJobs.delete(userId)
+  }
+}
+
+/**
+ * Load a job (or the user's latest) with a progress percentage
+ * @param {string} jobId - Job id or 'latest'
+ */
+export async function getRepricingJob(supabase, userId, jobId) {
+  let query = supabase
+    .from('repricing_jobs')
+    .select('*')
+    .eq('user_id', userId)
+  query = jobId === 'latest'
+    ? query.order('created_at', { ascending: false }).limit(1)
+    : query.eq('id', jobId)
+
+  const { data, error } = await query.maybeSingle()
+  if (error) throw error
+  if (!data) return null
+
+  let progress = data.status === 'completed' ? 100 : 0
+  if (data.total > 0) progress = Math.min(100, Math.round((data.processed / data.total) * 100))
+
+  // Running here, or on any instance whose heartbeat is still fresh
+  const heartbeatFresh = data.heartbeat_at && Date.now() - Date.parse(data.heartbeat_at) < REPRICE_STALE_MS
+  const active = activeJobs.get(userId)?.jobId === data.id || Boolean(heartbeatFresh)
+
+  return { ...data, progress, active }
+}
+
+export function getRepricingStats() {
+  return { ...stats, active: activeJobs.size }
+}
@@ -0,0 +1,75 @@
+/**
+ * Patch Hat QuoteKit - Request Coalescing (singleflight)
+ * Concurrent identical requests share one in-flight promise.
+ *
+ * A double-click or several tabs reloading at once fire identical requests
+ * for the same user; only the first (the leader) runs the Supabase reads and
+ * engine work, the rest await its promise. Entries are removed as soon as
+ * the promise settles, so nothing is cached beyond the in-flight window.
+ */
+
+import { createHash } from 'crypto'
+
+const inFlight = new Map()
+const counters = new Map()
+
+function countersFor(kind) {
+  let c = counters.get(kind)
+  if (!c) {
+    c = { executed: 0, coalesced: 0 }
+    counters.set(kind, c)
+  }
+  return c
+}
+
+/**
+ * JSON with object keys sorted at every level
+ */
+export function stableStringify(value) {
+  if (value === null || typeof value !== 'object') return JSON.stringify(value) ?? 'null'
+  if (Array.isArray(value)) return `[${value.map(stableStringify).join(',')}]`
+  const keys = Object.keys(value).filter(k => value[k] !== undefined).sort()
+  return `{${keys.map(k => `${JSON.stringify(k)}:${stableStringify(value[k])}`).join(',')}}`
+}
+
+/**
+ * Hash arbitrary key parts into a compact map key
+ */
+export function singleflightKey(...parts) {
+  return createHash('sha256').update(stableStringify(parts)).digest('base64url')
+}
+
+/**
+ * Run fn once per key among concurrent callers
+ * @param {string} kind - Counter bucket, e.g. 'quotes/calculate'
+ * @param {string} key - Identity of the request (see singleflightKey)
+ * @param {Function} fn - Async work to share
+ */
+export function singleflight(kind, key, fn) {
+  const mapKey = `${kind}:${key}`
+  const c = countersFor(kind)
+
+  const existing = inFlight.get(mapKey)
+  if (existing) {
+    c.coalesced++
+    return existing
+  }
+
+  c.executed++
+  const promise = Promise.resolve()
+    .then(fn)
+    .finally(() => inFlight.delete(mapKey))
+  inFlight.set(mapKey, promise)
+  return promise
+}
+
+export function getSingleflightStats() {
+  const byKind = Object.fromEntries([...counters].map(([kind, c]) => [kind, { ...c }]))
+  let executed = 0
+  let coalesced = 0
+  for (const c of counters.values()) {
+    executed += c.executed
+    coalesced += c.coalesced
+  }
+  return { executed, coalesced, inFlight: inFlight.size, byKind }
+}
@@ -0,0 +1,234 @@
+#!/usr/bin/env node
+/**
+ * Startup Budget Report
+ * JS bytes and estimated time-to-interactive for the app shell and each
+ * view, checked against budgets after `next build` (fails the build when
+ * a budget is exceeded).
+ *
+ * - shell: scripts referenced by the prerendered index.html
+ * - views: shell + the chunks next/dynamic loads for the view
+ *   (react-loadable-manifest.json; webpack writes one at the root, Turbopack
+ *   one per app entry under server/app, with different key formats)
+ *
+ * If any view's chunks cannot be found the script fails rather than passing
+ * with that view unchecked, so a change in the build output format cannot
+ * quietly switch the budget off.
+ *
+ * TTI is a model of a shop-floor tablet: one round trip per request wave,
+ * gzip bytes over the downlink, then parse/compile/execute per raw KB.
+ * The quote builder also marks `quote-builder-ready` at runtime so the
+ * estimate can be checked against a real device.
+ *
+ * Usage: node startup_budget.js [.next dir]
+ * Writes <.next dir>/startup-budget.json
+ */
+
+import fs from 'fs';
+import path from 'path';
+import zlib from 'zlib';
+
+const NEXT_DIR = path.resolve(process.argv[2] || '.next');
+
+// Mid-range Android tablet on shop Wi-Fi
+const DEVICE = { downlinkKbps: 10000, rttMs: 60, cpuMsPerKB: 1.5 };
+
+// gzip KB over the wire and estimated ms until the view responds to input
+const BUDGETS = {
+  shell: { gzipKB: 200, ttiMs: 1000 },
+  'quote-builder': { gzipKB: 260, ttiMs: 1000 },
+  default: { gzipKB: 320, ttiMs: 1500 }
+};
+
+// View id -> module imported by app/page.js
+const VIEWS = {
+  dashboard: 'dashboard',
+  'quote-builder': 'quote-builder',
+  customers: 'customers-page',
+  materials: 'patch-materials',
+  'shop-settings': 'shop-settings',
+  'profit-first': 'profit-first',
+  onboarding: 'onboarding-wizard'
+};
+
+function fileSizes(files) {
+  let raw = 0;
+  let gzip = 0;
+  for (const file of files) {
+    const full = path.join(NEXT_DIR, file);
+    if (!fs.existsSync(full)) continue;
+    const content = fs.readFileSync(full);
+    raw += content.length;
+    gzip += zlib.gzipSync(content, { level: 9 }).length;
+  }
+  return { raw, gzip };
+}
+
+/**
+ * One request wave: a round trip, the transfer, then CPU for the raw bytes
+ */
+function waveMs({ raw, gzip }) {
+  const transferMs = (gzip * 8) / DEVICE.downlinkKbps;
+  const cpuMs = (raw / 1024) * DEVICE.cpuMsPerKB;
+  return DEVICE.rttMs + transferMs + cpuMs;
+}
+
+function findFiles(dir, name, found = []) {
+  if (!fs.existsSync(dir)) return found;
+  for (const entry of fs.readdirSync(dir, { withFileTypes: true })) {
+    if (entry.name === 'cache') continue;
+    const full = path.join(dir, entry.name);
+    if (entry.isDirectory()) findFiles(full, name, found);
+    else if (entry.name === name) found.push(full);
+  }
+  return found;
+}
+
+/**
+ * Scripts the browser loads before the shell hydrates
+ */
+function shellScripts() {
+  const html = path.join(NEXT_DIR, 'server', 'app', 'index.html');
+  const scripts = new Set();
+
+  if (fs.existsSync(html)) {
+    const content = fs.readFileSync(html, 'utf8');
+    for (const match of content.matchAll(/\/_next\/(static\/[^"'\s)]+?\.js)/g)) scripts.add(match[1]);
+    // Client chunks named in the inline RSC payload also load before hydration
+    for (const match of content.matchAll(/\\?"(static\/chunks\/[^"\\]+?\.js)\\?"/g)) scripts.add(match[1]);
+    return [...scripts];
+  }
+
+  // Not prerendered: fall back to the build manifests
+  const buildManifest = path.join(NEXT_DIR, 'build-manifest.json');
+  const appManifest = path.join(NEXT_DIR, 'app-build-manifest.json');
+  if (fs.existsSync(buildManifest)) {
+    const manifest = JSON.parse(fs.readFileSync(buildManifest, 'utf8'));
+    for (const file of [...(manifest.polyfillFiles || []), ...(manifest.rootMainFiles || [])]) scripts.add(file);
+  }
+  if (fs.existsSync(appManifest)) {
+    const manifest = JSON.parse(fs.readFileSync(appManifest, 'utf8'));
+    for (const file of manifest.pages?.['/page'] || []) scripts.add(file);
+  }
+  return [...scripts].filter(file => file.endsWith('.js'));
+}
+
+/**
+ * Chunks next/dynamic loads per imported module, keyed by module request
+ */
+function dynamicChunks() {
+  const manifests = findFiles(NEXT_DIR, 'react-loadable-manifest.json');
+  const chunks = {};
+  for (const file of manifests) {
+    const manifest = JSON.parse(fs.readFileSync(file, 'utf8'));
+    for (const [key, entry] of Object.entries(manifest)) {
+      chunks[key] = [...new Set([...(chunks[key] || []), ...(entry.files || [])])];
+    }
+  }
+  return { manifests, chunks };
+}
+
+/**
+ * Whether a manifest key refers to app/<moduleName>:
+ * webpack   "app/page.js -> ./quote-builder"
+ * Turbopack "[project]/app/quote-builder.js [app-client] (ecmascript, ...)"
+ */
+function keyNamesModule(key, moduleName) {
+  return new RegExp(`(^|[\\s/])${moduleName}(\\.jsx?)?($|[\\s\\[(])`).test(key);
+}
+
+function viewFiles(chunks, moduleName) {
+  const files = new Set();
+  for (const [key, list] of Object.entries(chunks)) {
+    if (keyNamesModule(key, moduleName)) {
+      for (const file of list) files.add(file.replace(/^\/?_next\//, ''));
+    }
+  }
+  return [...files].filter(file => file.endsWith('.js'));
+}
+
+function kb(bytes) {
+  return (bytes / 1024).toFixed(1);
+}
+
+function main() {
+  if (!fs.existsSync(NEXT_DIR)) {
+    console.error(`No build output at ${NEXT_DIR}; run \`next build\` first`);
+    process.exit(1);
+  }
+
+  const shellFiles = shellScripts();
+  const shell = fileSizes(shellFiles);
+  const shellMs = waveMs(shell);
+  const { manifests, chunks } = dynamicChunks();
+
+  if (shellFiles.length === 0) {
+    console.error(`❌ No shell scripts found under ${NEXT_DIR} (index.html / build manifests); cannot check budgets`);
+    process.exit(1);
+  }
+  if (manifests.length === 0) {
+    console.error(`❌ No react-loadable-manifest.json under ${NEXT_DIR}; cannot find the view chunks`);
+    process.exit(1);
+  }
+
+  const rows = [{ name: 'shell', ...shell, ttiMs: shellMs, files: shellFiles.length, budget: BUDGETS.shell }];
+  const missing = [];
+
+  for (const [view, moduleName] of Object.entries(VIEWS)) {
+    const files = viewFiles(chunks, moduleName).filter(file => !shellFiles.includes(file));
+    if (files.length === 0) {
+      missing.push(view);
+      continue;
+    }
+    const own = fileSizes(files);
+    rows.push({
+      name: view,
+      raw: shell.raw + own.raw,
+      gzip: shell.gzip + own.gzip,
+      // The view chunk is a second wave after the shell hydrates
+      ttiMs: shellMs + waveMs(own),
+      files: shellFiles.length + files.length,
+      budget: BUDGETS[view] || BUDGETS.default
+    });
+  }
+
+  console.log('\n📦 Startup budget');
+  console.log('='.repeat(72));
+  console.log(
+    `Device model: ${DEVICE.downlinkKbps / 1000} Mbps, ${DEVICE.rttMs}ms RTT, ${DEVICE.cpuMsPerKB}ms CPU per KB`
+  );
+  console.log('-'.repeat(72));
+  console.log(`${'View'.padEnd(16)}${'Raw KB'.padStart(10)}${'Gzip KB'.padStart(10)}${'TTI ms'.padStart(10)}  Budget`);
+
+  let failed = 0;
+  for (const row of rows) {
+    row.overBudget = row.gzip / 1024 > row.budget.gzipKB || row.ttiMs > row.budget.ttiMs;
+    if (row.overBudget) failed++;
+    console.log(
+      `${row.name.padEnd(16)}${kb(row.raw).padStart(10)}${kb(row.gzip).padStart(10)}` +
+      `${Math.round(row.ttiMs).toString().padStart(10)}  ` +
+      `${row.overBudget ? '❌' : '✅'} ${row.budget.gzipKB} KB / ${row.budget.ttiMs} ms`
+    );
+  }
+
+  fs.writeFileSync(
+    path.join(NEXT_DIR, 'startup-budget.json'),
+    JSON.stringify({ device: DEVICE, rows, missing }, null, 2)
+  );
+
+  // A view without chunks is unchecked: statically imported, or a manifest
+  // key format this script does not understand
+  if (missing.length > 0) {
+    console.error(`\n❌ No dynamic chunk found for: ${missing.join(', ')}`);
+    console.error(`   Manifests read: ${manifests.map(file => path.relative(NEXT_DIR, file)).join(', ')}`);
+    console.error(`   Sample keys: ${Object.keys(chunks).slice(0, 3).map(key => JSON.stringify(key)).join(', ') || '(none)'}`);
+    process.exit(1);
+  }
+
+  if (failed > 0) {
+    console.error(`\n❌ ${failed} startup budget(s) exceeded`);
+    process.exit(1);
+  }
+  console.log('\n✅ Startup budgets met');
+}
+
+main();
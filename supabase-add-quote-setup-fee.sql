@@ -0,0 +1,15 @@
+-- =====================================================
+-- ADD SETUP FEE TO EXISTING QUOTES TABLE
+-- Run this in Supabase SQL Editor
+-- (databases created from supabase-migrations.sql before it had the column)
+-- =====================================================
+
+-- The engine returns setup_fee with every quote, but the base schema never
+-- had a column for it
+ALTER TABLE quotes
+ADD COLUMN IF NOT EXISTS setup_fee NUMERIC;
+
+-- =====================================================
+-- MIGRATION COMPLETE
+-- =====================================================
+-- Verify by running: SELECT qty, unit_price, setup_fee, total_price FROM quotes ORDER BY created_at DESC LIMIT 5;
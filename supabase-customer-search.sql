@@ -0,0 +1,86 @@
+-- =====================================================
+-- CUSTOMER SEARCH (trigram index + ranked typeahead RPC)
+-- Run this in Supabase SQL Editor
+-- =====================================================
+-- Backs GET /api?path=customers/search&q=... so the quote builder can find
+-- a customer without downloading the whole customers table.
+-- Name, email and phone digits are folded into one lower-cased search
+-- string with a trigram GIN index, which serves substring (ILIKE '%q%')
+-- and fuzzy word matches. Results rank name prefixes first, then
+-- word/email/phone prefixes, then trigram similarity.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- =====================================================
+-- 1) SEARCH TEXT + INDEX
+-- =====================================================
+CREATE OR REPLACE FUNCTION customer_search_text(name TEXT, email TEXT, phone TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+  SELECT lower(
+    COALESCE(name, '') || ' ' ||
+    COALESCE(email, '') || ' ' ||
+    regexp_replace(COALESCE(phone, ''), '\D', '', 'g')
+  )
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_customers_search_trgm
+  ON customers USING GIN (customer_search_text(name, email, phone) gin_trgm_ops);
+
+-- Recent customers for an empty query
+CREATE INDEX IF NOT EXISTS idx_customers_user_created
+  ON customers(user_id, created_at DESC);
+
+-- =====================================================
+-- 2) RANKED SEARCH
+-- =====================================================
+-- SECURITY INVOKER + user_id = auth.uid(): RLS and the explicit filter both
+-- keep results to the caller's own customers.
+CREATE OR REPLACE FUNCTION search_customers(q TEXT, max_results INTEGER DEFAULT 20)
+RETURNS SETOF customers
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+  WITH input AS (
+    SELECT
+      lower(trim(q)) AS term,
+      -- LIKE-escaped copy of the term
+      replace(replace(replace(lower(trim(q)), '\', '\\'), '%', '\%'), '_', '\_') AS pattern,
+      regexp_replace(q, '\D', '', 'g') AS digits
+  )
+  SELECT c.*
+  FROM customers c, input i
+  WHERE c.user_id = auth.uid()
+    AND i.term <> ''
+    AND (
+      customer_search_text(c.name, c.email, c.phone) LIKE '%' || i.pattern || '%'
+      OR (length(i.digits) >= 3
+          AND customer_search_text(c.name, c.email, c.phone) LIKE '%' || i.digits || '%')
+      -- Typo tolerance once there is enough text for trigrams
+      OR (length(i.term) >= 3 AND i.term <% customer_search_text(c.name, c.email, c.phone))
+    )
+  ORDER BY
+    CASE
+      WHEN lower(c.name) LIKE i.pattern || '%' THEN 0
+      WHEN lower(c.name) LIKE '% ' || i.pattern || '%' THEN 1
+      WHEN lower(c.email) LIKE i.pattern || '%' THEN 2
+      WHEN length(i.digits) >= 3
+           AND regexp_replace(COALESCE(c.phone, ''), '\D', '', 'g') LIKE i.digits || '%' THEN 2
+      ELSE 3
+    END,
+    word_similarity(i.term, customer_search_text(c.name, c.email, c.phone)) DESC,
+    c.name
+  LIMIT LEAST(GREATEST(COALESCE(max_results, 20), 1), 50)
+$$;
+
+GRANT EXECUTE ON FUNCTION search_customers(TEXT, INTEGER) TO authenticated;
+
+-- =====================================================
+-- MIGRATION COMPLETE
+-- =====================================================
+-- Verify by running: EXPLAIN SELECT * FROM search_customers('smi');
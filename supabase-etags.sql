@@ -0,0 +1,67 @@
+-- =====================================================
+-- CONDITIONAL GET VERSIONS (ETag / If-None-Match)
+-- Run this in Supabase SQL Editor
+-- =====================================================
+-- GET shop-settings, patch-materials and customers answer with a strong
+-- ETag derived from the caller's row count + newest updated_at. When the
+-- browser sends If-None-Match, the API first asks collection_version() for
+-- that pair (one index-only aggregate, no rows transferred) and replies 304
+-- if nothing changed. Inserts and updates move updated_at, deletes move the
+-- count.
+
+-- =====================================================
+-- 1) customers.updated_at (the other tables already have it)
+-- =====================================================
+ALTER TABLE customers ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
+DROP TRIGGER IF EXISTS update_customers_updated_at ON customers;
+
+CREATE TRIGGER update_customers_updated_at
+  BEFORE UPDATE ON customers
+  FOR EACH ROW
+  EXECUTE FUNCTION update_updated_at_column();
+
+-- =====================================================
+-- 2) INDEXES
+-- =====================================================
+CREATE INDEX IF NOT EXISTS idx_patch_materials_user_updated
+  ON patch_materials(user_id, updated_at);
+
+CREATE INDEX IF NOT EXISTS idx_customers_user_updated
+  ON customers(user_id, updated_at);
+
+-- =====================================================
+-- 3) VERSION PROBE
+-- =====================================================
+-- Returns {"count": n, "last_updated": "<timestamptz>"} for the caller's
+-- rows. SECURITY INVOKER: RLS applies on top of the user_id filter.
+CREATE OR REPLACE FUNCTION collection_version(target REGCLASS)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  result JSONB;
+BEGIN
+  IF target NOT IN ('shop_settings'::REGCLASS, 'patch_materials'::REGCLASS, 'customers'::REGCLASS) THEN
+    RAISE EXCEPTION 'No version probe for %', target;
+  END IF;
+
+  EXECUTE format(
+    'SELECT jsonb_build_object(''count'', count(*), ''last_updated'', max(updated_at)) FROM %s WHERE user_id = auth.uid()',
+    target
+  )
+  INTO result;
+
+  RETURN result;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION collection_version(REGCLASS) TO authenticated;
+
+-- =====================================================
+-- MIGRATION COMPLETE
+-- =====================================================
+-- Verify by running: SELECT collection_version('patch_materials');
@@ -117,6 +117,7 @@ CREATE TABLE IF NOT EXISTS quotes (
   labor_cost_per_patch NUMERIC,
   true_cost_per_hat NUMERIC,
   unit_price NUMERIC,
+  setup_fee NUMERIC,
   total_price NUMERIC,
   tier_prices_json JSONB,
   quote_sms TEXT,
@@ -0,0 +1,232 @@
+-- =====================================================
+-- PROFIT FIRST LEDGER - PERSISTED ALLOCATIONS + MONTHLY ROLLUPS
+-- Run this in Supabase SQL Editor
+-- =====================================================
+-- Allocations are written by triggers whenever a quote's status flips to
+-- 'paid' (and reversed when it flips back, when a paid quote is deleted, or
+-- re-applied when a paid quote's total changes), so the ledger stays correct
+-- for single, bulk and direct-insert changes alike.
+-- profit_first_monthly keeps one row per user per month with running bucket
+-- totals, so the Profit First page reads its history with one indexed query.
+
+-- =====================================================
+-- 1) LEDGER ENTRIES (append-only)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS profit_first_ledger (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  -- No FK: entries outlive deleted quotes and span two quote tables
+  quote_id UUID NOT NULL,
+  quote_table TEXT NOT NULL CHECK (quote_table IN ('quotes','finished_hat_quotes')),
+  entry_type TEXT NOT NULL CHECK (entry_type IN ('allocate','reverse')),
+  month DATE NOT NULL,
+  revenue NUMERIC NOT NULL,
+  profit NUMERIC NOT NULL,
+  tax NUMERIC NOT NULL,
+  owner_pay NUMERIC NOT NULL,
+  ops NUMERIC NOT NULL,
+  buffer NUMERIC NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_profit_first_ledger_quote
+  ON profit_first_ledger(quote_table, quote_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_profit_first_ledger_user_month
+  ON profit_first_ledger(user_id, month);
+
+-- =====================================================
+-- 2) MONTHLY ROLLUPS (one row per user per month)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS profit_first_monthly (
+  user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  month DATE NOT NULL,
+  revenue NUMERIC NOT NULL DEFAULT 0,
+  profit NUMERIC NOT NULL DEFAULT 0,
+  tax NUMERIC NOT NULL DEFAULT 0,
+  owner_pay NUMERIC NOT NULL DEFAULT 0,
+  ops NUMERIC NOT NULL DEFAULT 0,
+  buffer NUMERIC NOT NULL DEFAULT 0,
+  paid_count INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (user_id, month)
+);
+
+-- =====================================================
+-- 3) RLS - users read their own rows; only triggers write
+-- =====================================================
+ALTER TABLE profit_first_ledger ENABLE ROW LEVEL SECURITY;
+ALTER TABLE profit_first_monthly ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view their own profit first ledger"
+  ON profit_first_ledger FOR SELECT
+  USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can view their own profit first monthly totals"
+  ON profit_first_monthly FOR SELECT
+  USING (auth.uid() = user_id);
+
+-- =====================================================
+-- 4) ROLLUP TRIGGER (ledger insert -> monthly totals)
+-- =====================================================
+CREATE OR REPLACE FUNCTION rollup_profit_first_ledger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO profit_first_monthly AS m
+    (user_id, month, revenue, profit, tax, owner_pay, ops, buffer, paid_count)
+  VALUES
+    (NEW.user_id, NEW.month, NEW.revenue, NEW.profit, NEW.tax, NEW.owner_pay, NEW.ops, NEW.buffer,
+     CASE WHEN NEW.entry_type = 'allocate' THEN 1 ELSE -1 END)
+  ON CONFLICT (user_id, month) DO UPDATE SET
+    revenue = m.revenue + EXCLUDED.revenue,
+    profit = m.profit + EXCLUDED.profit,
+    tax = m.tax + EXCLUDED.tax,
+    owner_pay = m.owner_pay + EXCLUDED.owner_pay,
+    ops = m.ops + EXCLUDED.ops,
+    buffer = m.buffer + EXCLUDED.buffer,
+    paid_count = m.paid_count + EXCLUDED.paid_count,
+    updated_at = NOW();
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS rollup_profit_first_ledger ON profit_first_ledger;
+
+CREATE TRIGGER rollup_profit_first_ledger
+  AFTER INSERT ON profit_first_ledger
+  FOR EACH ROW
+  EXECUTE FUNCTION rollup_profit_first_ledger();
+
+-- =====================================================
+-- 5) STATUS TRIGGER (quote paid / un-paid / re-priced / deleted -> ledger entries)
+-- =====================================================
+-- Percentages and defaults mirror calculateProfitFirstAllocations()
+-- in lib/pricingEngine.js.
+-- A paid quote whose total_price changes (e.g. add_quote_revision) has its
+-- allocation reversed and re-applied at the new amount, in the month it was
+-- first booked. Deleting a paid quote reverses its allocation.
+CREATE OR REPLACE FUNCTION record_profit_first_allocation()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  was_paid BOOLEAN := FALSE;
+  is_paid BOOLEAN := FALSE;
+  amount_changed BOOLEAN := FALSE;
+  quote_row RECORD;
+  settings profit_first_settings%ROWTYPE;
+  last_allocation profit_first_ledger%ROWTYPE;
+  allocation_month DATE := date_trunc('month', NOW())::date;
+  total NUMERIC;
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    -- Account deletion cascades to its quotes (and its ledger): nothing to reverse
+    IF NOT EXISTS (SELECT 1 FROM auth.users WHERE id = OLD.user_id) THEN
+      RETURN NULL;
+    END IF;
+    quote_row := OLD;
+    was_paid := OLD.status = 'paid';
+  ELSE
+    quote_row := NEW;
+    is_paid := NEW.status = 'paid';
+    IF TG_OP = 'UPDATE' THEN
+      was_paid := OLD.status = 'paid';
+      amount_changed := NEW.total_price IS DISTINCT FROM OLD.total_price;
+    END IF;
+  END IF;
+
+  IF was_paid AND (NOT is_paid OR amount_changed) THEN
+    -- Reverse the most recent allocation, in the month it was booked
+    SELECT * INTO last_allocation
+    FROM profit_first_ledger
+    WHERE quote_table = TG_TABLE_NAME
+      AND quote_id = quote_row.id
+      AND entry_type = 'allocate'
+    ORDER BY created_at DESC
+    LIMIT 1;
+
+    IF FOUND THEN
+      INSERT INTO profit_first_ledger
+        (user_id, quote_id, quote_table, entry_type, month, revenue, profit, tax, owner_pay, ops, buffer)
+      VALUES (
+        last_allocation.user_id, quote_row.id, TG_TABLE_NAME, 'reverse', last_allocation.month,
+        -last_allocation.revenue, -last_allocation.profit, -last_allocation.tax,
+        -last_allocation.owner_pay, -last_allocation.ops, -last_allocation.buffer
+      );
+      -- A re-priced quote stays booked in its original month
+      allocation_month := last_allocation.month;
+    END IF;
+  END IF;
+
+  IF is_paid AND (NOT was_paid OR amount_changed) THEN
+    SELECT * INTO settings FROM profit_first_settings WHERE user_id = NEW.user_id;
+    total := COALESCE(NEW.total_price, 0);
+
+    INSERT INTO profit_first_ledger
+      (user_id, quote_id, quote_table, entry_type, month, revenue, profit, tax, owner_pay, ops, buffer)
+    VALUES (
+      NEW.user_id, NEW.id, TG_TABLE_NAME, 'allocate',
+      allocation_month,
+      total,
+      ROUND(total * COALESCE(NULLIF(settings.profit_pct, 0), 5) / 100, 2),
+      ROUND(total * COALESCE(NULLIF(settings.tax_pct, 0), 15) / 100, 2),
+      ROUND(total * COALESCE(NULLIF(settings.owner_pay_pct, 0), 50) / 100, 2),
+      ROUND(total * COALESCE(NULLIF(settings.ops_pct, 0), 25) / 100, 2),
+      ROUND(total * COALESCE(NULLIF(settings.buffer_pct, 0), 5) / 100, 2)
+    );
+  END IF;
+
+  -- AFTER trigger: the return value is ignored
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS record_profit_first_allocation ON quotes;
+DROP TRIGGER IF EXISTS record_profit_first_allocation ON finished_hat_quotes;
+
+CREATE TRIGGER record_profit_first_allocation
+  AFTER INSERT OR UPDATE OF status, total_price OR DELETE ON quotes
+  FOR EACH ROW
+  EXECUTE FUNCTION record_profit_first_allocation();
+
+CREATE TRIGGER record_profit_first_allocation
+  AFTER INSERT OR UPDATE OF status, total_price OR DELETE ON finished_hat_quotes
+  FOR EACH ROW
+  EXECUTE FUNCTION record_profit_first_allocation();
+
+-- =====================================================
+-- 6) BACKFILL already-paid quotes (booked in the month they were last updated)
+-- =====================================================
+INSERT INTO profit_first_ledger
+  (user_id, quote_id, quote_table, entry_type, month, revenue, profit, tax, owner_pay, ops, buffer)
+SELECT
+  q.user_id, q.id, q.quote_table, 'allocate',
+  date_trunc('month', q.updated_at)::date,
+  q.total,
+  ROUND(q.total * COALESCE(NULLIF(s.profit_pct, 0), 5) / 100, 2),
+  ROUND(q.total * COALESCE(NULLIF(s.tax_pct, 0), 15) / 100, 2),
+  ROUND(q.total * COALESCE(NULLIF(s.owner_pay_pct, 0), 50) / 100, 2),
+  ROUND(q.total * COALESCE(NULLIF(s.ops_pct, 0), 25) / 100, 2),
+  ROUND(q.total * COALESCE(NULLIF(s.buffer_pct, 0), 5) / 100, 2)
+FROM (
+  SELECT id, user_id, 'quotes' AS quote_table, COALESCE(total_price, 0) AS total, updated_at
+  FROM quotes WHERE status = 'paid'
+  UNION ALL
+  SELECT id, user_id, 'finished_hat_quotes', COALESCE(total_price, 0), updated_at
+  FROM finished_hat_quotes WHERE status = 'paid'
+) q
+LEFT JOIN profit_first_settings s ON s.user_id = q.user_id
+WHERE NOT EXISTS (
+  SELECT 1 FROM profit_first_ledger l
+  WHERE l.quote_table = q.quote_table AND l.quote_id = q.id
+);
+
+-- =====================================================
+-- MIGRATION COMPLETE
+-- =====================================================
+-- Verify by running: SELECT * FROM profit_first_monthly ORDER BY month DESC;
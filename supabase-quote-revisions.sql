@@ -0,0 +1,151 @@
+-- =====================================================
+-- QUOTE REVISIONS (base snapshot + input deltas)
+-- Run this in Supabase SQL Editor
+-- (after supabase-transactional-rpc.sql, which defines insert_json_row)
+-- =====================================================
+-- Re-quoting revises the existing quote instead of inserting a new one:
+-- - quotes.base_inputs is the pricing inputs of revision 0
+-- - each quote_revisions row stores only the inputs that differ from the
+--   base, the price it was quoted at and the pricing context it used
+-- - pricing_contexts holds settings + material snapshots, content-addressed
+--   by hash, so every revision priced under the same settings shares a row
+-- Computed outputs (tiers, scripts, breakdowns) are not stored per revision;
+-- the API regenerates them from base + delta + context through the engine.
+-- The quotes row itself keeps mirroring the latest revision.
+
+-- =====================================================
+-- 1) PRICING CONTEXTS
+-- =====================================================
+CREATE TABLE IF NOT EXISTS pricing_contexts (
+  -- sha256 of (user, shop settings, material)
+  id TEXT PRIMARY KEY,
+  user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  shop_settings JSONB NOT NULL,
+  material JSONB NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- =====================================================
+-- 2) BASE SNAPSHOT ON QUOTES
+-- =====================================================
+ALTER TABLE quotes
+  ADD COLUMN IF NOT EXISTS base_inputs JSONB,
+  ADD COLUMN IF NOT EXISTS base_pricing_context_id TEXT REFERENCES pricing_contexts(id),
+  ADD COLUMN IF NOT EXISTS base_unit_price NUMERIC,
+  ADD COLUMN IF NOT EXISTS base_total_price NUMERIC,
+  ADD COLUMN IF NOT EXISTS current_revision INTEGER NOT NULL DEFAULT 0;
+
+-- =====================================================
+-- 3) REVISIONS
+-- =====================================================
+CREATE TABLE IF NOT EXISTS quote_revisions (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  quote_id UUID NOT NULL REFERENCES quotes(id) ON DELETE CASCADE,
+  user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  revision INTEGER NOT NULL CHECK (revision > 0),
+  -- Inputs that differ from quotes.base_inputs (null = field cleared)
+  input_delta JSONB NOT NULL DEFAULT '{}',
+  pricing_context_id TEXT NOT NULL REFERENCES pricing_contexts(id),
+  -- Price as quoted (kept so the exact figure survives engine changes)
+  unit_price NUMERIC NOT NULL,
+  total_price NUMERIC NOT NULL,
+  note TEXT,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  UNIQUE (quote_id, revision)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pricing_contexts_user_id ON pricing_contexts(user_id);
+CREATE INDEX IF NOT EXISTS idx_quote_revisions_user_id ON quote_revisions(user_id);
+
+-- =====================================================
+-- 4) RLS (contexts and revisions are immutable)
+-- =====================================================
+ALTER TABLE pricing_contexts ENABLE ROW LEVEL SECURITY;
+ALTER TABLE quote_revisions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view their own pricing contexts"
+  ON pricing_contexts FOR SELECT
+  USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can insert their own pricing contexts"
+  ON pricing_contexts FOR INSERT
+  WITH CHECK (auth.uid() = user_id);
+
+CREATE POLICY "Users can view their own quote revisions"
+  ON quote_revisions FOR SELECT
+  USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can insert their own quote revisions"
+  ON quote_revisions FOR INSERT
+  WITH CHECK (auth.uid() = user_id);
+
+-- =====================================================
+-- 5) ADD A REVISION (one transaction)
+-- =====================================================
+-- Locks the quote, checks nobody revised it since the caller read it
+-- (40001 otherwise), inserts revision current_revision + 1 and copies the
+-- new inputs + computed columns onto the quote. p_base is only passed for
+-- quotes saved before revisions existed: it records their base snapshot.
+CREATE OR REPLACE FUNCTION add_quote_revision(
+  p_quote_id UUID,
+  p_expected_revision INTEGER,
+  p_revision JSONB,
+  p_quote_fields JSONB,
+  p_base JSONB DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  uid UUID := auth.uid();
+  latest INTEGER;
+  fields JSONB;
+  cols TEXT;
+  inserted JSONB;
+BEGIN
+  SELECT current_revision INTO latest
+  FROM quotes
+  WHERE id = p_quote_id AND user_id = uid
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Quote not found' USING ERRCODE = 'P0002';
+  END IF;
+  IF latest <> p_expected_revision THEN
+    RAISE EXCEPTION 'Quote was revised by another request' USING ERRCODE = '40001';
+  END IF;
+
+  inserted := insert_json_row(
+    'quote_revisions',
+    (p_revision - 'id') || jsonb_build_object('quote_id', p_quote_id, 'user_id', uid, 'revision', latest + 1)
+  );
+
+  fields := ((COALESCE(p_quote_fields, '{}'::JSONB) || COALESCE(p_base, '{}'::JSONB)) - 'id' - 'user_id')
+    || jsonb_build_object('current_revision', latest + 1);
+
+  SELECT string_agg(quote_ident(a.attname), ', ' ORDER BY a.attnum)
+  INTO cols
+  FROM pg_attribute a
+  WHERE a.attrelid = 'quotes'::REGCLASS
+    AND a.attnum > 0
+    AND NOT a.attisdropped
+    AND fields ? a.attname;
+
+  EXECUTE format(
+    'UPDATE quotes SET (%s) = (SELECT %s FROM jsonb_populate_record(NULL::quotes, $1)) WHERE id = $2',
+    cols, cols
+  )
+  USING fields, p_quote_id;
+
+  RETURN inserted;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION add_quote_revision(UUID, INTEGER, JSONB, JSONB, JSONB) TO authenticated;
+
+-- =====================================================
+-- MIGRATION COMPLETE
+-- =====================================================
+-- Verify by running: SELECT quote_id, revision, input_delta, total_price FROM quote_revisions ORDER BY created_at DESC LIMIT 5;
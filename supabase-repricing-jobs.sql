@@ -0,0 +1,158 @@
+-- =====================================================
+-- BACKGROUND RE-PRICING JOBS
+-- Run this in Supabase SQL Editor
+-- (after supabase-add-quote-setup-fee.sql on databases created before it)
+-- =====================================================
+-- Saving shop settings starts a job that re-prices every draft/sent quote
+-- with the new settings. The job walks quotes in (created_at, id) keyset
+-- order and stores its cursor after each chunk, so an interrupted job
+-- resumes where it stopped. reprice_quotes() writes one chunk of results
+-- in a single UPDATE ... FROM jsonb_to_recordset statement.
+-- A runner owns a job while it keeps heartbeat_at fresh; claim_repricing_job()
+-- hands a job to a new runner only once that heartbeat has gone stale, so
+-- two app instances never work through the same job.
+
+-- =====================================================
+-- 1) JOB STATE
+-- =====================================================
+CREATE TABLE IF NOT EXISTS repricing_jobs (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  status TEXT NOT NULL DEFAULT 'pending'
+    CHECK (status IN ('pending','running','completed','failed','cancelled')),
+  trigger TEXT NOT NULL DEFAULT 'shop_settings',
+  total INTEGER NOT NULL DEFAULT 0,
+  processed INTEGER NOT NULL DEFAULT 0,
+  updated_count INTEGER NOT NULL DEFAULT 0,
+  failed_count INTEGER NOT NULL DEFAULT 0,
+  -- Keyset cursor: last (created_at, id) fully written
+  cursor_created_at TIMESTAMPTZ,
+  cursor_id UUID,
+  error TEXT,
+  -- Runner that owns the job and its last progress write
+  runner TEXT,
+  heartbeat_at TIMESTAMPTZ,
+  started_at TIMESTAMPTZ,
+  finished_at TIMESTAMPTZ,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Tables created before runner claims existed
+ALTER TABLE repricing_jobs
+  ADD COLUMN IF NOT EXISTS runner TEXT,
+  ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_repricing_jobs_user_created
+  ON repricing_jobs(user_id, created_at DESC);
+
+-- Keyset scan of a user's quotes
+CREATE INDEX IF NOT EXISTS idx_quotes_user_created_id
+  ON quotes(user_id, created_at, id);
+
+-- =====================================================
+-- 2) RLS
+-- =====================================================
+ALTER TABLE repricing_jobs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view their own repricing jobs"
+  ON repricing_jobs FOR SELECT
+  USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can insert their own repricing jobs"
+  ON repricing_jobs FOR INSERT
+  WITH CHECK (auth.uid() = user_id);
+
+CREATE POLICY "Users can update their own repricing jobs"
+  ON repricing_jobs FOR UPDATE
+  USING (auth.uid() = user_id);
+
+-- =====================================================
+-- 3) BULK WRITE-BACK (one statement per chunk)
+-- =====================================================
+-- SECURITY INVOKER: quotes RLS still applies. Quotes that were marked paid
+-- while the job was running are left alone.
+CREATE OR REPLACE FUNCTION reprice_quotes(updates JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+  WITH changed AS (
+    UPDATE quotes q SET
+      shop_rate = u.shop_rate,
+      shop_minute_rate = u.shop_minute_rate,
+      unit_price = u.unit_price,
+      true_cost_per_hat = u.true_cost_per_hat,
+      total_price = u.total_price,
+      setup_fee = u.setup_fee,
+      best_yield = u.best_yield,
+      effective_yield = u.effective_yield,
+      tier_prices_json = u.tier_prices_json,
+      quote_sms = u.quote_sms,
+      quote_dm = u.quote_dm,
+      quote_phone = u.quote_phone,
+      updated_at = NOW()
+    FROM jsonb_to_recordset(updates) AS u(
+      id UUID,
+      shop_rate NUMERIC,
+      shop_minute_rate NUMERIC,
+      unit_price NUMERIC,
+      true_cost_per_hat NUMERIC,
+      total_price NUMERIC,
+      setup_fee NUMERIC,
+      best_yield NUMERIC,
+      effective_yield NUMERIC,
+      tier_prices_json JSONB,
+      quote_sms TEXT,
+      quote_dm TEXT,
+      quote_phone TEXT
+    )
+    WHERE q.id = u.id
+      AND q.user_id = auth.uid()
+      AND q.status IN ('draft','sent')
+    RETURNING 1
+  )
+  SELECT count(*)::INTEGER FROM changed;
+$$;
+
+GRANT EXECUTE ON FUNCTION reprice_quotes(JSONB) TO authenticated;
+
+-- =====================================================
+-- 4) CLAIM A JOB FOR A RUNNER
+-- =====================================================
+-- Takes over a pending/running/failed job when nobody has written progress
+-- for p_stale_seconds. Returns the claimed row, or NULL when another runner
+-- still holds it (or the job is finished). The row lock taken by the UPDATE
+-- makes concurrent claims for the same job serialize; only one succeeds.
+CREATE OR REPLACE FUNCTION claim_repricing_job(
+  p_job_id UUID,
+  p_runner TEXT,
+  p_stale_seconds INTEGER
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  claimed JSONB;
+BEGIN
+  UPDATE repricing_jobs j
+  SET runner = p_runner, heartbeat_at = NOW(), updated_at = NOW()
+  WHERE j.id = p_job_id
+    AND j.user_id = auth.uid()
+    AND j.status IN ('pending','running','failed')
+    AND (j.heartbeat_at IS NULL OR j.heartbeat_at < NOW() - make_interval(secs => p_stale_seconds))
+  RETURNING to_jsonb(j.*) INTO claimed;
+
+  RETURN claimed;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION claim_repricing_job(UUID, TEXT, INTEGER) TO authenticated;
+
+-- =====================================================
+-- MIGRATION COMPLETE
+-- =====================================================
+-- Verify by running: SELECT status, processed, total FROM repricing_jobs ORDER BY created_at DESC LIMIT 5;
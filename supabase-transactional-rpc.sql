@@ -0,0 +1,116 @@
+-- =====================================================
+-- TRANSACTIONAL RPC FUNCTIONS
+-- Run this in Supabase SQL Editor
+-- =====================================================
+-- Multi-statement flows run as one Postgres function called with
+-- supabase.rpc(): one network round trip, and PostgREST wraps the call in a
+-- single transaction, so any failing statement rolls the whole flow back.
+--
+-- Pattern for new flows:
+--   1. write a plpgsql function taking JSONB payloads,
+--   2. force user_id = auth.uid() on every row it writes,
+--   3. insert through insert_json_row() / insert_json_rows(),
+--   4. keep it SECURITY INVOKER so table RLS policies still apply.
+
+-- =====================================================
+-- 1) GENERIC HELPERS
+-- =====================================================
+-- Insert one JSON object into a table. Only keys that are real columns are
+-- used, so columns not given keep their DEFAULTs. Returns the inserted row.
+CREATE OR REPLACE FUNCTION insert_json_row(target REGCLASS, payload JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  cols TEXT;
+  inserted JSONB;
+BEGIN
+  SELECT string_agg(quote_ident(a.attname), ', ' ORDER BY a.attnum)
+  INTO cols
+  FROM pg_attribute a
+  WHERE a.attrelid = target
+    AND a.attnum > 0
+    AND NOT a.attisdropped
+    AND payload ? a.attname;
+
+  IF cols IS NULL THEN
+    RAISE EXCEPTION 'No columns of % in payload', target;
+  END IF;
+
+  EXECUTE format(
+    'INSERT INTO %s AS t (%s) SELECT %s FROM jsonb_populate_record(NULL::%s, $1) RETURNING to_jsonb(t.*)',
+    target, cols, cols, target
+  )
+  INTO inserted
+  USING payload;
+
+  RETURN inserted;
+END;
+$$;
+
+-- Insert an array of JSON objects; returns the inserted rows as an array
+CREATE OR REPLACE FUNCTION insert_json_rows(target REGCLASS, payloads JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  item JSONB;
+  inserted JSONB := '[]'::JSONB;
+BEGIN
+  FOR item IN SELECT value FROM jsonb_array_elements(COALESCE(payloads, '[]'::JSONB))
+  LOOP
+    inserted := inserted || jsonb_build_array(insert_json_row(target, item));
+  END LOOP;
+  RETURN inserted;
+END;
+$$;
+
+-- =====================================================
+-- 2) ONBOARDING (shop settings + profit first + default materials)
+-- =====================================================
+CREATE OR REPLACE FUNCTION complete_onboarding(
+  p_shop_settings JSONB,
+  p_profit_first_settings JSONB,
+  p_materials JSONB DEFAULT '[]'::JSONB
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  uid UUID := auth.uid();
+  owner JSONB;
+  materials JSONB;
+BEGIN
+  IF uid IS NULL THEN
+    RAISE EXCEPTION 'Not authenticated' USING ERRCODE = '28000';
+  END IF;
+
+  owner := jsonb_build_object('user_id', uid);
+
+  SELECT COALESCE(jsonb_agg((m.value - 'id') || owner), '[]'::JSONB)
+  INTO materials
+  FROM jsonb_array_elements(COALESCE(p_materials, '[]'::JSONB)) AS m(value);
+
+  RETURN jsonb_build_object(
+    'shop_settings',
+      insert_json_row('shop_settings', (COALESCE(p_shop_settings, '{}'::JSONB) - 'id') || owner),
+    'profit_first_settings',
+      insert_json_row('profit_first_settings', (COALESCE(p_profit_first_settings, '{}'::JSONB) - 'id') || owner),
+    'patch_materials',
+      insert_json_rows('patch_materials', materials)
+  );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION complete_onboarding(JSONB, JSONB, JSONB) TO authenticated;
+
+-- =====================================================
+-- MIGRATION COMPLETE
+-- =====================================================
+-- Verify by running: SELECT proname FROM pg_proc WHERE proname IN ('insert_json_row','insert_json_rows','complete_onboarding');